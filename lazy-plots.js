@@ -0,0 +1,74 @@
+// Draw Plotly charts from their compact data files once they scroll into view.
+//
+// Each chart is a placeholder written by scripts/site_artifacts.py:
+//   <div class="lazy-plot" data-src="chart.js" data-template="template.js" data-plotly="plotly.min.js">
+// Plotly.js and the shared template are loaded once, on the first chart
+// that comes near the viewport. Data files are scripts calling
+// lazyPlots.register(src, data) rather than JSON, so they load with a
+// <script> tag from file:// too, where fetch() is blocked.
+(function () {
+  const pending = {};
+  const registered = {};
+
+  window.lazyPlots = {
+    register: function (src, data) { registered[src] = data; },
+  };
+
+  function loadScript(src) {
+    pending[src] = pending[src] || new Promise(function (resolve, reject) {
+      const script = document.createElement('script');
+      script.src = src;
+      script.onload = resolve;
+      script.onerror = reject;
+      document.head.appendChild(script);
+    });
+    return pending[src];
+  }
+
+  function loadData(src) {
+    return loadScript(src).then(function () { return registered[src]; });
+  }
+
+  // '1.marker.color' -> traces[1].marker.color
+  function setPath(traces, path, values) {
+    const keys = path.split('.');
+    let node = traces[Number(keys.shift())];
+    while (keys.length > 1) {
+      const key = keys.shift();
+      node = node[key] = node[key] || {};
+    }
+    node[keys[0]] = values;
+  }
+
+  function draw(el) {
+    return Promise.all([
+      loadData(el.dataset.src),
+      el.dataset.template ? loadData(el.dataset.template) : null,
+      loadScript(el.dataset.plotly),
+    ]).then(function (loaded) {
+      const chart = loaded[0];
+      const traces = JSON.parse(JSON.stringify(chart.traces));
+      Object.keys(chart.columns).forEach(function (path) {
+        setPath(traces, path, chart.columns[path]);
+      });
+      const layout = Object.assign({}, chart.layout);
+      if (loaded[1]) layout.template = loaded[1];
+      return Plotly.newPlot(el, traces, layout, { responsive: true });
+    });
+  }
+
+  const plots = document.querySelectorAll('.lazy-plot');
+  if (!('IntersectionObserver' in window)) {
+    plots.forEach(draw);
+    return;
+  }
+  const observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) {
+        observer.unobserve(entry.target);
+        draw(entry.target);
+      }
+    });
+  }, { rootMargin: '200px 0px' });
+  plots.forEach(function (el) { observer.observe(el); });
+})();
@@ -2,36 +2,84 @@
 Collect audio features for Wicked and comparison musicals from Spotify
 """
 
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 import pandas as pd
-import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import sys
-from pathlib import Path
 
-# Get the project root directory
-PROJECT_ROOT = Path(__file__).parent.parent
-sys.path.append(str(PROJECT_ROOT))
-DATA_DIR = PROJECT_ROOT / 'data'
+from spotify_client import get_client, LazyClient
+from spotify_batch import album_track_items, fetch_tracks, fetch_audio_features
+from response_cache import CachedSpotify, open_cache
+from dataset_store import write_table
+from instrumentation import instrument
+from checkpoint import CheckpointStore, collect_in_batches, load_existing, split_stale, timestamp
 
-from spotify_config import CLIENT_ID, CLIENT_SECRET
+MAX_WORKERS = 8
 
-print(f"Authenticating with Spotify...")
-print(f"Client ID: {CLIENT_ID[:10]}...")
+# Built on first use; cache hits are answered before the shared rate limiter
+sp = LazyClient(lambda: CachedSpotify(get_client(), open_cache()))
 
-sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-    client_id=CLIENT_ID,
-    client_secret=CLIENT_SECRET
-))
-
-print("✓ Authentication successful!")
+def build_track_row(track, track_info, audio_features, musical_name):
+    """Combine album track, full track and audio features into one row"""
+    return {
+        'musical': musical_name,
+        'track_name': track['name'],
+        'track_number': track['track_number'],
+        'duration_ms': track['duration_ms'],
+        'duration_min': round(track['duration_ms'] / 60000, 2),
+        'track_id': track['id'],
+        'popularity': track_info['popularity'],
+        'release_date': track_info['album']['release_date'],
+        
+        'danceability': audio_features['danceability'],
+        'energy': audio_features['energy'],
+        'key': audio_features['key'],
+        'loudness': audio_features['loudness'],
+        'mode': audio_features['mode'],
+        'speechiness': audio_features['speechiness'],
+        'acousticness': audio_features['acousticness'],
+        'instrumentalness': audio_features['instrumentalness'],
+        'liveness': audio_features['liveness'],
+        'valence': audio_features['valence'],
+        'tempo': audio_features['tempo'],
+        'time_signature': audio_features['time_signature'],
+        'collected_at': timestamp()
+    }
 
-def get_album_tracks_with_features(album_id, musical_name):
-    """Get all tracks with audio features from an album"""
+@instrument(fields=['musical_name'])
+def get_album_tracks_with_features(album_id, musical_name, batched=True, checkpoints=None, existing=None):
+    """Get all tracks with audio features from an album
+    
+    With batched=True (default) track info and audio features are fetched
+    in chunks of up to 50 and 100 ids. batched=False keeps the original
+    two-requests-per-track behaviour.
+    
+    In batched mode each chunk is saved to `checkpoints` (a CheckpointStore)
+    as it completes. If `existing` rows from a previous run are given, only
+    tracks that are new or stale are fetched again.
+    """
     
-    results = sp.album_tracks(album_id)
-    tracks = results['items']
+    tracks = album_track_items(sp, album_id)
+    
+    if batched:
+        tracks_by_id = {track['id']: track for track in tracks}
+        fresh, to_fetch = split_stale(list(tracks_by_id), existing)
+        if len(fresh):
+            print(f"  {musical_name}: reusing {len(fresh)} fresh tracks, fetching {len(to_fetch)}")
+        
+        def collect_batch(track_ids):
+            track_infos = fetch_tracks(sp, track_ids)
+            features = fetch_audio_features(sp, track_ids)
+            return pd.DataFrame([
+                build_track_row(tracks_by_id[track_id], track_infos[track_id], features[track_id], musical_name)
+                for track_id in track_ids
+                if track_id in track_infos and track_id in features
+            ])
+        
+        collected = collect_in_batches(checkpoints, album_id, to_fetch, collect_batch)
+        frames = [df for df in (fresh, collected) if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True).sort_values('track_number', ignore_index=True)
     
     track_data = []
     
@@ -43,48 +91,52 @@ def get_album_tracks_with_features(album_id, musical_name):
             track_info = sp.track(track_id)
             
             if audio_features:
-                track_data.append({
-                    'musical': musical_name,
-                    'track_name': track['name'],
-                    'track_number': track['track_number'],
-                    'duration_ms': track['duration_ms'],
-                    'duration_min': round(track['duration_ms'] / 60000, 2),
-                    'track_id': track_id,
-                    'popularity': track_info['popularity'],
-                    'release_date': track_info['album']['release_date'],
-                    
-                    'danceability': audio_features['danceability'],
-                    'energy': audio_features['energy'],
-                    'key': audio_features['key'],
-                    'loudness': audio_features['loudness'],
-                    'mode': audio_features['mode'],
-                    'speechiness': audio_features['speechiness'],
-                    'acousticness': audio_features['acousticness'],
-                    'instrumentalness': audio_features['instrumentalness'],
-                    'liveness': audio_features['liveness'],
-                    'valence': audio_features['valence'],
-                    'tempo': audio_features['tempo'],
-                    'time_signature': audio_features['time_signature']
-                })
+                track_data.append(build_track_row(track, track_info, audio_features, musical_name))
                 
         except Exception as e:
             print(f"Error with {track['name']}: {e}")
-        
-        time.sleep(0.1)
     
     return pd.DataFrame(track_data)
 
-def main():
+def collect_albums(albums, max_workers=MAX_WORKERS, checkpoints=None, existing=None):
+    """Collect several albums concurrently
+    
+    `albums` maps musical name -> album id. All workers share the same
+    rate limiter, so throughput is bounded by the API quota rather than
+    by fixed sleeps. Returns a dict of musical name -> DataFrame in the
+    same order as `albums`.
+    """
+    
+    def collect(name, album_id):
+        print(f"  Collecting {name}...")
+        previous = existing[existing['musical'] == name] if existing is not None else None
+        return get_album_tracks_with_features(album_id, name, checkpoints=checkpoints, existing=previous)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(collect, name, album_id) for name, album_id in albums.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+@instrument('spotify_features')
+def main(incremental=False, resume_stale=False):
+    """Collect everything; with incremental=True only new or stale tracks are refetched
+
+    Checkpoints older than checkpoint.STALE_AFTER are refetched unless
+    resume_stale=True.
+    """
     print("\n" + "="*70)
     print("WICKED RETROSPECTIVE ANALYSIS - SPOTIFY DATA COLLECTION")
     print("="*70)
     
     print("\nCollecting Wicked audio features...")
+    wicked_checkpoints = CheckpointStore('wicked_audio_features', resume_stale=resume_stale)
     wicked_df = get_album_tracks_with_features(
         '1woCvthHJakakroP6dXNxs',
-        'Wicked'
+        'Wicked',
+        checkpoints=wicked_checkpoints,
+        existing=load_existing('audio_features', musical='Wicked') if incremental else None
     )
-    wicked_df.to_csv(DATA_DIR / 'spotify' / 'wicked_audio_features.csv', index=False)
+    write_table('audio_features', wicked_df)
+    wicked_checkpoints.clear()
     print(f"✓ Collected {len(wicked_df)} Wicked songs")
     
     print("\nCollecting comparison musicals...")
@@ -96,15 +148,16 @@ def main():
         'Six': '1OWqShZzyDvtVCOoF8q7uf',
     }
     
-    all_comparison = []
-    for name, album_id in comparison_musicals.items():
-        print(f"  Collecting {name}...")
-        df = get_album_tracks_with_features(album_id, name)
-        all_comparison.append(df)
-        time.sleep(1)
+    comparison_checkpoints = CheckpointStore('comparison_musicals', resume_stale=resume_stale)
+    all_comparison = collect_albums(
+        comparison_musicals,
+        checkpoints=comparison_checkpoints,
+        existing=load_existing('audio_features') if incremental else None
+    )
     
-    comparison_df = pd.concat(all_comparison, ignore_index=True)
-    comparison_df.to_csv(DATA_DIR / 'spotify' / 'comparison_musicals.csv', index=False)
+    comparison_df = pd.concat(all_comparison.values(), ignore_index=True)
+    write_table('audio_features', comparison_df)
+    comparison_checkpoints.clear()
     print(f"✓ Collected {len(comparison_df)} comparison songs")
     
     print("\n" + "="*70)
@@ -120,4 +173,4 @@ def main():
     return wicked_df, comparison_df
 
 if __name__ == "__main__":
-    wicked_df, comparison_df = main()
+    wicked_df, comparison_df = main(incremental='--incremental' in sys.argv, resume_stale='--resume-stale' in sys.argv)
@@ -5,33 +5,32 @@ Since audio_features endpoint requires special permissions, we:
 2. Note the audio features limitation in our analysis
 """
 
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 import pandas as pd
-import time
 from pathlib import Path
 import sys
 
 # Get the project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
-sys.path.append(str(PROJECT_ROOT))
 DATA_DIR = PROJECT_ROOT / 'data'
 
-from spotify_config import CLIENT_ID, CLIENT_SECRET
+from spotify_client import get_client, LazyClient
+from response_cache import CachedSpotify, open_cache
+from spotify_batch import album_track_items, fetch_tracks
+from dataset_store import write_table
+from instrumentation import instrument
+from checkpoint import CheckpointStore, collect_in_batches, load_existing, split_stale, timestamp
 
-print(f"\n{'='*70}")
-print("WICKED ANALYSIS - COLLECTING REAL SPOTIFY DATA")
-print(f"{'='*70}\n")
+# Built on first use, shared with any other collector in the process
+sp = LazyClient(lambda: CachedSpotify(get_client(), open_cache()))
 
-print("Authenticating with Spotify...")
-sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-    client_id=CLIENT_ID,
-    client_secret=CLIENT_SECRET
-))
-print("✓ Authentication successful!\n")
-
-def get_wicked_tracks():
-    """Get real Wicked track data from Spotify"""
+@instrument()
+def get_wicked_tracks(checkpoints=None, existing=None):
+    """Get real Wicked track data from Spotify
+    
+    Track batches are saved to `checkpoints` as they complete so a failed
+    run can resume. With `existing` rows from a previous run, only new or
+    stale tracks are fetched again.
+    """
     
     # Search for Wicked Original Broadway Cast Recording
     search_results = sp.search(q='Wicked Original Broadway Cast Recording', type='album', limit=5)
@@ -48,16 +47,21 @@ def get_wicked_tracks():
     print(f"Album ID: {album_id}\n")
     
     # Get all tracks from the album
-    results = sp.album_tracks(album_id)
-    tracks = results['items']
+    tracks_by_id = {track['id']: track for track in album_track_items(sp, album_id)}
     
-    track_data = []
+    fresh, to_fetch = split_stale(list(tracks_by_id), existing)
+    if len(fresh):
+        print(f"Reusing {len(fresh)} fresh tracks from the last run")
     
-    print("Collecting track information...")
-    for track in tracks:
-        try:
-            # Get full track info (includes popularity)
-            track_info = sp.track(track['id'])
+    def collect_batch(track_ids):
+        track_infos = fetch_tracks(sp, track_ids)
+        track_data = []
+        for track_id in track_ids:
+            track = tracks_by_id[track_id]
+            if track_id not in track_infos:
+                print(f"  ✗ Error with {track['name']}")
+                continue
+            track_info = track_infos[track_id]
             
             track_data.append({
                 'track_id': track['id'],
@@ -69,25 +73,37 @@ def get_wicked_tracks():
                 'album': album_name,
                 'popularity': track_info['popularity'],
                 'release_date': track_info['album']['release_date'],
-                'spotify_url': track_info['external_urls']['spotify']
+                'spotify_url': track_info['external_urls']['spotify'],
+                'collected_at': timestamp()
             })
             
             print(f"  ✓ {track['name'][:50]:<50} Pop: {track_info['popularity']}")
-            
-        except Exception as e:
-            print(f"  ✗ Error with {track['name']}: {e}")
-        
-        time.sleep(0.1)  # Rate limiting
+        return pd.DataFrame(track_data)
     
-    return pd.DataFrame(track_data)
+    print("Collecting track information...")
+    collected = collect_in_batches(checkpoints, album_id, to_fetch, collect_batch)
+    
+    frames = [df for df in (fresh, collected) if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values('track_number', ignore_index=True)
 
-def main():
+@instrument('spotify_real')
+def main(incremental=False, resume_stale=False):
+    print(f"\n{'='*70}")
+    print("WICKED ANALYSIS - COLLECTING REAL SPOTIFY DATA")
+    print(f"{'='*70}\n")
+    
     # Collect Wicked tracks
-    wicked_df = get_wicked_tracks()
+    checkpoints = CheckpointStore('wicked_tracks_REAL', resume_stale=resume_stale)
+    wicked_df = get_wicked_tracks(
+        checkpoints=checkpoints,
+        existing=load_existing('spotify_tracks', musical='Wicked') if incremental else None
+    )
     
-    # Save to CSV
-    output_file = DATA_DIR / 'spotify' / 'wicked_tracks_REAL.csv'
-    wicked_df.to_csv(output_file, index=False)
+    # Save to the dataset store
+    output_file = write_table('spotify_tracks', wicked_df, musical='Wicked')
+    checkpoints.clear()
     
     print(f"\n{'='*70}")
     print(f"✓ Successfully collected {len(wicked_df)} Wicked tracks")
@@ -124,4 +140,4 @@ data science project portfolio!
     return wicked_df
 
 if __name__ == "__main__":
-    wicked_df = main()
+    wicked_df = main(incremental='--incremental' in sys.argv, resume_stale='--resume-stale' in sys.argv)
@@ -17,10 +17,13 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / 'data'
 
+from dataset_store import read_table
+from instrumentation import instrument
+
 def create_tiktok_template():
     """Create template for manually collecting TikTok data"""
     
-    wicked_df = pd.read_csv(DATA_DIR / 'spotify' / 'wicked_audio_features.csv')
+    wicked_df = read_table('audio_features', columns=['track_name'], musical='Wicked')
     
     template = pd.DataFrame({
         'song_name': wicked_df['track_name'],
@@ -232,6 +235,7 @@ def collect_content_type_breakdown():
     
     return content_types
 
+@instrument('tiktok_setup')
 def main():
     print("\n" + "="*70)
     print("WICKED RETROSPECTIVE ANALYSIS - TIKTOK DATA COLLECTION")
@@ -255,6 +259,8 @@ def main():
     print("2. Go to TikTok and search each Wicked song")
     print("3. Fill in data/tiktok/tiktok_collection_template.csv")
     print("4. Save as data/tiktok/wicked_tiktok_performance.csv")
+    print("\nTo fill in video and view counts automatically:")
+    print("   python scripts/tiktok_scraper.py --musical Wicked")
     print("\nOR use the example data to proceed with analysis")
     
     return template, example, content_types
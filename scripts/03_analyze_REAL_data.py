@@ -2,10 +2,6 @@
 Analyze Wicked TikTok Performance Using REAL Spotify Data
 """
 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
 from scipy.stats import spearmanr
 
@@ -14,28 +10,33 @@ PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / 'data'
 OUTPUT_DIR = PROJECT_ROOT / 'outputs'
 
+from compact import compact_frame, describe_memory
+from dataset_store import PARTITION_COLUMN, read_table, write_table, table_source
+from figures import dashboard_specs, render_figures
+from instrumentation import current_span, instrument
+from title_matching import merge_matched
+
 # Wicked colors
 EMERALD = '#00A86B'
 PINK = '#E91E8C'
 GOLD = '#FFD700'
 
-plt.style.use('seaborn-v0_8-darkgrid')
-
+@instrument()
 def load_data():
     """Load REAL Spotify data"""
     print("Loading REAL Spotify data...")
-    spotify = pd.read_csv(DATA_DIR / 'spotify' / 'wicked_tracks_REAL.csv')
+    spotify = read_table('spotify_tracks', musical='Wicked', compact=True)
     print(f"Loaded {len(spotify)} tracks from Spotify")
     
-    try:
-        tiktok = pd.read_csv(DATA_DIR / 'tiktok' / 'wicked_tiktok_performance.csv')
-        print(f"Loaded TikTok data")
-    except:
-        tiktok = pd.read_csv(DATA_DIR / 'tiktok' / 'wicked_tiktok_performance_EXAMPLE.csv')
+    tiktok = read_table('tiktok_performance', musical='Wicked', compact=True)
+    if 'EXAMPLE' in str(table_source('tiktok_performance')):
         print("Using example TikTok data")
+    else:
+        print(f"Loaded TikTok data")
     
     return spotify, tiktok
 
+@instrument()
 def clean_and_merge(spotify, tiktok):
     """Merge datasets"""
     print("\nMerging data...")
@@ -49,18 +50,17 @@ def clean_and_merge(spotify, tiktok):
         r'\s*\(.*?\)\s*', '', regex=True
     ).str.strip()
     
-    # Merge
-    merged = pd.merge(
-        spotify,
-        tiktok,
-        left_on='clean_name',
-        right_on='song_name',
-        how='inner'
-    )
+    # Merge on matched titles so casing and punctuation differences still join
+    # Both tables carry the same musical partition; keep Spotify's
+    tiktok = tiktok.drop(columns=[PARTITION_COLUMN], errors='ignore')
+    merged = compact_frame(merge_matched(spotify, tiktok, left_on='track_name', right_on='song_name'))
+    fuzzy = (merged['match_score'] < 1).sum()
     
-    print(f"Merged {len(merged)} tracks successfully")
+    print(f"Merged {len(merged)} tracks successfully ({fuzzy} by fuzzy title match)")
+    print(f"Merged table: {describe_memory(merged)}")
     return merged
 
+@instrument()
 def analyze_correlations(df):
     """Analyze relationships"""
     print("\nAnalyzing correlations...")
@@ -71,51 +71,18 @@ def analyze_correlations(df):
         return corr, p_val
     return None, None
 
+@instrument()
 def create_plots(df):
-    """Create visualizations"""
+    """Create visualizations (cached: unchanged data is not redrawn)"""
     print("\nCreating visualizations...")
     
-    fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-    fig.suptitle('Wicked Analysis - Real Spotify Data', fontsize=16, fontweight='bold')
-    
-    # Plot 1: Popularity histogram
-    ax1 = axes[0, 0]
-    ax1.hist(df['popularity'], bins=15, color=EMERALD, edgecolor='black', alpha=0.7)
-    ax1.set_title('Spotify Popularity Distribution')
-    ax1.set_xlabel('Popularity Score')
-    ax1.set_ylabel('Count')
-    ax1.axvline(df['popularity'].mean(), color=PINK, linestyle='--', linewidth=2)
-    
-    # Plot 2: Popularity vs TikTok
-    ax2 = axes[0, 1]
-    if 'tiktok_video_count' in df.columns:
-        ax2.scatter(df['popularity'], df['tiktok_video_count'], s=100, alpha=0.6, color=EMERALD)
-        ax2.set_title('Popularity vs TikTok Videos')
-        ax2.set_xlabel('Spotify Popularity')
-        ax2.set_ylabel('TikTok Videos')
-    
-    # Plot 3: Top songs
-    ax3 = axes[1, 0]
-    top = df.nlargest(10, 'popularity')[['clean_name', 'popularity']].sort_values('popularity')
-    ax3.barh(range(len(top)), top['popularity'], color=EMERALD, edgecolor='black')
-    ax3.set_yticks(range(len(top)))
-    ax3.set_yticklabels([n[:25] for n in top['clean_name']], fontsize=9)
-    ax3.set_xlabel('Popularity')
-    ax3.set_title('Top 10 Songs by Popularity')
-    
-    # Plot 4: Duration vs Popularity
-    ax4 = axes[1, 1]
-    ax4.scatter(df['duration_min'], df['popularity'], s=100, alpha=0.6, color=PINK)
-    ax4.set_title('Duration vs Popularity')
-    ax4.set_xlabel('Duration (minutes)')
-    ax4.set_ylabel('Popularity')
-    
-    plt.tight_layout()
-    output = OUTPUT_DIR / 'figures' / 'wicked_analysis.png'
-    plt.savefig(output, dpi=300, bbox_inches='tight')
-    print(f"Saved: {output}")
-    plt.close()
+    specs = dashboard_specs(df, OUTPUT_DIR / 'figures', colors=(EMERALD, PINK))
+    results = render_figures(specs)
+    for spec, status in results:
+        print(f"Saved: {spec.output}" + (" (cached)" if status == 'cached' else ""))
+    current_span().set(figures_rendered=sum(status == 'rendered' for _, status in results))
 
+@instrument()
 def generate_report(df):
     """Generate insights report"""
     print("\nGenerating report...")
@@ -151,6 +118,7 @@ def generate_report(df):
     print("\n" + report)
     print(f"\nSaved: {output}")
 
+@instrument('analyze_real')
 def main():
     print("\n" + "="*70)
     print("WICKED TIKTOK ANALYSIS - REAL DATA")
@@ -161,7 +129,7 @@ def main():
     df = clean_and_merge(spotify, tiktok)
     
     # Save merged data
-    df.to_csv(DATA_DIR / 'processed' / 'wicked_merged.csv', index=False)
+    write_table('merged', df, musical='Wicked')
     print(f"Saved merged data")
     
     # Analyze
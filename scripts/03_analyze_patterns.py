@@ -3,11 +3,24 @@ Analyze patterns between audio features and TikTok performance
 Discover what actually drives virality
 """
 
+import sys
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
-from scipy.stats import spearmanr, pearsonr
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from correlation import correlate
+from compact import compact_frame
+from dataset_store import NO_DATA_EXIT, PARTITION_COLUMN, read_table, write_table, table_source
+from entity_index import MAJOR_CELEBRITIES, EntityIndex
+from instrumentation import instrument
+from resampling import SIGNIFICANCE, correlation_permutation_test, correlation_bootstrap_ci, mean_difference_test
+from title_matching import merge_matched
+from trend_labels import TrendLabelIndex
+from virality import ViralityScorer
+
+PROJECT_ROOT = Path(__file__).parent.parent
+OUTPUT_DIR = PROJECT_ROOT / 'outputs'
 
 WICKED_COLORS = {
     'emerald': '#00A86B',
@@ -17,58 +30,69 @@ WICKED_COLORS = {
     'light_green': '#90EE90'
 }
 
+@instrument()
 def load_data():
     """Load Spotify and TikTok data"""
-    spotify = pd.read_csv('../data/spotify/wicked_audio_features.csv')
+    spotify = read_table('audio_features', musical='Wicked', compact=True)
     
-    try:
-        tiktok = pd.read_csv('../data/tiktok/wicked_tiktok_performance.csv')
-        print("Loaded actual TikTok data")
-    except:
-        tiktok = pd.read_csv('../data/tiktok/wicked_tiktok_performance_EXAMPLE.csv')
+    tiktok = read_table('tiktok_performance', musical='Wicked', compact=True)
+    if 'EXAMPLE' in str(table_source('tiktok_performance')):
         print("Using example TikTok data - replace with real data for final analysis!")
+    else:
+        print("Loaded actual TikTok data")
     
     return spotify, tiktok
 
+@instrument()
 def merge_data(spotify, tiktok):
     """Merge Spotify features with TikTok performance"""
-    merged = spotify.merge(tiktok, left_on='track_name', right_on='song_name', how='inner')
+    # Both tables carry the same musical partition; keep Spotify's
+    tiktok = tiktok.drop(columns=[PARTITION_COLUMN], errors='ignore')
+    merged = merge_matched(spotify, tiktok, left_on='track_name', right_on='song_name')
     
-    merged['virality_score'] = (
-        (merged['tiktok_video_count'] / merged['tiktok_video_count'].max()) * 50 +
-        (merged['tiktok_view_estimate_millions'] / merged['tiktok_view_estimate_millions'].max()) * 30 +
-        (merged['weeks_trending'] / merged['weeks_trending'].max()) * 20
-    ).round(2)
+    scores = ViralityScorer().update(merged).table()
+    merged['virality_score'] = scores['virality_score'].values
+    merged['virality_rank'] = scores['virality_rank'].values
     
-    merged['virality_rank'] = merged['virality_score'].rank(ascending=False).astype(int)
-    
-    return merged
+    return compact_frame(merged)
+
+@instrument()
+def analyze_feature_correlations(df, targets=('virality_score',), max_workers=None):
+    """Analyze which audio features correlate with virality (or other targets)
 
-def analyze_feature_correlations(df):
-    """Analyze which audio features correlate with virality"""
+    With more than one target the table gets a `target` column. `max_workers`
+    caps the resampling process pool (1 runs it in-process).
+    """
     audio_features = ['energy', 'danceability', 'valence', 'tempo', 
                      'acousticness', 'speechiness', 'loudness', 'duration_min']
+    targets = [targets] if isinstance(targets, str) else list(targets)
     
-    correlations = []
-    for feature in audio_features:
-        spearman_corr, spearman_p = spearmanr(df[feature], df['virality_score'])
-        pearson_corr, pearson_p = pearsonr(df[feature], df['virality_score'])
-        
-        correlations.append({
-            'feature': feature,
-            'spearman_correlation': spearman_corr,
-            'spearman_pvalue': spearman_p,
-            'pearson_correlation': pearson_corr,
-            'pearson_pvalue': pearson_p,
-            'significant': 'Yes' if spearman_p < 0.05 else 'No'
-        })
+    corr_df = correlate(df, audio_features, targets)
+    
+    # Asymptotic p-values are unreliable for ~15 songs; resample instead
+    perm_pvalues, ci_low, ci_high = [], [], []
+    for target in targets:
+        perm_pvalues.append(correlation_permutation_test(
+            df[audio_features], df[target], 'spearman', max_workers=max_workers
+        ))
+        low, high = correlation_bootstrap_ci(df[audio_features], df[target], 'spearman', max_workers=max_workers)
+        ci_low.append(low)
+        ci_high.append(high)
+    # correlate() orders rows feature-major, target-minor
+    corr_df['spearman_perm_pvalue'] = np.column_stack(perm_pvalues).ravel()
+    corr_df['spearman_ci_low'] = np.column_stack(ci_low).ravel()
+    corr_df['spearman_ci_high'] = np.column_stack(ci_high).ravel()
+    corr_df['significant'] = np.where(corr_df['spearman_perm_pvalue'] < SIGNIFICANCE, 'Yes', 'No')
+    if len(targets) == 1:
+        corr_df = corr_df.drop(columns='target')
     
-    corr_df = pd.DataFrame(correlations).sort_values('spearman_correlation', ascending=False, key=abs)
+    corr_df = corr_df.sort_values('spearman_correlation', ascending=False, key=abs)
     return corr_df
 
+@instrument()
 def analyze_content_types(df):
     """Analyze which content types performed best"""
-    content_performance = df.groupby('primary_trend_type').agg({
+    content_performance = df.groupby('primary_trend_type', observed=True).agg({
         'virality_score': ['mean', 'count'],
         'tiktok_video_count': 'sum',
         'weeks_trending': 'mean'
@@ -79,6 +103,18 @@ def analyze_content_types(df):
     
     return content_performance
 
+@instrument()
+def analyze_trend_labels(df):
+    """Content type performance per trend label ('Dance / POV' counts for both)"""
+    return TrendLabelIndex.from_series(df['primary_trend_type']).aggregate(df)
+
+@instrument()
+def analyze_entities(df):
+    """Celebrity and creator mentions in the text columns, and virality with vs without each"""
+    entities = EntityIndex.build(df)
+    return entities, entities.effects(df['virality_score'])
+
+@instrument()
 def find_surprising_results(df):
     """Find songs that defied audio feature expectations"""
     df['expected_virality'] = (
@@ -95,7 +131,8 @@ def find_surprising_results(df):
     
     return overperformers, underperformers
 
-def identify_key_insights(df, correlations):
+@instrument()
+def identify_key_insights(df, correlations, entities=None):
     """Generate key insights from the data"""
     insights = []
     
@@ -129,18 +166,24 @@ def identify_key_insights(df, correlations):
         'why': f"Average virality score: {content_perf.iloc[0]['avg_virality_score']:.1f}"
     })
     
-    celebrity_songs = df[df['celebrity_boost'].str.contains('Ariana|Jonathan', na=False)]
+    if entities is None:
+        entities = EntityIndex.build(df)
+    has_celebrity = pd.Series(entities.has(MAJOR_CELEBRITIES, column='celebrity_boost'), index=df.index)
+    celebrity_songs = df[has_celebrity]
     if not celebrity_songs.empty:
         avg_celeb = celebrity_songs['virality_score'].mean()
-        avg_no_celeb = df[~df['celebrity_boost'].str.contains('Ariana|Jonathan', na=False)]['virality_score'].mean()
+        avg_no_celeb = df[~has_celebrity]['virality_score'].mean()
+        effect = mean_difference_test(df['virality_score'], has_celebrity)
         insights.append({
             'insight': 'Celebrity Boost Effect',
             'finding': f"Songs with major celebrity boost: {avg_celeb:.1f} vs {avg_no_celeb:.1f}",
-            'why': f"{(avg_celeb - avg_no_celeb):.1f} point increase in virality score"
+            'why': (f"{(avg_celeb - avg_no_celeb):.1f} point increase in virality score "
+                    f"(95% CI {effect['ci_low']:.1f} to {effect['ci_high']:.1f}, permutation p = {effect['pvalue']:.3f})")
         })
     
     return pd.DataFrame(insights)
 
+@instrument('analyze_patterns')
 def main():
     print("\n" + "="*70)
     print("WICKED RETROSPECTIVE ANALYSIS - PATTERN ANALYSIS")
@@ -151,23 +194,32 @@ def main():
     
     print("Merging datasets...")
     df = merge_data(spotify, tiktok)
+    if df.empty:
+        print("\n✗ No songs with audio features matched the TikTok data - run 01_collect_spotify_data.py first")
+        return None
     
     print("\nAnalyzing audio feature correlations...")
     correlations = analyze_feature_correlations(df)
     
     print("Analyzing content type performance...")
     content_performance = analyze_content_types(df)
+    label_performance = analyze_trend_labels(df)
+    entities, entity_effects = analyze_entities(df)
     
     print("Finding surprising results...")
     overperformers, underperformers = find_surprising_results(df)
     
     print("Generating key insights...")
-    insights = identify_key_insights(df, correlations)
+    insights = identify_key_insights(df, correlations, entities)
     
-    df.to_csv('../data/processed/merged_analysis.csv', index=False)
-    correlations.to_csv('../outputs/tables/feature_correlations.csv', index=False)
-    content_performance.to_csv('../outputs/tables/content_type_performance.csv', index=False)
-    insights.to_csv('../outputs/tables/key_insights.csv', index=False)
+    write_table('merged_analysis', df, musical='Wicked')
+    tables_dir = OUTPUT_DIR / 'tables'
+    tables_dir.mkdir(parents=True, exist_ok=True)
+    correlations.to_csv(tables_dir / 'feature_correlations.csv', index=False)
+    content_performance.to_csv(tables_dir / 'content_type_performance.csv')
+    insights.to_csv(tables_dir / 'key_insights.csv', index=False)
+    label_performance.to_csv(tables_dir / 'trend_label_performance.csv')
+    entity_effects.to_csv(tables_dir / 'entity_effects.csv')
     
     print("\n" + "="*70)
     print("FEATURE CORRELATIONS WITH VIRALITY")
@@ -179,6 +231,16 @@ def main():
     print("="*70)
     print(content_performance)
     
+    print("\n" + "="*70)
+    print("PERFORMANCE BY TREND LABEL")
+    print("="*70)
+    print(label_performance)
+    
+    print("\n" + "="*70)
+    print("VIRALITY BY CELEBRITY / CREATOR MENTION")
+    print("="*70)
+    print(entity_effects.round(2))
+    
     print("\n" + "="*70)
     print("KEY INSIGHTS")
     print("="*70)
@@ -196,4 +258,7 @@ def main():
     return df, correlations, content_performance, insights
 
 if __name__ == "__main__":
-    df, correlations, content_perf, insights = main()
+    results = main()
+    if results is None:
+        sys.exit(NO_DATA_EXIT)
+    df, correlations, content_perf, insights = results
@@ -0,0 +1,260 @@
+"""
+Benchmark the analysis stages on synthetic data from 10^2 to 10^7 rows
+
+Each (stage, size) pair runs in its own child process on tables from
+synthetic_data.py, and reports wall time, CPU time, peak RSS and rows/s.
+Inputs are generated (and cached as Parquet under data/cache/benchmark/)
+before the clock starts. Peak RSS is taken from an instrumentation span
+around the stage, which on Linux resets the peak-RSS counter after setup,
+so the peak is the stage's own. A stage that runs past --timeout or is
+killed (e.g. by the OOM killer) is reported as such instead of stopping
+the suite; that is where it breaks.
+
+Results can be saved as a baseline and later runs compared against it: a
+stage is a regression when its time or peak memory grows by more than
+--threshold (default 25%). The script exits with status 1 on a regression.
+Baselines are machine-specific.
+
+    python scripts/benchmark_analysis.py                           # 1e2 .. 1e7 rows
+    python scripts/benchmark_analysis.py --sizes 1e2,1e3,1e4,1e5   # quick run
+    python scripts/benchmark_analysis.py --sizes 1e2,1e4,1e6 --stages merge_data,analyze_content_types
+    python scripts/benchmark_analysis.py --save-baseline
+    python scripts/benchmark_analysis.py --threshold 0.1
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import multiprocessing
+import queue
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import instrumentation
+import synthetic_data
+from instrumentation import rss_mb, span
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CACHE_DIR = PROJECT_ROOT / 'data' / 'cache' / 'benchmark'
+BASELINE_PATH = PROJECT_ROOT / 'outputs' / 'benchmarks' / 'analysis_baseline.json'
+
+SIZES = [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+TIMEOUT = 300
+THRESHOLD = 0.25
+
+# Timings shorter than this are too noisy to flag as regressions
+MIN_SECONDS = 0.05
+
+
+def synthetic_table(kind, n, seed=0):
+    """synthetic_data.<kind>(n, seed), cached as Parquet"""
+    path = CACHE_DIR / f'{kind}-{n}-{seed}.parquet'
+    if path.exists():
+        return pd.read_parquet(path)
+    df = getattr(synthetic_data, kind)(n, seed)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(path, index=False)
+    return df
+
+
+def _real():
+    return importlib.import_module('03_analyze_REAL_data')
+
+
+def _patterns():
+    return importlib.import_module('03_analyze_patterns')
+
+
+def _merged_real(n, seed):
+    return _real().clean_and_merge(synthetic_table('spotify_tracks', n, seed), synthetic_table('tiktok_performance', n, seed))
+
+
+def _merged_patterns(n, seed):
+    return _patterns().merge_data(synthetic_table('audio_features', n, seed), synthetic_table('tiktok_performance', n, seed))
+
+
+def _create_plots(df):
+    """What create_plots does on a cache miss, written to a scratch directory"""
+    from figures import dashboard_specs, render_figures
+
+    with tempfile.TemporaryDirectory() as tmp:
+        render_figures(dashboard_specs(df, Path(tmp)), cache_dir=Path(tmp) / 'cache')
+
+
+# stage -> (setup(n, seed) -> args, run(*args)); rows are counted from args[0]
+STAGES = {
+    'clean_and_merge': (
+        lambda n, seed: (synthetic_table('spotify_tracks', n, seed), synthetic_table('tiktok_performance', n, seed)),
+        lambda spotify, tiktok: _real().clean_and_merge(spotify, tiktok),
+    ),
+    'merge_data': (
+        lambda n, seed: (synthetic_table('audio_features', n, seed), synthetic_table('tiktok_performance', n, seed)),
+        lambda spotify, tiktok: _patterns().merge_data(spotify, tiktok),
+    ),
+    'analyze_feature_correlations': (
+        lambda n, seed: (_merged_patterns(n, seed),),
+        lambda df: _patterns().analyze_feature_correlations(df),
+    ),
+    'analyze_content_types': (
+        lambda n, seed: (_merged_patterns(n, seed),),
+        lambda df: _patterns().analyze_content_types(df),
+    ),
+    'find_surprising_results': (
+        lambda n, seed: (_merged_patterns(n, seed),),
+        lambda df: _patterns().find_surprising_results(df),
+    ),
+    'create_plots': (
+        lambda n, seed: (_merged_real(n, seed),),
+        _create_plots,
+    ),
+}
+
+
+def _measure(stage, n, seed, results):
+    """Child process: set up, time one stage, put a result row on the queue"""
+    setup, run = STAGES[stage]
+    instrumentation.METRICS_PATH = ''  # the stages' own spans are not part of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        args = setup(n, seed)
+        _patterns(), _real()  # imports are not part of the stage
+
+        rss_before = rss_mb('VmRSS')
+        with span(stage) as measured:
+            wall, cpu = time.perf_counter(), time.process_time()
+            run(*args)
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    rows = len(args[0])
+    results.put({
+        'rows': rows,
+        'seconds': wall,
+        'cpu_seconds': cpu,
+        'peak_rss_mb': measured.peak_rss_mb,
+        'stage_rss_mb': max(0.0, measured.peak_rss_mb - rss_before),
+        'rows_per_s': rows / wall if wall else float('inf'),
+    })
+
+
+def run_stage(stage, n, seed=0, timeout=TIMEOUT):
+    """Measure one stage at one size in a fresh process; returns a result row"""
+    context = multiprocessing.get_context()
+    results = context.Queue()
+    process = context.Process(target=_measure, args=(stage, n, seed, results))
+    process.start()
+    row = {'stage': stage, 'size': n, 'status': 'ok'}
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            row.update(results.get(timeout=0.5))
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                # Give the result a last chance to arrive before calling it a crash
+                try:
+                    row.update(results.get(timeout=1))
+                except queue.Empty:
+                    row['status'] = f'failed ({process.exitcode})'
+                break
+            if time.monotonic() > deadline:
+                row['status'] = 'timeout'
+                break
+    process.join(1)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+    return row
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Result rows that are more than `threshold` slower or larger than the baseline"""
+    regressions = []
+    for row in results:
+        base = baseline.get(f"{row['stage']}@{row['size']}")
+        if base is None:
+            continue
+        if base['status'] != 'ok':
+            continue
+        if row['status'] != 'ok':
+            regressions.append((row, 'status', base['status'], row['status']))
+            continue
+        if row['seconds'] >= MIN_SECONDS and row['seconds'] > base['seconds'] * (1 + threshold):
+            regressions.append((row, 'seconds', base['seconds'], row['seconds']))
+        if row['stage_rss_mb'] > max(base['stage_rss_mb'], 1.0) * (1 + threshold):
+            regressions.append((row, 'stage_rss_mb', base['stage_rss_mb'], row['stage_rss_mb']))
+    return regressions
+
+
+def parse_sizes(text):
+    return [int(float(size)) for size in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analysis stages on synthetic data')
+    parser.add_argument('--sizes', type=parse_sizes, default=SIZES, help='comma-separated row counts, e.g. 1e2,1e5')
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help='seconds per stage and size')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='allowed slowdown, e.g. 0.25 = 25%%')
+    args = parser.parse_args()
+
+    stages = args.stages.split(',')
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    print("\n" + "="*70)
+    print("ANALYSIS SCALE BENCHMARK")
+    print("="*70)
+    print(f"Sizes: {', '.join(f'{n:,}' for n in args.sizes)} rows, timeout {args.timeout:.0f}s\n")
+
+    print(f"{'stage':<30} {'rows':>10} {'seconds':>9} {'cpu s':>8} {'peak MB':>8} {'stage MB':>9} {'rows/s':>11}")
+    results = []
+    for stage in stages:
+        for n in args.sizes:
+            row = run_stage(stage, n, args.seed, args.timeout)
+            results.append(row)
+            if row['status'] == 'ok':
+                print(f"{stage:<30} {row['rows']:>10,} {row['seconds']:>9.3f} {row['cpu_seconds']:>8.2f} "
+                      f"{row['peak_rss_mb']:>8.0f} {row['stage_rss_mb']:>9.0f} {row['rows_per_s']:>11,.0f}")
+            else:
+                print(f"{stage:<30} {n:>10,} {row['status']:>9}")
+            if row['status'] != 'ok':
+                break  # larger sizes will not do better
+
+    baseline = {}
+    if args.baseline.exists():
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    if baseline:
+        print(f"\nCompared with {args.baseline} (threshold {args.threshold:.0%}):")
+        for row, metric, before, after in regressions:
+            if metric == 'status':
+                print(f"  ✗ {row['stage']} @ {row['size']:,}: {before} -> {after}")
+            else:
+                print(f"  ✗ {row['stage']} @ {row['size']:,}: {metric} {before:.3g} -> {after:.3g}")
+        if not regressions:
+            print("  ✓ No regressions")
+
+    if args.save_baseline:
+        baseline.update({f"{row['stage']}@{row['size']}": row for row in results})
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1)
+        print(f"\n✓ Saved baseline to {args.baseline}")
+
+    return results, regressions
+
+
+if __name__ == "__main__":
+    results, regressions = main()
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,90 @@
+"""
+Benchmark Spotify collection throughput against the local fake API
+
+Runs the collector in its per-track, batched and concurrent modes against
+fake_spotify_server and reports requests/s and tracks/s for each. No
+Spotify credentials or network access are needed.
+
+    python scripts/benchmark_collection.py --albums 12 --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import importlib
+import time
+
+from fake_spotify_server import FakeSpotifyServer, synthetic_fixtures, make_client
+from rate_limit import TokenBucket, RateLimitedClient
+
+
+def run_mode(collector, server, albums, mode, rate, workers):
+    """Collect every album in one mode and return a result row"""
+    import requests
+
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=workers))
+    # At least one token, or a rate below 1/s never lets a request through
+    bucket = TokenBucket(rate=rate, capacity=max(1.0, rate))
+    collector.sp = RateLimitedClient(make_client(server.url, session), bucket, name='spotify')
+
+    server.stats.clear()
+    start = time.perf_counter()
+
+    if mode == 'concurrent':
+        results = collector.collect_albums(albums, max_workers=workers)
+        n_tracks = sum(len(df) for df in results.values())
+    else:
+        n_tracks = sum(
+            len(collector.get_album_tracks_with_features(album_id, name, batched=(mode == 'batched')))
+            for name, album_id in albums.items()
+        )
+
+    elapsed = time.perf_counter() - start
+    n_requests = sum(count for endpoint, count in server.stats.items() if endpoint != 'token')
+    return {
+        'mode': mode,
+        'tracks': n_tracks,
+        'requests': n_requests,
+        'seconds': elapsed,
+        'requests_per_s': n_requests / elapsed,
+        'tracks_per_s': n_tracks / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Spotify collection modes')
+    parser.add_argument('--albums', type=int, default=6)
+    parser.add_argument('--tracks-per-album', type=int, default=25)
+    parser.add_argument('--latency', type=float, default=0.02, help='fake server latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of 429 responses')
+    parser.add_argument('--rate', type=float, default=1000, help='token bucket requests/s')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--modes', default='per_track,batched,concurrent')
+    args = parser.parse_args()
+
+    collector = importlib.import_module('01_collect_spotify_data')
+    fixtures = synthetic_fixtures(args.albums, args.tracks_per_album)
+    server = FakeSpotifyServer(
+        fixtures, latency=args.latency, error_rate=args.error_rate, retry_after=1
+    ).start()
+    albums = {f'Musical {i}': album_id for i, album_id in enumerate(fixtures['albums'])}
+
+    print("\n" + "="*70)
+    print("SPOTIFY COLLECTION BENCHMARK")
+    print("="*70)
+    print(f"{args.albums} albums x {args.tracks_per_album} tracks, "
+          f"latency {args.latency * 1000:.0f} ms, 429 rate {args.error_rate:.1%}\n")
+
+    print(f"{'mode':<12} {'tracks':>7} {'requests':>9} {'seconds':>8} {'req/s':>8} {'tracks/s':>9}")
+    results = []
+    for mode in args.modes.split(','):
+        row = run_mode(collector, server, albums, mode, args.rate, args.workers)
+        results.append(row)
+        print(f"{row['mode']:<12} {row['tracks']:>7} {row['requests']:>9} {row['seconds']:>8.2f} "
+              f"{row['requests_per_s']:>8.1f} {row['tracks_per_s']:>9.1f}")
+
+    server.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    results = main()
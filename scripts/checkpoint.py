@@ -0,0 +1,128 @@
+"""
+Per-album checkpoints and incremental refresh for Spotify collection
+
+Each batch of tracks is written to data/spotify/checkpoints/<run>/<album>/
+as soon as it is collected, so an interrupted run picks up where it stopped.
+Batch files are named after a hash of their track ids, which keeps them
+valid even if the set of ids to fetch changes between runs. Checkpoints are
+removed once the collected table has been written to the dataset store
+(Parquet, see dataset_store.write_table).
+
+Each batch records when it was saved. Batches older than STALE_AFTER are
+refetched rather than merged with fresh rows, unless the store is opened
+with resume_stale=True (the collectors' --resume-stale flag).
+"""
+
+import hashlib
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from spotify_batch import chunked, MAX_TRACKS_PER_REQUEST
+from dataset_store import read_table
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CHECKPOINT_DIR = PROJECT_ROOT / 'data' / 'spotify' / 'checkpoints'
+
+# Rows older than this are refetched in incremental mode (popularity drifts)
+STALE_AFTER = timedelta(days=1)
+
+
+class CheckpointStore:
+    """Durable per-album batch storage for one collection run"""
+
+    def __init__(self, run_name, root=CHECKPOINT_DIR, max_age=STALE_AFTER, resume_stale=False):
+        self.dir = Path(root) / run_name
+        self.max_age = max_age
+        self.resume_stale = resume_stale
+
+    def _batch_path(self, album_id, track_ids):
+        digest = hashlib.sha1(','.join(track_ids).encode()).hexdigest()[:16]
+        return self.dir / album_id / f'batch_{digest}.csv'
+
+    def saved_at(self, album_id, track_ids):
+        """When the batch was checkpointed, or None if unknown"""
+        stamp = self._batch_path(album_id, track_ids).with_suffix('.saved_at')
+        try:
+            return datetime.fromisoformat(stamp.read_text().strip())
+        except (OSError, ValueError):
+            return None
+
+    def load_batch(self, album_id, track_ids):
+        """Return the saved rows for this batch, or None if not collected yet or stale"""
+        path = self._batch_path(album_id, track_ids)
+        if not path.exists():
+            return None
+        saved_at = self.saved_at(album_id, track_ids)
+        if saved_at is None or datetime.now() - saved_at > self.max_age:
+            if not self.resume_stale:
+                print(f"  Ignoring stale checkpoint {path.name} (saved {saved_at or 'at an unknown time'})")
+                return None
+            print(f"  Resuming stale checkpoint {path.name} (saved {saved_at or 'at an unknown time'})")
+        try:
+            return pd.read_csv(path)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame()
+
+    def save_batch(self, album_id, track_ids, df):
+        """Write a batch atomically so a crash never leaves half a file"""
+        path = self._batch_path(album_id, track_ids)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        df.to_csv(tmp, index=False)
+        path.with_suffix('.saved_at').write_text(timestamp())
+        os.replace(tmp, path)
+
+    def clear(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def collect_in_batches(store, album_id, track_ids, collect_batch, batch_size=MAX_TRACKS_PER_REQUEST):
+    """Run `collect_batch(ids) -> DataFrame` over chunks, checkpointing each one"""
+    frames = []
+    for batch in chunked(track_ids, batch_size):
+        df = store.load_batch(album_id, batch) if store else None
+        if df is None:
+            df = collect_batch(batch)
+            if store:
+                store.save_batch(album_id, batch, df)
+        else:
+            print(f"  Resumed {len(df)} tracks from checkpoint")
+        frames.append(df)
+
+    frames = [df for df in frames if not df.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def load_existing(table, musical=None):
+    """Load a previous collection output, or None if there is nothing usable"""
+    existing = read_table(table, musical=musical)
+    if existing.empty or 'collected_at' not in existing or existing['collected_at'].isna().all():
+        return None
+    return existing
+
+
+def split_stale(track_ids, existing, max_age=STALE_AFTER):
+    """Split ids into reusable rows from `existing` and ids to refetch
+
+    Returns (fresh_rows, ids_to_fetch). Ids that are new or whose snapshot
+    is older than `max_age` are fetched again.
+    """
+    if existing is None:
+        return pd.DataFrame(), list(track_ids)
+
+    cutoff = datetime.now() - max_age
+    collected_at = pd.to_datetime(existing['collected_at'], errors='coerce')
+    fresh = existing[(collected_at >= cutoff) & existing['track_id'].isin(track_ids)]
+    fresh = fresh.drop_duplicates('track_id')
+
+    fresh_ids = set(fresh['track_id'])
+    return fresh, [track_id for track_id in track_ids if track_id not in fresh_ids]
+
+
+def timestamp():
+    """Snapshot time recorded in the `collected_at` column"""
+    return datetime.now().isoformat(timespec='seconds')
@@ -0,0 +1,253 @@
+"""
+Content-type and celebrity aggregates over tables larger than memory
+
+analyze_content_types and the celebrity-effect insight group the whole
+merged table in memory. This computes the same numbers from a stream of
+chunks: each chunk is reduced to mergeable partial aggregates, partials are
+added together, and the final means are taken at the end. Memory is bounded
+by the chunk size and the number of groups, not by the number of rows, so
+video-level data (one row per TikTok video, carrying its song's
+virality_score) works the same as the per-song table.
+
+Partials per primary_trend_type: sum and count of virality_score and of
+weeks_trending, and the sum of tiktok_video_count. Partials per celebrity
+flag: count, mean and M2 (sum of squared deviations from the mean) of
+virality_score, from which the celebrity effect and a Welch 95% interval
+are derived. Each chunk's M2 is computed around its own mean, and two
+partials are combined with Chan et al.'s pairwise update, so the variance
+does not suffer the cancellation of sum_sq - n * mean^2 when the scores are
+large relative to their spread. (The permutation
+test in identify_key_insights needs every row at once, so it has no
+streaming counterpart.) Means are taken as sum / count after the partials
+are added, so a mean that falls on a rounding boundary can come out 0.01
+away from the in-memory groupby, which sums in a different order.
+
+CSV input is read with pandas in chunks; Parquet files and the partitioned
+store are read in record batches. With max_workers > 1 Parquet files are
+spread over a process pool, and CSV chunks are handed to workers with at
+most two per worker in flight.
+
+    from chunked_aggregation import aggregate_file
+    aggregates = aggregate_file('data/raw/tiktok_videos.parquet', max_workers=4)
+    aggregates.content_type_performance().to_csv('content_type_performance.csv')
+
+    python scripts/chunked_aggregation.py                       # the merged_analysis table
+    python scripts/chunked_aggregation.py videos.csv --chunksize 500000 --workers 4
+"""
+
+import argparse
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from entity_index import MAJOR_CELEBRITIES, EntityIndex
+
+PROJECT_ROOT = Path(__file__).parent.parent
+OUTPUT_DIR = PROJECT_ROOT / 'outputs'
+
+CHUNK_ROWS = 250_000
+COLUMNS = ['primary_trend_type', 'celebrity_boost', 'virality_score', 'tiktok_video_count', 'weeks_trending']
+
+CONTENT_PARTIALS = ['virality_sum', 'virality_count', 'videos_sum', 'weeks_sum', 'weeks_count']
+CELEBRITY_PARTIALS = ['n', 'mean', 'm2']
+
+
+def celebrity_flag(celebrity_boost):
+    """True where celebrity_boost names one of entity_index.MAJOR_CELEBRITIES"""
+    return pd.Series(EntityIndex.from_series(celebrity_boost).has(MAJOR_CELEBRITIES), index=celebrity_boost.index)
+
+
+def merge_moments(a, b):
+    """Combine two (n, mean, m2) frames group by group (Chan et al.)"""
+    a, b = a.align(b, join='outer', fill_value=0.0)
+    n = a['n'] + b['n']
+    delta = b['mean'] - a['mean']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = (b['n'] / n).fillna(0.0)
+        return pd.DataFrame({
+            'n': n,
+            'mean': a['mean'] + delta * weight,
+            'm2': a['m2'] + b['m2'] + delta ** 2 * a['n'] * weight,
+        })[CELEBRITY_PARTIALS]
+
+
+class Aggregates:
+    """Mergeable partial sums and counts; add chunks with update(), partials with merge()"""
+
+    def __init__(self, content=None, celebrity=None):
+        self.content = content if content is not None else pd.DataFrame(columns=CONTENT_PARTIALS, dtype=float)
+        self.celebrity = celebrity if celebrity is not None else pd.DataFrame(columns=CELEBRITY_PARTIALS, dtype=float)
+        self.rows = 0
+
+    @classmethod
+    def from_chunk(cls, chunk):
+        virality = pd.to_numeric(chunk['virality_score'], errors='coerce').astype('float64')
+        weeks = pd.to_numeric(chunk['weeks_trending'], errors='coerce').astype('float64')
+        parts = pd.DataFrame({
+            'virality_sum': virality.fillna(0),
+            'virality_count': virality.notna().astype('float64'),
+            'videos_sum': pd.to_numeric(chunk['tiktok_video_count'], errors='coerce').astype('float64').fillna(0),
+            'weeks_sum': weeks.fillna(0),
+            'weeks_count': weeks.notna().astype('float64'),
+        })
+        content = parts.groupby(chunk['primary_trend_type'].astype(object).to_numpy(), sort=False).sum()
+
+        flags = celebrity_flag(chunk['celebrity_boost']).to_numpy()
+        scored = virality.notna().to_numpy()
+        scores = virality[scored].reset_index(drop=True)
+        groups = scores.groupby(flags[scored], sort=False)
+        deviations = scores - groups.transform('mean')
+        celebrity = pd.DataFrame({
+            'n': groups.size().astype('float64'),
+            'mean': groups.mean(),
+            'm2': (deviations ** 2).groupby(flags[scored], sort=False).sum(),
+        })
+
+        aggregates = cls(content, celebrity)
+        aggregates.rows = len(chunk)
+        return aggregates
+
+    def merge(self, other):
+        """Add another partial into this one"""
+        for name, combine in (('content', lambda a, b: a.add(b, fill_value=0)), ('celebrity', merge_moments)):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            if mine.empty:
+                setattr(self, name, theirs)
+            elif len(theirs):
+                setattr(self, name, combine(mine, theirs))
+        self.rows += other.rows
+        return self
+
+    def update(self, chunk):
+        return self.merge(Aggregates.from_chunk(chunk))
+
+    def content_type_performance(self):
+        """Same table as analyze_content_types: one row per primary_trend_type"""
+        totals = self.content.sort_index()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            performance = pd.DataFrame({
+                'avg_virality_score': totals['virality_sum'] / totals['virality_count'],
+                'num_songs': totals['virality_count'].astype('int64'),
+                'total_videos': totals['videos_sum'].astype('int64'),
+                'avg_weeks_trending': totals['weeks_sum'] / totals['weeks_count'],
+            }).round(2)
+        performance.index.name = 'primary_trend_type'
+        return performance.sort_values('avg_virality_score', ascending=False)
+
+    def celebrity_effect(self):
+        """Mean virality with and without a celebrity boost, or None if either group is empty"""
+        if not {True, False} <= set(self.celebrity.index):
+            return None
+        groups = {}
+        for flag in (True, False):
+            n, mean, m2 = self.celebrity.loc[flag, CELEBRITY_PARTIALS]
+            groups[flag] = (n, mean, m2 / (n - 1) if n > 1 else np.nan)
+        (n1, mean1, var1), (n0, mean0, var0) = groups[True], groups[False]
+        difference = mean1 - mean0
+        stderr = np.sqrt(var1 / n1 + var0 / n0)
+        return {
+            'avg_celebrity': mean1,
+            'avg_no_celebrity': mean0,
+            'difference': difference,
+            'ci_low': difference - 1.96 * stderr,
+            'ci_high': difference + 1.96 * stderr,
+            'n_celebrity': int(n1),
+            'n_no_celebrity': int(n0),
+        }
+
+
+def _parquet_files(path):
+    path = Path(path)
+    return sorted(path.rglob('*.parquet')) if path.is_dir() else [path]
+
+
+def _aggregate_parquet(path, chunksize=CHUNK_ROWS):
+    """Aggregates of one Parquet file, read in record batches"""
+    import pyarrow.parquet as pq
+
+    aggregates = Aggregates()
+    parquet = pq.ParquetFile(path)
+    for batch in parquet.iter_batches(batch_size=chunksize, columns=COLUMNS):
+        aggregates.update(batch.to_pandas())
+    return aggregates
+
+
+def read_csv_chunks(path, chunksize=CHUNK_ROWS):
+    return pd.read_csv(path, usecols=COLUMNS, chunksize=chunksize)
+
+
+def aggregate_file(path, chunksize=CHUNK_ROWS, max_workers=1):
+    """Stream a CSV, a Parquet file or a directory of Parquet files into Aggregates"""
+    path = Path(path)
+    max_workers = max_workers or os.cpu_count()
+    total = Aggregates()
+    is_csv = path.suffix.lower() == '.csv'
+
+    if max_workers <= 1:
+        if is_csv:
+            for chunk in read_csv_chunks(path, chunksize):
+                total.update(chunk)
+        else:
+            for file in _parquet_files(path):
+                total.merge(_aggregate_parquet(file, chunksize))
+        return total
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        if not is_csv:
+            files = _parquet_files(path)
+            for partial in pool.map(_aggregate_parquet, files, [chunksize] * len(files)):
+                total.merge(partial)
+            return total
+
+        # Keep at most two chunks per worker in memory
+        pending = set()
+        for chunk in read_csv_chunks(path, chunksize):
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    total.merge(future.result())
+            pending.add(pool.submit(Aggregates.from_chunk, chunk))
+        for future in pending:
+            total.merge(future.result())
+    return total
+
+
+def main():
+    from dataset_store import table_source
+
+    parser = argparse.ArgumentParser(description='Content-type and celebrity aggregates in bounded memory')
+    parser.add_argument('input', nargs='?', type=Path, help='CSV, Parquet file or Parquet directory (default: merged_analysis)')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help='rows per chunk')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', type=Path, default=OUTPUT_DIR / 'tables' / 'content_type_performance.csv')
+    args = parser.parse_args()
+
+    source = args.input or table_source('merged_analysis')
+    if source is None:
+        parser.error('no input given and no merged_analysis table to read')
+
+    print("\n" + "="*70)
+    print("CHUNKED CONTENT-TYPE AGGREGATION")
+    print("="*70)
+    print(f"Reading {source} in chunks of {args.chunksize:,} rows...")
+
+    aggregates = aggregate_file(source, args.chunksize, args.workers)
+    performance = aggregates.content_type_performance()
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    performance.to_csv(args.output)
+    print(f"✓ {aggregates.rows:,} rows, {len(performance)} content types -> {args.output}")
+    print(performance)
+
+    effect = aggregates.celebrity_effect()
+    if effect is not None:
+        print(f"\nCelebrity boost: {effect['avg_celebrity']:.1f} vs {effect['avg_no_celebrity']:.1f} "
+              f"({effect['difference']:+.1f}, 95% CI {effect['ci_low']:.1f} to {effect['ci_high']:.1f})")
+
+    return performance, effect
+
+
+if __name__ == "__main__":
+    performance, effect = main()
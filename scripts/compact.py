@@ -0,0 +1,175 @@
+"""
+Compact in-memory dtypes for the track and TikTok tables
+
+By default pandas stores every row's string separately and every number as
+64-bit. In these tables most strings repeat (album, artist, release_date and the TikTok
+annotation columns have a few distinct values across thousands of rows), so
+COMPACT_TYPES declares a smaller dtype per column:
+
+- 'category': repeated strings, stored once plus small integer codes (a
+  column with more than CATEGORY_MAX_RATIO distinct values per row is left
+  as strings, since there the codes only add to it; free-text annotations
+  that are mostly distinct per song stay strings this way)
+- int8 / int16 / int32: counts, ranks and enumerations; a column with gaps
+  becomes float64, one whose values do not fit keeps its dtype
+- float32: derived scores that are only reported (match and surprise scores)
+- datetime64[s]: parsed dates
+
+Unique strings (track names, ids, URLs) stay as they are. The audio
+features, view estimate and virality_score stay float64: they feed the
+correlations and resampling tests, whose results should not depend on
+whether a table was compacted.
+Merge suffixes are understood, so album_x is compacted like album.
+
+read_table(..., compact=True) returns compacted tables; from the store the
+categorical columns are read dictionary-encoded, so their strings are never
+materialized one object per row.
+
+    from compact import compact_frame, describe_memory
+    merged = compact_frame(merged)
+    print(describe_memory(merged))
+
+    python scripts/compact.py merged
+"""
+
+import argparse
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+COMPACT_TYPES = {
+    # Repeated strings
+    'musical': 'category',
+    'album': 'category',
+    'artist': 'category',
+    'release_date': 'category',  # year, month or day precision, so not parsed
+    'primary_trend_type': 'category',
+    'celebrity_boost': 'category',
+    'viral_moment': 'category',
+    'notes': 'category',
+
+    # Counts, ranks and enumerations
+    'track_number': 'int16',
+    'duration_ms': 'int32',
+    'popularity': 'int8',
+    'key': 'int8',
+    'mode': 'int8',
+    'time_signature': 'int8',
+    'tiktok_video_count': 'int32',
+    'weeks_trending': 'int16',
+    'virality_rank': 'int32',
+
+    # Reported scores (not analysis inputs)
+    'match_score': 'float32',
+    'expected_virality': 'float32',
+    'surprise_factor': 'float32',
+    'surprise_rank': 'float32',
+
+    # Dates
+    'collected_at': 'datetime64[s]',
+    'peak_trend_date': 'datetime64[s]',
+}
+
+CATEGORY_COLUMNS = [c for c, kind in COMPACT_TYPES.items() if kind == 'category']
+
+CATEGORY_MAX_RATIO = 0.5
+
+
+def compact_type(column, types=COMPACT_TYPES):
+    """Declared compact dtype for a column (merge suffixes ignored), or None"""
+    return types.get(column) or types.get(re.sub(r'_[xy]$', '', column))
+
+
+def _compact_column(values, kind):
+    if kind == 'category':
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Read dictionary-encoded, or a merge kept the other table's categories
+            if values.nunique() > CATEGORY_MAX_RATIO * len(values):
+                return values.astype(values.cat.categories.dtype)
+            return values.cat.remove_unused_categories()
+        if values.nunique() > CATEGORY_MAX_RATIO * len(values):
+            return values
+        return values.astype('category')
+    if kind.startswith('datetime64'):
+        return pd.to_datetime(values, errors='coerce').astype(kind)
+    if kind.startswith('float'):
+        return pd.to_numeric(values, errors='coerce').astype(kind)
+
+    values = pd.to_numeric(values, errors='coerce')
+    if values.isna().any():
+        return values.astype('float64')
+    limits = np.iinfo(kind)
+    if len(values) and (values.min() < limits.min or values.max() > limits.max):
+        return values
+    return values.astype(kind)
+
+
+def compact_frame(df, types=COMPACT_TYPES):
+    """Copy of `df` with every declared column cast to its compact dtype"""
+    df = df.copy()
+    for column in df.columns:
+        kind = compact_type(column, types)
+        if kind is not None and (kind == 'category' or str(df[column].dtype) != kind):
+            df[column] = _compact_column(df[column], kind)
+    return df
+
+
+def _default_bytes(values):
+    """Bytes the column would take with pandas' default dtypes"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        if getattr(pd.Series(['']).dtype, 'storage', None) == 'pyarrow':
+            # Arrow large_string: UTF-8 bytes, an 8-byte offset per row and a validity bitmap
+            sizes = np.array([len(str(c).encode()) for c in categories], dtype=np.int64)
+            overhead = 8 * (len(values) + 1) + (-(-len(values) // 8) if values.isna().any() else 0)
+        else:
+            # An object pointer and a Python string per row
+            sizes = np.array([sys.getsizeof(c) for c in categories], dtype=np.int64)
+            overhead = 8 * len(values)
+        codes = values.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(sizes))
+        return overhead + int(counts @ sizes)
+    if values.dtype.kind in 'iuf':
+        return 8 * len(values)
+    return int(values.memory_usage(deep=True, index=False))
+
+
+def memory_report(df):
+    """Per-column bytes now and with default dtypes (object strings, 64-bit numbers)"""
+    report = pd.DataFrame({
+        'dtype': [str(df[c].dtype) for c in df.columns],
+        'bytes': [int(df[c].memory_usage(deep=True, index=False)) for c in df.columns],
+        'default_bytes': [_default_bytes(df[c]) for c in df.columns],
+    }, index=pd.Index(df.columns, name='column'))
+    report['saved_bytes'] = report['default_bytes'] - report['bytes']
+    return report.sort_values('saved_bytes', ascending=False)
+
+
+def describe_memory(df):
+    """One line: memory now vs with default dtypes"""
+    report = memory_report(df)
+    now, default = report['bytes'].sum(), report['default_bytes'].sum()
+    saved = 1 - now / default if default else 0
+    return f"{now / 1e6:.2f} MB in compact dtypes vs {default / 1e6:.2f} MB by default ({saved:.0%} saved)"
+
+
+def main():
+    from dataset_store import SCHEMAS, read_table
+
+    parser = argparse.ArgumentParser(description='Show how much memory the compact dtypes save')
+    parser.add_argument('tables', nargs='*', default=['merged'], help=f"any of {', '.join(SCHEMAS)}")
+    args = parser.parse_args()
+
+    for name in args.tables:
+        df = read_table(name, compact=True)
+        print("\n" + "="*70)
+        print(f"{name.upper()} ({len(df):,} rows)")
+        print("="*70)
+        print(memory_report(df).to_string())
+        print(f"\n{describe_memory(df)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Typed, columnar dataset store for the pipeline's tables
+
+Each table has an explicit schema and is stored as Parquet under
+data/store/<table>/, partitioned by musical (data/store/<table>/musical=Wicked/).
+Parquet dictionary-encodes repeated strings such as artist, album and
+spotify_url, and reads can project columns and push predicates down to
+partitions and row groups. Files are opened memory-mapped.
+
+Tables that have not been written to the store yet are read from the legacy
+CSV files (e.g. data/spotify/wicked_tracks_REAL.csv) with the same schema
+applied, so existing data keeps working. Hand-edited TikTok sheets stay CSV.
+
+With compact=True tables are returned in the smaller dtypes declared in
+compact.py (categorical strings, downcast numbers).
+
+    from dataset_store import read_table, write_table
+    df = read_table('merged', columns=['clean_name', 'popularity'], musical='Wicked')
+"""
+
+import operator
+from pathlib import Path
+
+import pandas as pd
+
+from compact import CATEGORY_COLUMNS, compact_frame
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DATA_DIR = PROJECT_ROOT / 'data'
+STORE_DIR = DATA_DIR / 'store'
+
+PARTITION_COLUMN = 'musical'
+DEFAULT_MUSICAL = 'Wicked'
+
+# Exit status of a script whose input tables are still empty; the pipeline
+# reports the stage as skipped instead of failed
+NO_DATA_EXIT = 75
+
+# Column name -> logical type ('string', 'int', 'float', 'timestamp')
+SPOTIFY_TRACK_COLUMNS = {
+    'musical': 'string',
+    'track_id': 'string',
+    'track_name': 'string',
+    'track_number': 'int',
+    'duration_ms': 'int',
+    'duration_min': 'float',
+    'artist': 'string',
+    'album': 'string',
+    'popularity': 'int',
+    'release_date': 'string',  # Spotify gives year, month or day precision
+    'spotify_url': 'string',
+    'collected_at': 'timestamp',
+}
+
+AUDIO_FEATURE_COLUMNS = {
+    'musical': 'string',
+    'track_name': 'string',
+    'track_number': 'int',
+    'duration_ms': 'int',
+    'duration_min': 'float',
+    'track_id': 'string',
+    'popularity': 'int',
+    'release_date': 'string',
+    'danceability': 'float',
+    'energy': 'float',
+    'key': 'int',
+    'loudness': 'float',
+    'mode': 'int',
+    'speechiness': 'float',
+    'acousticness': 'float',
+    'instrumentalness': 'float',
+    'liveness': 'float',
+    'valence': 'float',
+    'tempo': 'float',
+    'time_signature': 'int',
+    'collected_at': 'timestamp',
+}
+
+TIKTOK_COLUMNS = {
+    'musical': 'string',
+    'song_name': 'string',
+    'tiktok_video_count': 'int',
+    'tiktok_view_estimate_millions': 'float',
+    'peak_trend_date': 'timestamp',
+    'weeks_trending': 'int',
+    'primary_trend_type': 'string',
+    'viral_moment': 'string',
+    'celebrity_boost': 'string',
+    'notes': 'string',
+}
+
+SCHEMAS = {
+    'spotify_tracks': SPOTIFY_TRACK_COLUMNS,
+    'audio_features': AUDIO_FEATURE_COLUMNS,
+    'tiktok_performance': TIKTOK_COLUMNS,
+    'merged': {**SPOTIFY_TRACK_COLUMNS, 'clean_name': 'string', **TIKTOK_COLUMNS, 'match_score': 'float'},
+    'merged_analysis': {
+        **AUDIO_FEATURE_COLUMNS, **TIKTOK_COLUMNS,
+        'match_score': 'float',
+        'virality_score': 'float',
+        'virality_rank': 'int',
+        'expected_virality': 'float',
+        'surprise_factor': 'float',
+        'surprise_rank': 'float',
+    },
+}
+
+# Where each table lived before the store; the first existing file is used
+LEGACY_CSV = {
+    'spotify_tracks': [DATA_DIR / 'spotify' / 'wicked_tracks_REAL.csv'],
+    'audio_features': [
+        DATA_DIR / 'spotify' / 'wicked_audio_features.csv',
+        DATA_DIR / 'spotify' / 'comparison_musicals.csv',
+    ],
+    'tiktok_performance': [
+        DATA_DIR / 'tiktok' / 'wicked_tiktok_performance.csv',
+        DATA_DIR / 'tiktok' / 'wicked_tiktok_performance_EXAMPLE.csv',
+    ],
+    'merged': [DATA_DIR / 'processed' / 'wicked_merged.csv'],
+    'merged_analysis': [DATA_DIR / 'processed' / 'merged_analysis.csv'],
+}
+
+_ARROW_TYPES = {
+    'string': 'string',
+    'int': 'int64',
+    'float': 'float64',
+    'timestamp': 'timestamp[s]',
+}
+
+_OPERATORS = {
+    '==': operator.eq, '=': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+
+
+def table_path(name):
+    return STORE_DIR / name
+
+
+def arrow_schema(name, columns=None):
+    """pyarrow schema for a table, optionally limited to `columns`"""
+    import pyarrow as pa
+
+    schema = SCHEMAS[name]
+    names = [c for c in schema if columns is None or c in columns]
+    return pa.schema([(c, pa.type_for_alias(_ARROW_TYPES[schema[c]])) for c in names])
+
+
+def apply_schema(df, name):
+    """Coerce declared columns to their schema types; other columns are kept"""
+    df = df.copy()
+    for column, kind in SCHEMAS[name].items():
+        if column not in df.columns:
+            continue
+        if kind == 'timestamp':
+            df[column] = pd.to_datetime(df[column], errors='coerce').astype('datetime64[s]')
+        elif kind == 'int':
+            # Same as Arrow's conversion: int64, or float64 if there are gaps
+            values = pd.to_numeric(df[column], errors='coerce')
+            df[column] = values.astype('int64') if values.notna().all() else values.astype('float64')
+        elif kind == 'float':
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+        else:
+            values = df[column]
+            df[column] = values.where(values.isna(), values.astype(str))
+    return df
+
+
+def write_table(name, df, musical=None):
+    """Write `df` into the store, replacing only the partitions it contains"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = df.copy()
+    if PARTITION_COLUMN not in df.columns:
+        df[PARTITION_COLUMN] = musical or DEFAULT_MUSICAL
+    df = apply_schema(df, name)
+
+    declared = arrow_schema(name, df.columns)
+    extras = [c for c in df.columns if c not in declared.names]
+    schema = declared
+    for field in pa.Schema.from_pandas(df[extras], preserve_index=False) if extras else []:
+        schema = schema.append(field)
+
+    table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        table_path(name),
+        partition_cols=[PARTITION_COLUMN],
+        existing_data_behavior='delete_matching'
+    )
+    return table_path(name)
+
+
+def table_source(name):
+    """Path the table will be read from: the store, a legacy CSV, or None"""
+    if table_path(name).exists():
+        return table_path(name)
+    for path in LEGACY_CSV.get(name, []):
+        if path.exists():
+            return path
+    return None
+
+
+def _filter_frame(df, filters):
+    """Apply [(column, op, value), ...] filters with pandas"""
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        if op == 'in':
+            mask &= df[column].isin(value)
+        elif op == 'not in':
+            mask &= ~df[column].isin(value)
+        else:
+            mask &= _OPERATORS[op](df[column], value)
+    return df[mask.fillna(False)]
+
+
+def read_table(name, columns=None, filters=None, musical=None, compact=False):
+    """Read a table with column projection and predicate pushdown
+
+    `filters` is a list of (column, op, value) tuples, e.g.
+    [('popularity', '>=', 50)]. `musical` is shorthand for a partition filter.
+    compact=True applies compact.COMPACT_TYPES.
+    Returns an empty frame with the table's columns if nothing is stored.
+    """
+    filters = list(filters or [])
+    if musical is not None:
+        filters.append((PARTITION_COLUMN, '==', musical))
+
+    source = table_source(name)
+    if source is None:
+        df = apply_schema(pd.DataFrame(columns=columns or list(SCHEMAS[name])), name)
+        return compact_frame(df) if compact else df
+
+    if source == table_path(name):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(
+            source,
+            columns=columns,
+            filters=filters or None,
+            memory_map=True,
+            read_dictionary=[c for c in CATEGORY_COLUMNS if c in SCHEMAS[name]] if compact else None
+        )
+        df = table.to_pandas()
+        if compact:
+            return compact_frame(df)
+        if PARTITION_COLUMN in df.columns:
+            df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype(str)
+        return df
+
+    # Legacy CSV: same schema, projection and filters, just without pushdown
+    frames = []
+    for path in LEGACY_CSV[name]:
+        if not path.exists():
+            continue
+        try:
+            frames.append(pd.read_csv(path))
+        except pd.errors.EmptyDataError:
+            continue
+        if name != 'audio_features':
+            break  # later files are fallbacks, not extra partitions
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(SCHEMAS[name]))
+
+    if PARTITION_COLUMN not in df.columns:
+        df[PARTITION_COLUMN] = DEFAULT_MUSICAL
+    df = apply_schema(df, name)
+    if filters:
+        df = _filter_frame(df, filters)
+    if columns is not None:
+        # Older CSVs may predate a column; it comes back empty, typed by the schema
+        df = apply_schema(df.reindex(columns=columns), name)
+    if compact:
+        df = compact_frame(df)
+    return df.reset_index(drop=True)
+
+
+def migrate_csv():
+    """Copy every legacy CSV table into the store"""
+    for name in SCHEMAS:
+        if table_path(name).exists():
+            continue
+        df = read_table(name)
+        if len(df):
+            write_table(name, df)
+            print(f"  ✓ {name}: {len(df)} rows")
+
+
+if __name__ == "__main__":
+    print("Migrating CSV tables into the dataset store...")
+    migrate_csv()
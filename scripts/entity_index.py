@@ -0,0 +1,229 @@
+"""
+Celebrity and creator mentions as a sparse song x entity matrix
+
+The free-text columns (celebrity_boost, viral_moment, notes) name
+celebrities and creator communities. Instead of a regex scan per question,
+EntityIndex reads them once:
+
+- every alias of every entity in ENTITIES (plus data/tiktok/entities.csv,
+  if present) is compiled into one multi-pattern matcher: an Aho-Corasick
+  automaton when the optional `pyahocorasick` package is installed,
+  otherwise one regex built from a trie of the aliases, so the regex engine
+  walks shared prefixes once instead of trying each name in turn
+- matching is case-insensitive on word boundaries ('Ariana' matches
+  'Ariana Grande (HUGE)', not 'Arianas'); the automaton also reports
+  overlapping names, the regex the longest name at each position
+- each column is factorized first, so every distinct text is scanned once
+- the result is a CSR matrix with one row per song and one column per
+  entity, so "songs mentioning X" and per-entity effects are lookups and
+  sparse products
+
+    from entity_index import EntityIndex, MAJOR_CELEBRITIES
+    entities = EntityIndex.build(df)
+    has_celebrity = entities.has(MAJOR_CELEBRITIES)
+    entities.effects(df['virality_score'])
+
+entities.csv has the columns entity, kind and alias (one row per alias).
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+PROJECT_ROOT = Path(__file__).parent.parent
+ENTITIES_PATH = PROJECT_ROOT / 'data' / 'tiktok' / 'entities.csv'
+
+TEXT_COLUMNS = ['celebrity_boost', 'viral_moment', 'notes']
+
+# entity -> (kind, aliases)
+ENTITIES = {
+    'Ariana Grande': ('celebrity', ['Ariana Grande', 'Ariana']),
+    'Jonathan Bailey': ('celebrity', ['Jonathan Bailey', 'Jonathan']),
+    'Cynthia Erivo': ('celebrity', ['Cynthia Erivo', 'Cynthia']),
+    'Idina Menzel': ('celebrity', ['Idina Menzel', 'Idina']),
+    'Kristin Chenoweth': ('celebrity', ['Kristin Chenoweth', 'Chenoweth']),
+    'Ethan Slater': ('celebrity', ['Ethan Slater']),
+    'Marissa Bode': ('celebrity', ['Marissa Bode']),
+    'Michelle Yeoh': ('celebrity', ['Michelle Yeoh']),
+    'Jeff Goldblum': ('celebrity', ['Jeff Goldblum', 'Goldblum']),
+    'Bowen Yang': ('celebrity', ['Bowen Yang']),
+    'Lin-Manuel Miranda': ('celebrity', ['Lin-Manuel Miranda', 'Lin Manuel Miranda']),
+    'Hugh Jackman': ('celebrity', ['Hugh Jackman']),
+    'Zendaya': ('celebrity', ['Zendaya']),
+    'Keala Settle': ('celebrity', ['Keala Settle']),
+    'Renee Rapp': ('celebrity', ['Renee Rapp', 'Reneé Rapp']),
+    'Broadway performers': ('community', ['Broadway performers', 'Broadway creators']),
+    'Dance creators': ('community', ['dance creators', 'dance community']),
+    'Comedy creators': ('community', ['comedy creators', 'comedy accounts']),
+    'Theater kids': ('community', ['theater kids', 'theatre kids']),
+    'Edit community': ('community', ['edit community', 'fan edit accounts']),
+    'College influencers': ('community', ['college influencers']),
+    'Mental health influencers': ('community', ['mental health influencers']),
+    'Fashion/beauty creators': ('community', ['fashion/beauty creators', 'fashion creators', 'beauty creators']),
+    'Couple content creators': ('community', ['couple content creators']),
+    'Friendship content creators': ('community', ['friendship content creators']),
+    'Movie reviewers': ('community', ['movie reviewers']),
+}
+
+# The celebrities counted as a "major celebrity boost" in the key insights
+MAJOR_CELEBRITIES = ['Ariana Grande', 'Jonathan Bailey']
+
+
+def load_entities(path=ENTITIES_PATH, entities=ENTITIES):
+    """ENTITIES plus the aliases in entities.csv, if it exists"""
+    entities = {name: (kind, list(aliases)) for name, (kind, aliases) in entities.items()}
+    if Path(path).exists():
+        for row in pd.read_csv(path).itertuples(index=False):
+            kind, aliases = entities.setdefault(row.entity, (row.kind, []))
+            aliases.append(row.alias)
+    return entities
+
+
+def _normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def _trie_pattern(words):
+    """Regex matching any of `words`, with common prefixes factored out"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def pattern(node):
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        group = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{group})?' if '' in node else group
+
+    return pattern(trie)
+
+
+class EntityMatcher:
+    """All aliases compiled into one matcher; find(text) -> set of entity positions"""
+
+    def __init__(self, entities):
+        self.names = list(entities)
+        self.kinds = [kind for kind, _ in entities.values()]
+        self.aliases = {
+            _normalize(alias): position
+            for position, (_, aliases) in enumerate(entities.values())
+            for alias in aliases
+        }
+        try:
+            import ahocorasick
+        except ImportError:
+            self.automaton = None
+            self.regex = re.compile(rf'(?<!\w)(?:{_trie_pattern(self.aliases)})(?!\w)')
+        else:
+            self.automaton = ahocorasick.Automaton()
+            for alias, position in self.aliases.items():
+                self.automaton.add_word(alias, (position, len(alias)))
+            self.automaton.make_automaton()
+
+    def find(self, text):
+        if not isinstance(text, str):
+            return set()
+        text = _normalize(text)
+        if self.automaton is None:
+            return {self.aliases[match.group()] for match in self.regex.finditer(text)}
+
+        found = set()
+        for end, (position, length) in self.automaton.iter(text):
+            start = end - length + 1
+            if (start == 0 or not text[start - 1].isalnum()) and (end + 1 == len(text) or not text[end + 1].isalnum()):
+                found.add(position)
+        return found
+
+
+@lru_cache(maxsize=1)
+def default_matcher():
+    """Matcher for load_entities(), compiled once per process"""
+    return EntityMatcher(load_entities())
+
+
+class EntityIndex:
+    """Sparse (songs x entities) mention matrix, built in one pass over the text columns"""
+
+    def __init__(self, matrix, names, kinds, index=None, columns=None):
+        self.matrix = matrix
+        self.names = list(names)
+        self.kinds = list(kinds)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.index = index if index is not None else pd.RangeIndex(matrix.shape[0])
+        self.columns = columns or {}  # column -> its own mention matrix
+
+    @classmethod
+    def build(cls, df, columns=TEXT_COLUMNS, entities=None):
+        """Match every distinct text of `columns` once"""
+        matcher = default_matcher() if entities is None else EntityMatcher(entities)
+        n_entities = len(matcher.names)
+        by_column = {}
+        for column in [c for c in columns if c in df.columns]:
+            codes, uniques = pd.factorize(df[column].astype(object), use_na_sentinel=True)
+            rows, cols = [], []
+            for row, text in enumerate(uniques):
+                for position in matcher.find(text):
+                    rows.append(row)
+                    cols.append(position)
+            # The extra last row stands for missing text
+            unique_matrix = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=bool), (rows, cols)), shape=(len(uniques) + 1, n_entities)
+            )
+            by_column[column] = unique_matrix[np.where(codes < 0, len(uniques), codes)]
+
+        matrix = sparse.csr_matrix((len(df), n_entities), dtype=bool)
+        for column_matrix in by_column.values():
+            matrix = matrix + column_matrix
+        return cls(matrix.astype(bool).tocsr(), matcher.names, matcher.kinds, df.index, by_column)
+
+    @classmethod
+    def from_series(cls, values, entities=None):
+        values = pd.Series(values)
+        return cls.build(values.to_frame('text'), ['text'], entities)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def has(self, entities, column=None):
+        """Boolean array: songs mentioning any of `entities` (optionally in one column only)"""
+        entities = [entities] if isinstance(entities, str) else entities
+        matrix = self.matrix if column is None else self.columns[column]
+        positions = [self.positions[name] for name in entities]
+        return np.asarray(matrix[:, positions].sum(axis=1)).ravel() > 0
+
+    def counts(self):
+        """Number of songs mentioning each entity"""
+        return pd.Series(
+            np.asarray(self.matrix.sum(axis=0)).ravel(), index=pd.Index(self.names, name='entity')
+        )
+
+    def entities_of(self, position):
+        """Entities mentioned for the song at `position`"""
+        return [self.names[i] for i in self.matrix[position].indices]
+
+    def effects(self, values):
+        """Mean of `values` for songs with and without each entity, one row per mentioned entity"""
+        values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        mentions = self.matrix.astype(np.float64).T
+        count_with = mentions @ present
+        sum_with = mentions @ np.where(present, values, 0)
+        count_without = present.sum() - count_with
+        sum_without = np.nansum(values) - sum_with
+        with np.errstate(invalid='ignore', divide='ignore'):
+            effects = pd.DataFrame({
+                'kind': self.kinds,
+                'songs': count_with.astype('int64'),
+                'mean_with': sum_with / count_with,
+                'mean_without': sum_without / count_without,
+            }, index=pd.Index(self.names, name='entity'))
+        effects['difference'] = effects['mean_with'] - effects['mean_without']
+        return effects[effects['songs'] > 0].sort_values('difference', ascending=False)
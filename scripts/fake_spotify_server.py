@@ -0,0 +1,264 @@
+"""
+Local stand-in for the parts of the Spotify Web API used by the collectors
+
+Serves the client-credentials token endpoint plus `search`, album tracks,
+`track`/`tracks` and `audio-features` from in-memory fixtures, with optional
+latency, random 429 responses and paging. Fixtures can be synthetic or
+replayed from the SQLite response cache written by the real collectors.
+
+    python scripts/fake_spotify_server.py --port 8765 --latency 0.05
+
+Point spotipy at it with make_client(server_url).
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from response_cache import CACHE_PATH
+
+AUDIO_FEATURE_KEYS = ['danceability', 'energy', 'speechiness', 'acousticness',
+                      'instrumentalness', 'liveness', 'valence']
+
+
+def synthetic_fixtures(n_albums=6, tracks_per_album=25, seed=0):
+    """Build albums, full track objects and audio features from a seed"""
+    rng = random.Random(seed)
+    fixtures = {'albums': {}, 'tracks': {}, 'audio_features': {}}
+
+    for a in range(n_albums):
+        album_id = f'album{a:05d}'
+        album = {'id': album_id, 'name': f'Synthetic Cast Recording {a}', 'release_date': '2003-01-01'}
+        items = []
+        for t in range(tracks_per_album):
+            track_id = f'{album_id}track{t:04d}'
+            simple = {
+                'id': track_id,
+                'name': f'Song {t + 1} - From "Musical {a}"',
+                'track_number': t + 1,
+                'duration_ms': rng.randint(60000, 480000),
+                'artists': [{'name': f'Performer {rng.randint(1, 40)}'}],
+            }
+            items.append(simple)
+            fixtures['tracks'][track_id] = {
+                **simple,
+                'popularity': rng.randint(20, 90),
+                'album': {'id': album_id, 'name': album['name'], 'release_date': album['release_date']},
+                'external_urls': {'spotify': f'https://open.spotify.com/track/{track_id}'},
+            }
+            fixtures['audio_features'][track_id] = {
+                'id': track_id,
+                **{key: round(rng.random(), 3) for key in AUDIO_FEATURE_KEYS},
+                'key': rng.randint(0, 11),
+                'mode': rng.randint(0, 1),
+                'loudness': round(rng.uniform(-20, -3), 2),
+                'tempo': round(rng.uniform(60, 180), 1),
+                'time_signature': rng.choice([3, 4]),
+            }
+        fixtures['albums'][album_id] = {**album, 'tracks': items}
+
+    return fixtures
+
+
+def fixtures_from_cache(path=CACHE_PATH):
+    """Replay responses recorded in the collectors' SQLite cache"""
+    fixtures = {'albums': {}, 'tracks': {}, 'audio_features': {}, 'searches': {}}
+    pages = {}
+    db = sqlite3.connect(str(path))
+
+    for endpoint, key, value in db.execute('SELECT endpoint, key, value FROM responses'):
+        value = json.loads(value)
+        if endpoint == 'track' and value:
+            fixtures['tracks'][key.partition('?')[0]] = value
+        elif endpoint == 'audio_features' and value:
+            fixtures['audio_features'][key] = value
+        elif endpoint == 'album_tracks':
+            album_id, limit, offset, market = json.loads(key)
+            pages.setdefault(album_id, {})[offset] = value['items']
+        elif endpoint == 'search':
+            fixtures['searches'][json.loads(key)[0]] = value
+
+    db.close()
+
+    for album_id, album_pages in pages.items():
+        items = [item for offset in sorted(album_pages) for item in album_pages[offset]]
+        fixtures['albums'][album_id] = {'id': album_id, 'name': album_id, 'tracks': items}
+
+    return fixtures
+
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    """HTTP server holding fixtures, fault settings and request counts"""
+
+    daemon_threads = True
+
+    def __init__(self, fixtures, host='127.0.0.1', port=0, latency=0.0,
+                 error_rate=0.0, retry_after=1, page_size=50, seed=0):
+        super().__init__((host, port), FakeSpotifyHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve in a background thread and return self"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def count(self, endpoint):
+        with self.lock:
+            self.stats[endpoint] += 1
+            return self.random.random() < self.error_rate
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if urlparse(self.path).path.rstrip('/') == '/api/token':
+            self.server.count('token')
+            self.send_json({'access_token': 'fake-token', 'token_type': 'Bearer', 'expires_in': 3600})
+        else:
+            self.send_json({'error': {'status': 404, 'message': 'Not found'}}, 404)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if parts[:1] != ['v1'] or len(parts) < 2:
+            return self.send_json({'error': {'status': 404, 'message': 'Not found'}}, 404)
+        parts = parts[1:]
+        endpoint = 'album_tracks' if parts[0] == 'albums' else parts[0].replace('-', '_')
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.count(endpoint):
+            return self.send_json(
+                {'error': {'status': 429, 'message': 'API rate limit exceeded'}},
+                429, {'Retry-After': self.server.retry_after}
+            )
+
+        fixtures = self.server.fixtures
+        if endpoint == 'search':
+            self.send_json(self.search(query))
+        elif endpoint == 'album_tracks' and len(parts) >= 3:
+            album = fixtures['albums'].get(parts[1])
+            if album is None:
+                return self.send_json({'error': {'status': 404, 'message': 'Non existing id'}}, 404)
+            self.send_json(self.page(album['tracks'], query, url.path))
+        elif endpoint in ('tracks', 'audio_features'):
+            table = fixtures['tracks'] if endpoint == 'tracks' else fixtures['audio_features']
+            if len(parts) > 1:
+                item = table.get(parts[1])
+                if item is None:
+                    return self.send_json({'error': {'status': 404, 'message': 'Non existing id'}}, 404)
+                self.send_json(item)
+            else:
+                ids = query.get('ids', '').split(',')
+                self.send_json({endpoint: [table.get(track_id) for track_id in ids]})
+        else:
+            self.send_json({'error': {'status': 404, 'message': 'Not found'}}, 404)
+
+    def page(self, items, query, path):
+        """Spotify-style paging object with a `next` link"""
+        limit = min(int(query.get('limit', 20)), self.server.page_size)
+        offset = int(query.get('offset', 0))
+        next_url = None
+        if offset + limit < len(items):
+            next_url = f'{self.server.url}{path}?limit={limit}&offset={offset + limit}'
+        return {
+            'items': items[offset:offset + limit],
+            'limit': limit,
+            'offset': offset,
+            'total': len(items),
+            'next': next_url,
+        }
+
+    def search(self, query):
+        recorded = self.server.fixtures.get('searches', {}).get(query.get('q'))
+        if recorded is not None:
+            return recorded
+        albums = [
+            {'id': album['id'], 'name': album['name']}
+            for album in self.server.fixtures['albums'].values()
+            if query.get('q', '').lower() in album['name'].lower()
+        ] or [
+            {'id': album['id'], 'name': album['name']}
+            for album in self.server.fixtures['albums'].values()
+        ]
+        return {'albums': self.page(albums, query, '/v1/search')}
+
+
+def make_client(server_url, requests_session=True):
+    """spotipy client that talks to a FakeSpotifyServer"""
+    import spotipy
+    from spotipy.oauth2 import SpotifyClientCredentials
+    from spotipy.cache_handler import MemoryCacheHandler
+
+    auth_manager = SpotifyClientCredentials(
+        client_id='fake-client-id',
+        client_secret='fake-client-secret',
+        cache_handler=MemoryCacheHandler()
+    )
+    auth_manager.OAUTH_TOKEN_URL = f'{server_url}/api/token'
+
+    client = spotipy.Spotify(auth_manager=auth_manager, requests_session=requests_session)
+    client.prefix = f'{server_url}/v1/'
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a fake Spotify Web API server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--albums', type=int, default=6)
+    parser.add_argument('--tracks-per-album', type=int, default=25)
+    parser.add_argument('--from-cache', action='store_true', help='replay the local response cache')
+    args = parser.parse_args()
+
+    fixtures = fixtures_from_cache() if args.from_cache else synthetic_fixtures(args.albums, args.tracks_per_album)
+    server = FakeSpotifyServer(
+        fixtures, port=args.port, latency=args.latency,
+        error_rate=args.error_rate, retry_after=args.retry_after
+    )
+    print(f"Fake Spotify API on {server.url} "
+          f"({len(fixtures['albums'])} albums, {len(fixtures['tracks'])} tracks)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
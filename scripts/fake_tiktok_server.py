@@ -0,0 +1,196 @@
+"""
+Local fixture server for TikTok search and sound pages
+
+Serves saved HTML from data/tiktok/fixtures/ so the scraper can be developed
+and benchmarked offline:
+
+    fixtures/search/<slug>.html   answers /search?q=<title>
+    fixtures/music/<sound_id>.html answers /music/<anything>-<sound_id>
+
+write_synthetic_fixtures() creates pages for every song in the example
+TikTok data, shaped like TikTok's own markup (a rehydration JSON script plus
+the visible video count). Responses are streamed in small chunks with an
+optional delay so incremental parsing and connection pooling are exercised.
+
+    python scripts/fake_tiktok_server.py --port 8766 --synthesize
+"""
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent
+FIXTURE_DIR = PROJECT_ROOT / 'data' / 'tiktok' / 'fixtures'
+
+CHUNK_SIZE = 4096
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>{title} | TikTok</title>
+<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">{data}</script>
+</head><body>
+<h1 data-e2e="music-title">{title}</h1>
+<strong data-e2e="music-video-count">{video_label} videos</strong>
+{filler}
+</body></html>
+"""
+
+SEARCH_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>{query} | TikTok Search</title></head><body>
+<div data-e2e="search-music-container">
+{links}
+</div>
+{filler}
+</body></html>
+"""
+
+
+def slugify(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def format_count(n):
+    """TikTok-style short count, e.g. 287.0K"""
+    for value, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        if n >= value:
+            return f'{n / value:.1f}{suffix}'
+    return str(int(n))
+
+
+def write_synthetic_fixtures(performance=None, directory=FIXTURE_DIR, top_videos=30, seed=0):
+    """Write a search page and a sound page for every song in `performance`"""
+    if performance is None:
+        performance = pd.read_csv(PROJECT_ROOT / 'data' / 'tiktok' / 'wicked_tiktok_performance_EXAMPLE.csv')
+    rng = np.random.default_rng(seed)
+    directory = Path(directory)
+    (directory / 'search').mkdir(parents=True, exist_ok=True)
+    (directory / 'music').mkdir(parents=True, exist_ok=True)
+
+    # Real pages carry a lot of unrelated markup after the data we need
+    filler = '<div class="feed-item">' + 'x' * 200 + '</div>\n'
+
+    for i, row in enumerate(performance.itertuples(index=False)):
+        sound_id = str(7_300_000_000_000_000_000 + i)
+        title = row.song_name
+        videos = int(row.tiktok_video_count)
+        plays = rng.lognormal(mean=np.log(row.tiktok_view_estimate_millions * 1e6 / max(videos, 1) * 20),
+                              sigma=1.0, size=top_videos).astype(int)
+        data = {'__DEFAULT_SCOPE__': {'webapp.music-detail': {
+            'musicInfo': {
+                'music': {'id': sound_id, 'title': title},
+                'stats': {'videoCount': videos},
+            },
+            'itemList': [{'id': str(j), 'stats': {'playCount': int(p)}} for j, p in enumerate(plays)],
+        }}}
+        (directory / 'music' / f'{sound_id}.html').write_text(PAGE_TEMPLATE.format(
+            title=title, data=json.dumps(data), video_label=format_count(videos), filler=filler * 200
+        ))
+
+        link = f'<a href="/music/{slugify(title)}-{sound_id}">{title}</a>'
+        (directory / 'search' / f'{slugify(title)}.html').write_text(SEARCH_TEMPLATE.format(
+            query=title, links=link, filler=filler * 50
+        ))
+
+    return directory
+
+
+class FakeTikTokServer(ThreadingHTTPServer):
+    """Serves fixture pages with optional latency and counts requests"""
+
+    daemon_threads = True
+
+    def __init__(self, directory=FIXTURE_DIR, host='127.0.0.1', port=0, latency=0.0, chunk_delay=0.0):
+        super().__init__((host, port), FakeTikTokHandler)
+        self.directory = Path(directory)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve in a background thread and return self"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def handle_error(self, request, client_address):
+        # The scraper hangs up as soon as it has parsed what it needs
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+class FakeTikTokHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        url = urlparse(self.path)
+        path = None
+        if url.path.rstrip('/') == '/search':
+            query = parse_qs(url.query).get('q', [''])[0]
+            path = self.server.directory / 'search' / f'{slugify(query)}.html'
+        elif url.path.startswith('/music/'):
+            sound_id = url.path.rstrip('/').rsplit('-', 1)[-1]
+            path = self.server.directory / 'music' / f'{sound_id}.html'
+
+        if path is None or not path.exists():
+            body = b'<html><body>Not found</body></html>'
+            self.send_response(404)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        body = path.read_bytes()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            for start in range(0, len(body), CHUNK_SIZE):
+                self.wfile.write(body[start:start + CHUNK_SIZE])
+                if self.server.chunk_delay:
+                    time.sleep(self.server.chunk_delay)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve saved TikTok pages for offline scraping')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--chunk-delay', type=float, default=0.0)
+    parser.add_argument('--synthesize', action='store_true', help='write pages from the example data first')
+    args = parser.parse_args()
+
+    if args.synthesize:
+        write_synthetic_fixtures()
+    server = FakeTikTokServer(port=args.port, latency=args.latency, chunk_delay=args.chunk_delay)
+    print(f"Fake TikTok pages on {server.url} from {server.directory}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Cached, parallel figure rendering
+
+A figure is described by a FigureSpec: the function that draws it, the
+columns it plots and its styling. The spec's key is a sha256 of the drawing
+function's source, the plotted data, the options, size, dpi and matplotlib
+style. Rendered PNGs are kept in data/cache/figures/<key>.png, so a figure
+whose data and styling are unchanged is copied from the cache instead of
+being drawn and encoded again. Every use touches the cached PNG, and once
+the cache grows past MAX_CACHE_BYTES the least recently used PNGs are
+deleted.
+
+Figures that do need drawing are rendered in worker processes. Drawing uses
+matplotlib's object-oriented Figure with the Agg canvas, never pyplot, so
+no interactive backend or global figure state is involved.
+
+    from figures import dashboard_specs, render_figures
+    render_figures(dashboard_specs(merged, OUTPUT_DIR / 'figures', by='musical'))
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CACHE_DIR = PROJECT_ROOT / 'data' / 'cache' / 'figures'
+
+MAX_CACHE_BYTES = 100 * 1024 * 1024
+
+DPI = 300
+STYLE = 'seaborn-v0_8-darkgrid'
+
+# Wicked colors
+EMERALD = '#00A86B'
+PINK = '#E91E8C'
+
+
+@dataclass
+class FigureSpec:
+    name: str
+    draw: object  # draw(fig, data, **options), a module-level function
+    data: pd.DataFrame
+    output: Path
+    options: dict = field(default_factory=dict)
+    figsize: tuple = (15, 12)
+    dpi: int = DPI
+    style: str = STYLE
+
+    def key(self):
+        """Hash of everything that affects the rendered PNG"""
+        import matplotlib
+
+        digest = hashlib.sha256()
+        try:
+            digest.update(inspect.getsource(self.draw).encode())
+        except (OSError, TypeError):
+            digest.update(f'{self.draw.__module__}.{self.draw.__qualname__}'.encode())
+        digest.update(json.dumps(
+            [list(self.data.columns), [str(t) for t in self.data.dtypes], self.options,
+             list(self.figsize), self.dpi, self.style, matplotlib.__version__],
+            sort_keys=True, default=str
+        ).encode())
+        digest.update(pd.util.hash_pandas_object(self.data, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '_', str(name).lower()).strip('_')
+
+
+def render(spec, path):
+    """Draw one figure and save it as PNG at `path`"""
+    from matplotlib import style
+    from matplotlib.figure import Figure
+
+    with style.context(spec.style):
+        fig = Figure(figsize=spec.figsize)
+        spec.draw(fig, spec.data, **spec.options)
+        tmp = Path(path).with_suffix('.tmp.png')
+        fig.savefig(tmp, dpi=spec.dpi, bbox_inches='tight')
+    os.replace(tmp, path)
+    return path
+
+
+def prune_cache(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, keep=()):
+    """Delete least recently used PNGs until the cache is under 90% of max_bytes
+
+    Files in `keep` are never deleted. Returns the deleted paths.
+    """
+    entries = []
+    for path in Path(cache_dir).glob('*.png'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return []
+
+    keep = {Path(p) for p in keep}
+    target = max_bytes * 0.9
+    deleted = []
+    for _, size, path in sorted(entries, key=lambda entry: entry[:2]):
+        if total <= target:
+            break
+        if path in keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
+        deleted.append(path)
+    return deleted
+
+
+def render_figures(specs, max_workers=None, cache_dir=CACHE_DIR, max_cache_bytes=MAX_CACHE_BYTES):
+    """Render every spec, skipping those already in the cache
+
+    Returns [(spec, 'cached' | 'rendered'), ...] in the order given.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cached_paths = [cache_dir / f'{spec.key()}.png' for spec in specs]
+
+    # Specs with the same key are drawn once
+    to_render = {path: spec for spec, path in zip(specs, cached_paths) if not path.exists()}
+    max_workers = min(max_workers or os.cpu_count(), len(to_render))
+    if max_workers <= 1:
+        for path, spec in to_render.items():
+            render(spec, path)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(render, to_render.values(), to_render.keys()))
+
+    results = []
+    for spec, path in zip(specs, cached_paths):
+        output = Path(spec.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, output)
+        os.utime(path)
+        results.append((spec, 'rendered' if path in to_render else 'cached'))
+    prune_cache(cache_dir, max_cache_bytes, keep=cached_paths)
+    return results
+
+
+def draw_dashboard(fig, df, title, label='clean_name', colors=(EMERALD, PINK)):
+    """2x2 dashboard: popularity histogram, popularity vs TikTok, top songs, duration"""
+    primary, accent = colors
+    axes = fig.subplots(2, 2)
+    fig.suptitle(title, fontsize=16, fontweight='bold')
+
+    # Plot 1: Popularity histogram
+    ax1 = axes[0, 0]
+    ax1.hist(df['popularity'], bins=15, color=primary, edgecolor='black', alpha=0.7)
+    ax1.set_title('Spotify Popularity Distribution')
+    ax1.set_xlabel('Popularity Score')
+    ax1.set_ylabel('Count')
+    ax1.axvline(df['popularity'].mean(), color=accent, linestyle='--', linewidth=2)
+
+    # Plot 2: Popularity vs TikTok
+    ax2 = axes[0, 1]
+    if 'tiktok_video_count' in df.columns:
+        ax2.scatter(df['popularity'], df['tiktok_video_count'], s=100, alpha=0.6, color=primary)
+        ax2.set_title('Popularity vs TikTok Videos')
+        ax2.set_xlabel('Spotify Popularity')
+        ax2.set_ylabel('TikTok Videos')
+
+    # Plot 3: Top songs
+    ax3 = axes[1, 0]
+    top = df.nlargest(10, 'popularity')[[label, 'popularity']].sort_values('popularity')
+    ax3.barh(range(len(top)), top['popularity'], color=primary, edgecolor='black')
+    ax3.set_yticks(range(len(top)))
+    ax3.set_yticklabels([str(n)[:25] for n in top[label]], fontsize=9)
+    ax3.set_xlabel('Popularity')
+    ax3.set_title('Top 10 Songs by Popularity')
+
+    # Plot 4: Duration vs Popularity
+    ax4 = axes[1, 1]
+    ax4.scatter(df['duration_min'], df['popularity'], s=100, alpha=0.6, color=accent)
+    ax4.set_title('Duration vs Popularity')
+    ax4.set_xlabel('Duration (minutes)')
+    ax4.set_ylabel('Popularity')
+
+    fig.tight_layout()
+
+
+def dashboard_specs(df, output_dir, by=None, musical='Wicked', label='clean_name', **options):
+    """One dashboard spec for `musical`, or one per value of the `by` column
+
+    Outputs are <output_dir>/<slug>_analysis.png, e.g. wicked_analysis.png.
+    """
+    columns = [c for c in ('popularity', 'tiktok_video_count', label, 'duration_min') if c in df.columns]
+    groups = df.groupby(by, sort=True, observed=True) if by else [(musical, df)]
+    return [
+        FigureSpec(
+            name=f'{name} dashboard',
+            draw=draw_dashboard,
+            data=group[columns].reset_index(drop=True),
+            output=Path(output_dir) / f'{slugify(name)}_analysis.png',
+            options={'title': f'{name} Analysis - Real Spotify Data', 'label': label, **options},
+        )
+        for name, group in groups
+    ]
@@ -0,0 +1,319 @@
+"""
+Named spans with timings, memory, row counts and API request metrics
+
+Wrap a stage in a span and a JSON line is appended to the metrics file
+(data/cache/metrics/spans.jsonl) when it finishes:
+
+    {"run_id": "...", "span": "merge_data", "parent": "analyze_patterns",
+     "wall_s": 0.41, "cpu_s": 0.39, "peak_rss_mb": 212.0, "rows_in": 82,
+     "rows_out": 82, "requests": {"spotify.tracks": {"count": 2, ...}}, ...}
+
+- wall_s / cpu_s: perf_counter and process CPU time (all threads)
+- peak_rss_mb: the process's peak RSS while the span was open (Linux; on
+  other platforms the process-lifetime peak)
+- rows_in / rows_out: len() of the first DataFrame argument and of a
+  DataFrame result, or whatever the stage sets on the span
+- requests: per-endpoint count, errors and latency (mean, p50, p95, max
+  in ms) of the API calls made by any thread while the span was open.
+  Spotify calls are recorded by RateLimitedClient (so cache hits are not
+  counted), TikTok pages by tiktok_scraper (latency to the response
+  headers).
+
+Every process of one run shares a run_id: it is taken from METRICS_RUN_ID
+if set (pipeline.py sets it for its stages), otherwise made up at import.
+Set METRICS_PATH to write elsewhere, or to an empty string to turn the
+metrics off.
+
+Set PROFILE_SPAN to a span name to run that stage under cProfile; the
+stats are dumped to data/cache/profiles/<span>-<run_id>.prof, which
+`python -m pstats`, snakeviz or flameprof (flamegraphs) can read. Only the
+thread that opens the span is profiled.
+
+    from instrumentation import instrument, span
+
+    @instrument()
+    def merge_data(spotify, tiktok): ...
+
+    with span('load_data') as s:
+        df = read_table('merged')
+        s.rows_out = len(df)
+
+    python scripts/instrumentation.py                 # last run's spans
+    python scripts/instrumentation.py --compare 2     # vs the run before
+"""
+
+import argparse
+import cProfile
+import functools
+import inspect
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent
+METRICS_DIR = PROJECT_ROOT / 'data' / 'cache' / 'metrics'
+PROFILE_DIR = PROJECT_ROOT / 'data' / 'cache' / 'profiles'
+
+METRICS_PATH = os.environ.get('METRICS_PATH', str(METRICS_DIR / 'spans.jsonl'))
+RUN_ID = os.environ.get('METRICS_RUN_ID') or f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+PROFILE_SPAN = os.environ.get('PROFILE_SPAN')
+
+_lock = threading.Lock()
+_local = threading.local()
+_open_spans = set()
+_requests = {}  # endpoint -> [(seconds, ok), ...] for the life of the process
+_profiling = False
+
+
+def rss_mb(field='VmRSS'):
+    """VmRSS / VmHWM of this process in MB (Linux), else ru_maxrss"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale / 1024
+
+
+def reset_peak_rss():
+    """Make VmHWM start again from the current RSS (Linux only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def record_request(endpoint, seconds, ok=True):
+    """Count one API call against every span open in this process"""
+    with _lock:
+        _requests.setdefault(endpoint, []).append((seconds, ok))
+
+
+def _request_marks():
+    with _lock:
+        return {endpoint: len(calls) for endpoint, calls in _requests.items()}
+
+
+def _request_summary(marks):
+    """Per-endpoint stats for the calls recorded since `marks`"""
+    with _lock:
+        new = {endpoint: calls[marks.get(endpoint, 0):] for endpoint, calls in _requests.items()}
+    summary = {}
+    for endpoint, calls in sorted(new.items()):
+        if not calls:
+            continue
+        latency = np.array([seconds for seconds, _ in calls]) * 1000
+        summary[endpoint] = {
+            'count': len(calls),
+            'errors': sum(not ok for _, ok in calls),
+            'mean_ms': round(float(latency.mean()), 2),
+            'p50_ms': round(float(np.percentile(latency, 50)), 2),
+            'p95_ms': round(float(np.percentile(latency, 95)), 2),
+            'max_ms': round(float(latency.max()), 2),
+        }
+    return summary
+
+
+def _fold_peak():
+    """Credit the peak since the last reset to every open span, then reset
+
+    Called whenever a span opens or closes, so each span's peak covers
+    exactly the time it was open, even with nested or concurrent spans.
+    """
+    peak = rss_mb('VmHWM')
+    for open_span in _open_spans:
+        open_span.peak_rss_mb = max(open_span.peak_rss_mb, peak)
+    reset_peak_rss()
+
+
+class Span:
+    """One timed stage; set rows_in / rows_out or extra fields while it is open"""
+
+    def __init__(self, name, parent=None, **fields):
+        self.name = name
+        self.parent = parent
+        self.fields = fields
+        self.rows_in = None
+        self.rows_out = None
+        self.peak_rss_mb = 0.0
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def record(self, status, wall, cpu, requests):
+        return {
+            'run_id': RUN_ID,
+            'span': self.name,
+            'parent': self.parent,
+            'pid': os.getpid(),
+            'started_at': self.started_at,
+            'status': status,
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'requests': requests,
+            **self.fields,
+        }
+
+
+def write_record(record, path=None):
+    """Append one JSON line to the metrics file (no-op when metrics are off)"""
+    path = METRICS_PATH if path is None else path
+    if not path:
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = json.dumps(record, default=str) + '\n'
+    with _lock, open(path, 'a') as f:
+        f.write(line)
+
+
+@contextmanager
+def span(name, **fields):
+    """Time the block as span `name` and write its metrics when it ends"""
+    global _profiling
+
+    stack = _local.__dict__.setdefault('stack', [])
+    current = Span(name, parent=stack[-1].name if stack else None, **fields)
+    current.started_at = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+    with _lock:
+        _fold_peak()
+        _open_spans.add(current)
+    marks = _request_marks()
+
+    profiler = None
+    if name == PROFILE_SPAN and not _profiling:
+        _profiling = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    stack.append(current)
+    status = 'ok'
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield current
+    except BaseException as e:
+        status = f'error: {type(e).__name__}'
+        raise
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        stack.pop()
+        if profiler is not None:
+            profiler.disable()
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(PROFILE_DIR / f'{name}-{RUN_ID}.prof')
+            _profiling = False
+        with _lock:
+            _fold_peak()
+            _open_spans.discard(current)
+        write_record(current.record(status, wall, cpu, _request_summary(marks)))
+
+
+def current_span():
+    """The innermost span open in this thread, or None"""
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+
+def instrument(name=None, fields=()):
+    """Decorator: run the function in a span, counting DataFrame rows in and out
+
+    The values of the arguments named in `fields` are added to the record,
+    e.g. @instrument(fields=['musical_name']).
+    """
+
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs).arguments if fields else {}
+            with span(name or fn.__name__, **{f: bound.get(f) for f in fields}) as current:
+                if args and isinstance(args[0], pd.DataFrame):
+                    current.rows_in = len(args[0])
+                result = fn(*args, **kwargs)
+                if isinstance(result, pd.DataFrame) and current.rows_out is None:
+                    current.rows_out = len(result)
+                return result
+
+        return wrapper
+
+    return decorate
+
+
+def load_records(path=None):
+    """Every span record in the metrics file as a DataFrame"""
+    path = Path(METRICS_PATH if path is None else path)
+    if not path.exists():
+        return pd.DataFrame()
+    with open(path) as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def summarize(records, run_id):
+    """Total wall/CPU time, peak memory, rows and requests per span for one run"""
+    run = records[records['run_id'] == run_id].copy()
+    run['requests'] = run['requests'].map(lambda r: sum(e['count'] for e in r.values()) if r else 0)
+    return run.groupby('span', sort=False).agg(
+        calls=('span', 'size'),
+        wall_s=('wall_s', 'sum'),
+        cpu_s=('cpu_s', 'sum'),
+        peak_rss_mb=('peak_rss_mb', 'max'),
+        rows_in=('rows_in', 'max'),
+        rows_out=('rows_out', 'max'),
+        requests=('requests', 'sum'),
+        status=('status', lambda s: 'ok' if (s == 'ok').all() else s[s != 'ok'].iloc[0]),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the span metrics of recent runs')
+    parser.add_argument('--path', default=METRICS_PATH)
+    parser.add_argument('--run', help='run id (default: the latest)')
+    parser.add_argument('--compare', type=int, metavar='N', help='compare with the run N runs before')
+    args = parser.parse_args()
+
+    records = load_records(args.path)
+    if records.empty:
+        print(f"No metrics in {args.path}")
+        return None
+    runs = list(dict.fromkeys(records.sort_values('started_at')['run_id']))
+    run_id = args.run or runs[-1]
+
+    print("\n" + "="*70)
+    print(f"SPAN METRICS - RUN {run_id}")
+    print("="*70)
+    summary = summarize(records, run_id)
+    if args.compare:
+        position = runs.index(run_id) - args.compare
+        if position < 0:
+            print(f"✗ Only {runs.index(run_id)} earlier run(s) recorded")
+        else:
+            before = summarize(records, runs[position])
+            summary['wall_s_before'] = before['wall_s'].reindex(summary.index)
+            summary['wall_change'] = (summary['wall_s'] / summary['wall_s_before'] - 1).map(
+                lambda change: '' if pd.isna(change) else f'{change:+.0%}'
+            )
+            print(f"Compared with run {runs[position]}")
+    print(summary.round(3).to_string())
+    return summary
+
+
+if __name__ == "__main__":
+    summary = main()
@@ -0,0 +1,183 @@
+"""
+Run the pattern analysis for every musical in the catalog
+
+Audio features and TikTok performance are split by `musical` and each
+musical is analysed on its own by a worker process: title-matched merge,
+virality scoring, feature correlations, content types and surprises (the
+same functions 03_analyze_patterns.py runs for Wicked). Titles are only
+matched within a musical, so two shows with a song called "Finale" never
+get joined.
+
+The per-musical results are concatenated into cross-musical tables under
+outputs/tables/:
+
+- cross_musical_summary.csv: one row per musical
+- cross_musical_correlations.csv: feature correlations, with a musical column
+- cross_musical_content_types.csv: content type performance per musical
+- cross_musical_surprises.csv: over- and underperformers per musical
+
+With --figures each musical also gets a dashboard in outputs/figures/
+(rendered in parallel and cached by figures.py).
+
+Musicals are submitted largest first so one big show does not finish last
+on an otherwise idle pool. Each worker runs its resampling in-process,
+so the pool is the only level of parallelism.
+
+    python scripts/multi_musical.py
+    python scripts/multi_musical.py --musicals Wicked Hamilton --workers 4
+    python scripts/multi_musical.py --figures
+"""
+
+import argparse
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from compact import describe_memory
+from dataset_store import read_table
+from figures import dashboard_specs, render_figures
+from instrumentation import instrument
+
+PROJECT_ROOT = Path(__file__).parent.parent
+OUTPUT_DIR = PROJECT_ROOT / 'outputs'
+
+# Fewer merged songs than this and correlations are not computed
+MIN_SONGS = 4
+
+TABLES = ('summary', 'correlations', 'content_types', 'surprises')
+FIGURE_COLUMNS = ['musical', 'track_name', 'popularity', 'duration_min', 'tiktok_video_count']
+
+
+@instrument(fields=['musical'])
+def analyze_musical(musical, spotify, tiktok):
+    """Merge, score and analyse one musical; returns a dict of frames"""
+    patterns = importlib.import_module('03_analyze_patterns')
+
+    merged = patterns.merge_data(spotify, tiktok) if len(spotify) and len(tiktok) else pd.DataFrame()
+    summary = {
+        'musical': musical,
+        'spotify_tracks': len(spotify),
+        'tiktok_songs': len(tiktok),
+        'matched_songs': len(merged),
+    }
+    results = dict.fromkeys(TABLES + ('figure_data',))
+
+    if len(merged):
+        top = merged.loc[merged['virality_score'].idxmax()]
+        summary.update({
+            'most_viral_song': top['track_name'],
+            'top_virality_score': top['virality_score'],
+            'avg_virality_score': round(merged['virality_score'].mean(), 2),
+            'total_videos': merged['tiktok_video_count'].sum(),
+        })
+
+        content = patterns.analyze_content_types(merged).reset_index()
+        content.insert(0, 'musical', musical)
+        results['content_types'] = content
+
+        overperformers, underperformers = patterns.find_surprising_results(merged)
+        surprises = pd.concat([
+            overperformers.assign(kind='overperformer'),
+            underperformers.assign(kind='underperformer'),
+        ], ignore_index=True)
+        surprises.insert(0, 'musical', musical)
+        results['surprises'] = surprises
+        results['figure_data'] = merged.reindex(columns=FIGURE_COLUMNS).assign(musical=musical)
+
+    if len(merged) >= MIN_SONGS:
+        correlations = patterns.analyze_feature_correlations(merged, max_workers=1)
+        correlations.insert(0, 'musical', musical)
+        results['correlations'] = correlations
+        top_feature = correlations.iloc[0]
+        summary.update({
+            'top_feature': top_feature['feature'],
+            'top_feature_correlation': top_feature['spearman_correlation'],
+        })
+
+    results['summary'] = pd.DataFrame([summary])
+    return results
+
+
+def split_by_musical(spotify, tiktok, musicals=None):
+    """[(musical, spotify rows, tiktok rows), ...], largest first"""
+    if musicals is None:
+        musicals = spotify['musical'].dropna().unique()
+    spotify_groups = dict(tuple(spotify.groupby('musical', sort=False, observed=True)))
+    tiktok_groups = dict(tuple(tiktok.groupby('musical', sort=False, observed=True)))
+    groups = [
+        (musical, spotify_groups.get(musical, spotify.iloc[:0]), tiktok_groups.get(musical, tiktok.iloc[:0]))
+        for musical in musicals
+    ]
+    return sorted(groups, key=lambda group: len(group[1]) * len(group[2]), reverse=True)
+
+
+def analyze_catalog(spotify, tiktok, musicals=None, max_workers=None):
+    """Analyse every musical and combine the results into cross-musical tables"""
+    groups = split_by_musical(spotify, tiktok, musicals)
+    max_workers = min(max_workers or os.cpu_count(), len(groups)) or 1
+
+    if max_workers == 1:
+        results = [analyze_musical(*group) for group in groups]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(analyze_musical, *group) for group in groups]
+            results = [future.result() for future in as_completed(futures)]
+
+    tables = {}
+    for name in TABLES + ('figure_data',):
+        frames = [result[name] for result in results if result[name] is not None]
+        table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame({'musical': []})
+        tables[name] = table.sort_values('musical', kind='stable').reset_index(drop=True)
+    if len(tables['summary']):
+        tables['summary'] = tables['summary'].sort_values(
+            ['matched_songs', 'musical'], ascending=[False, True]
+        ).reset_index(drop=True)
+    return tables
+
+
+@instrument('multi_musical')
+def main():
+    parser = argparse.ArgumentParser(description='Analyse every musical in parallel')
+    parser.add_argument('--musicals', nargs='*', help='musicals to analyse (default: all with audio features)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--figures', action='store_true', help='also render a dashboard per musical')
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("WICKED RETROSPECTIVE ANALYSIS - CROSS-MUSICAL COMPARISON")
+    print("="*70)
+
+    print("\nLoading data...")
+    spotify = read_table('audio_features', compact=True)
+    tiktok = read_table('tiktok_performance', compact=True)
+    print(f"  {spotify['musical'].nunique()} musicals, {len(spotify)} tracks, {len(tiktok)} TikTok sounds")
+    print(f"  Tracks: {describe_memory(spotify)}")
+
+    print("Analyzing each musical...")
+    tables = analyze_catalog(spotify, tiktok, args.musicals, args.workers)
+
+    tables_dir = OUTPUT_DIR / 'tables'
+    tables_dir.mkdir(parents=True, exist_ok=True)
+    for name in TABLES:
+        tables[name].to_csv(tables_dir / f'cross_musical_{name}.csv', index=False)
+    print(f"✓ Saved cross-musical tables to {tables_dir}")
+
+    if args.figures and len(tables['figure_data']):
+        specs = dashboard_specs(tables['figure_data'], OUTPUT_DIR / 'figures', by='musical', label='track_name')
+        rendered = render_figures(specs, max_workers=args.workers)
+        cached = sum(status == 'cached' for _, status in rendered)
+        print(f"✓ {len(rendered)} dashboards ({cached} from cache)")
+
+    print("\n" + "="*70)
+    print("MUSICALS")
+    print("="*70)
+    print(tables['summary'].to_string(index=False))
+
+    return tables
+
+
+if __name__ == "__main__":
+    tables = main()
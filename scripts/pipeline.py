@@ -0,0 +1,383 @@
+"""
+Run the collection and analysis scripts as a cached pipeline
+
+Each stage declares the script it runs, the files it reads and the files it
+writes. A stage's fingerprint is the sha256 of its script, of the local
+modules in scripts/ it imports (directly or through other local modules,
+including importlib.import_module('name') calls with a literal name) and of
+the contents of its inputs (directories are hashed file by file). A stage is skipped when
+its fingerprint matches the last successful run and its outputs still exist
+unchanged. Otherwise it runs, along with every stage downstream of it.
+
+Stages depend on each other through their files: a stage that reads what
+another writes runs after it. Stages with no dependency between them run
+in parallel.
+
+The Spotify collection stages call the API, whose answers are not a
+function of any local file, so they only run when named on the command
+line. Without them the analysis stages read what is already in the store
+(or the legacy CSVs). tiktok_setup is on demand too: it rewrites the TikTok
+collection template and example sheet, which are filled in by hand, so
+those are not declared as its outputs either.
+
+A script that exits with dataset_store.NO_DATA_EXIT found its input tables
+empty (e.g. no audio features collected yet). The stage is reported as
+skipped, its downstream stages do not run, and the pipeline still exits 0.
+
+File hashes are cached by (size, mtime), so unchanged data is not re-read.
+State and per-stage logs live in data/cache/pipeline/. Every stage of one
+pipeline run writes its span metrics under the same run id (see
+instrumentation.py).
+
+    python scripts/pipeline.py                  # every stale stage except collection and setup
+    python scripts/pipeline.py analyze_real     # one stage and the stages it reads from
+    python scripts/pipeline.py spotify_features analyze_patterns
+    python scripts/pipeline.py --dry-run
+    python scripts/pipeline.py --force analyze_real
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from dataset_store import LEGACY_CSV, NO_DATA_EXIT, table_path
+from instrumentation import RUN_ID
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / 'scripts'
+DATA_DIR = PROJECT_ROOT / 'data'
+TIKTOK_DIR = DATA_DIR / 'tiktok'
+OUTPUT_DIR = PROJECT_ROOT / 'outputs'
+STATE_DIR = DATA_DIR / 'cache' / 'pipeline'
+STATE_PATH = STATE_DIR / 'state.json'
+
+MAX_WORKERS = 4
+
+
+def table_files(name):
+    """Every place read_table(name) may read from: the store and its legacy CSVs"""
+    return [table_path(name)] + LEGACY_CSV.get(name, [])
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    args: list = field(default_factory=list)
+    on_demand: bool = False  # only run when named explicitly
+
+    @property
+    def script_path(self):
+        return SCRIPTS_DIR / self.script
+
+
+STAGES = [
+    Stage(
+        'spotify_real', '01_collect_spotify_data_REAL.py',
+        outputs=[table_path('spotify_tracks')],
+        on_demand=True,
+    ),
+    Stage(
+        'spotify_features', '01_collect_spotify_data.py',
+        outputs=[table_path('audio_features')],
+        on_demand=True,
+    ),
+    Stage(
+        'tiktok_setup', '02_collect_tiktok_data.py',
+        inputs=table_files('audio_features'),
+        # The template and example sheet are edited by hand after the first run
+        outputs=[
+            TIKTOK_DIR / 'INSTRUCTIONS.txt',
+            TIKTOK_DIR / 'content_type_reference.csv',
+        ],
+        on_demand=True,
+    ),
+    Stage(
+        'analyze_real', '03_analyze_REAL_data.py',
+        inputs=table_files('spotify_tracks') + table_files('tiktok_performance'),
+        outputs=[
+            table_path('merged'),
+            OUTPUT_DIR / 'figures' / 'wicked_analysis.png',
+            OUTPUT_DIR / 'reports' / 'analysis_insights.txt',
+        ],
+    ),
+    Stage(
+        'analyze_patterns', '03_analyze_patterns.py',
+        inputs=table_files('audio_features') + table_files('tiktok_performance'),
+        outputs=[
+            table_path('merged_analysis'),
+            OUTPUT_DIR / 'tables' / 'feature_correlations.csv',
+            OUTPUT_DIR / 'tables' / 'content_type_performance.csv',
+            OUTPUT_DIR / 'tables' / 'key_insights.csv',
+            OUTPUT_DIR / 'tables' / 'trend_label_performance.csv',
+            OUTPUT_DIR / 'tables' / 'entity_effects.csv',
+        ],
+    ),
+    Stage(
+        'site', 'site_artifacts.py',
+        inputs=table_files('merged'),
+        outputs=[PROJECT_ROOT / 'site_data'],
+    ),
+    Stage(
+        'multi_musical', 'multi_musical.py',
+        inputs=table_files('audio_features') + table_files('tiktok_performance'),
+        outputs=[
+            OUTPUT_DIR / 'tables' / f'cross_musical_{name}.csv'
+            for name in ('summary', 'correlations', 'content_types', 'surprises')
+        ],
+    ),
+]
+
+
+class FileHasher:
+    """sha256 of files and directory trees, cached by (size, mtime)"""
+
+    def __init__(self, cache=None):
+        self.cache = cache or {}
+
+    def file_digest(self, path):
+        stat = path.stat()
+        key = str(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        cached = self.cache.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self.cache[key] = [stamp, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def digest(self, path):
+        """Hash of a file, a directory tree, or 'missing'"""
+        path = Path(path)
+        if path.is_file():
+            return self.file_digest(path)
+        if path.is_dir():
+            digest = hashlib.sha256()
+            for child in sorted(p for p in path.rglob('*') if p.is_file()):
+                digest.update(str(child.relative_to(path)).encode())
+                digest.update(self.file_digest(child).encode())
+            return digest.hexdigest()
+        return 'missing'
+
+
+def _imported_names(path):
+    """Top-level module names imported anywhere in a Python file"""
+    names = set()
+    for node in ast.walk(ast.parse(Path(path).read_text(), filename=str(path))):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+        elif (isinstance(node, ast.Call) and getattr(node.func, 'attr', None) == 'import_module'
+              and node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            names.add(node.args[0].value.split('.')[0])
+    return names
+
+
+def local_modules(script_path, scripts_dir=None):
+    """The scripts_dir modules a script imports, directly or through each other, sorted"""
+    scripts_dir = Path(scripts_dir or SCRIPTS_DIR)
+    found, todo = {}, [Path(script_path)]
+    while todo:
+        for name in _imported_names(todo.pop()):
+            module = scripts_dir / f'{name}.py'
+            if name not in found and module.is_file() and module != Path(script_path):
+                found[name] = module
+                todo.append(module)
+    return [found[name] for name in sorted(found)]
+
+
+def _contains(parent, child):
+    parent, child = Path(parent), Path(child)
+    return parent == child or parent in child.parents or child in parent.parents
+
+
+def dependencies(stages):
+    """stage name -> names of the stages whose outputs it reads"""
+    return {
+        stage.name: {
+            other.name for other in stages
+            if other is not stage and any(_contains(o, i) for o in other.outputs for i in stage.inputs)
+        }
+        for stage in stages
+    }
+
+
+def levels(stages):
+    """Stages grouped so that each group only depends on earlier groups"""
+    deps = dependencies(stages)
+    remaining = {stage.name: stage for stage in stages}
+    done, groups = set(), []
+    while remaining:
+        ready = [s for name, s in remaining.items() if deps[name] & set(remaining) <= done]
+        if not ready:
+            raise ValueError(f"Stage dependency cycle among: {', '.join(remaining)}")
+        groups.append(ready)
+        for stage in ready:
+            done.add(stage.name)
+            del remaining[stage.name]
+    return groups
+
+
+def select(stages, names=None):
+    """The named stages plus the stages they depend on, leaving out unnamed on-demand ones
+
+    With no names, every stage that is not on-demand.
+    """
+    deps = dependencies(stages)
+    unknown = set(names or ()) - set(deps)
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+    named = set(names or ())
+    on_demand = {stage.name for stage in stages if stage.on_demand} - named
+    selected, todo = set(), list(names or (s.name for s in stages))
+    while todo:
+        name = todo.pop()
+        if name not in selected and name not in on_demand:
+            selected.add(name)
+            todo.extend(deps[name])
+    return [stage for stage in stages if stage.name in selected]
+
+
+class Pipeline:
+    def __init__(self, stages=STAGES, state_path=STATE_PATH, max_workers=MAX_WORKERS):
+        self.stages = stages
+        self.state_path = Path(state_path)
+        self.max_workers = max_workers
+        state = {}
+        if self.state_path.exists():
+            with open(self.state_path) as f:
+                state = json.load(f)
+        self.runs = state.get('stages', {})
+        self.hasher = FileHasher(state.get('files', {}))
+
+    def fingerprint(self, stage):
+        digest = hashlib.sha256()
+        digest.update(self.hasher.digest(stage.script_path).encode())
+        for module in local_modules(stage.script_path):
+            digest.update(module.name.encode())
+            digest.update(self.hasher.digest(module).encode())
+        digest.update(json.dumps(stage.args).encode())
+        for path in stage.inputs:
+            digest.update(str(Path(path).relative_to(PROJECT_ROOT)).encode())
+            digest.update(self.hasher.digest(path).encode())
+        return digest.hexdigest()
+
+    def output_digests(self, stage):
+        return {str(Path(p).relative_to(PROJECT_ROOT)): self.hasher.digest(p) for p in stage.outputs}
+
+    def is_current(self, stage):
+        last = self.runs.get(stage.name)
+        if last is None or last['fingerprint'] != self.fingerprint(stage):
+            return False
+        outputs = self.output_digests(stage)
+        return 'missing' not in outputs.values() and outputs == last['outputs']
+
+    def run_stage(self, stage):
+        """Run one script; returns (exit status, seconds)"""
+        STATE_DIR.mkdir(parents=True, exist_ok=True)
+        log_path = STATE_DIR / f'{stage.name}.log'
+        start = time.perf_counter()
+        with open(log_path, 'w') as log:
+            result = subprocess.run(
+                [sys.executable, str(stage.script_path), *stage.args],
+                cwd=SCRIPTS_DIR,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                env={**os.environ, 'MPLBACKEND': 'Agg', 'METRICS_RUN_ID': RUN_ID},
+            )
+        return result.returncode, time.perf_counter() - start
+
+    def save(self):
+        STATE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'stages': self.runs, 'files': self.hasher.cache}, f, indent=1)
+        os.replace(tmp, self.state_path)
+
+    def run(self, names=None, force=(), dry_run=False):
+        """Run stale stages level by level; returns {stage: status}"""
+        stages = select(self.stages, names)
+        deps = dependencies(stages)
+        status = {}
+
+        for group in levels(stages):
+            to_run = []
+            for stage in group:
+                upstream = {status[d] for d in deps[stage.name] if d in status}
+                if upstream & {'failed', 'blocked', 'skipped'}:
+                    status[stage.name] = 'blocked'
+                    print(f"  ✗ {stage.name}: not run, an upstream stage failed or had no data")
+                elif stage.name in force or 'ran' in upstream or not self.is_current(stage):
+                    to_run.append(stage)
+                else:
+                    status[stage.name] = 'current'
+                    print(f"  - {stage.name}: up to date")
+
+            if dry_run:
+                for stage in to_run:
+                    status[stage.name] = 'ran'
+                    print(f"  → {stage.name}: would run")
+                continue
+
+            fingerprints = {stage.name: self.fingerprint(stage) for stage in to_run}
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                results = dict(zip([s.name for s in to_run], pool.map(self.run_stage, to_run)))
+
+            for stage in to_run:
+                returncode, seconds = results[stage.name]
+                if returncode == 0:
+                    status[stage.name] = 'ran'
+                    self.runs[stage.name] = {
+                        'fingerprint': fingerprints[stage.name],
+                        'outputs': self.output_digests(stage),
+                    }
+                    print(f"  ✓ {stage.name} ({seconds:.1f}s)")
+                elif returncode == NO_DATA_EXIT:
+                    status[stage.name] = 'skipped'
+                    self.runs.pop(stage.name, None)
+                    print(f"  - {stage.name}: skipped, no input data yet, see {STATE_DIR / (stage.name + '.log')}")
+                else:
+                    status[stage.name] = 'failed'
+                    self.runs.pop(stage.name, None)
+                    print(f"  ✗ {stage.name} failed after {seconds:.1f}s, see {STATE_DIR / (stage.name + '.log')}")
+            self.save()
+
+        return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the pipeline stages whose inputs changed')
+    parser.add_argument('stages', nargs='*', help=f"stages to bring up to date (default: all of {', '.join(s.name for s in STAGES)})")
+    parser.add_argument('--force', nargs='*', default=[], help='stages to rerun even if current')
+    parser.add_argument('--dry-run', action='store_true', help='only show what would run')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("WICKED RETROSPECTIVE ANALYSIS - PIPELINE")
+    print("="*70)
+
+    start = time.perf_counter()
+    pipeline = Pipeline(max_workers=args.workers)
+    status = pipeline.run(args.stages or None, force=set(args.force), dry_run=args.dry_run)
+    print(f"\nFinished in {time.perf_counter() - start:.1f}s")
+    return status
+
+
+if __name__ == "__main__":
+    status = main()
+    sys.exit(1 if 'failed' in status.values() else 0)
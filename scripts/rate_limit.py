@@ -0,0 +1,138 @@
+"""
+Shared token-bucket rate limiting for Spotify API calls
+
+One TokenBucket is shared by every worker thread. When any request gets a
+429, the Retry-After delay is applied to the whole bucket so all workers
+back off together instead of each one hammering the API on its own.
+AsyncTokenBucket does the same for asyncio tasks (see tiktok_scraper).
+"""
+
+import asyncio
+import functools
+import threading
+import time
+
+from instrumentation import record_request
+
+
+class TokenBucket:
+    """Thread-safe token bucket with a pool-wide pause for 429 responses"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop every caller from sending requests for `seconds`"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+            self.updated = self.blocked_until
+
+
+class AsyncTokenBucket:
+    """asyncio version of TokenBucket for coroutines sharing one event loop"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be sent; waiters are served in order"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop every caller from sending requests for `seconds`"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+        self.updated = self.blocked_until
+
+
+def retry_after_seconds(error, attempt, backoff=1.0):
+    """Delay requested by a 429 response, or exponential backoff if missing"""
+    headers = getattr(error, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return backoff * 2 ** attempt
+
+
+class RateLimitedClient:
+    """Wrap a client so every method call goes through a shared TokenBucket
+
+    Calls that fail with HTTP 429 pause the whole bucket for the
+    Retry-After delay and are retried up to `max_retries` times. Every
+    attempt is recorded as a request to '<name>.<method>' for the
+    instrumentation spans.
+    """
+
+    def __init__(self, client, limiter, max_retries=5, backoff=1.0, name='api'):
+        self._client = client
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.name = name
+
+    def call(self, fn, *args, **kwargs):
+        endpoint = f'{self.name}.{getattr(fn, "__name__", "call")}'
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+                record_request(endpoint, time.perf_counter() - start)
+                return result
+            except Exception as e:
+                record_request(endpoint, time.perf_counter() - start, ok=False)
+                if getattr(e, 'http_status', None) != 429 or attempt == self.max_retries:
+                    raise
+                delay = retry_after_seconds(e, attempt, self.backoff)
+                print(f"  Rate limited, pausing all workers for {delay:.1f}s...")
+                self.limiter.pause(delay)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def limited(*args, **kwargs):
+            return self.call(attr, *args, **kwargs)
+
+        return limited
@@ -0,0 +1,346 @@
+"""
+Permutation tests and bootstrap confidence intervals for small samples
+
+With 15-18 merged songs the asymptotic p-values from spearmanr/pearsonr are
+unreliable, so correlations and group-mean differences are also tested by
+resampling:
+
+- permutation p-values shuffle the outcome and count how often the shuffled
+  statistic is at least as extreme as the observed one (two-sided, with the
+  +1 correction so p is never 0)
+- bootstrap CIs resample songs with replacement and take percentiles
+
+Resamples are drawn as one (resamples, n) NumPy index array per chunk and
+every statistic is evaluated for the whole chunk with array operations.
+Bootstrap Spearman correlations never sort a resample: each song's draw count
+gives its tie-averaged rank through one cumulative sum, and the correlation is
+the count-weighted correlation of those ranks. Chunks of up to CHUNK_SIZE
+resamples get their own child of SeedSequence(seed), so results depend only
+on the seed, never on how many workers ran them. Large jobs are spread over one
+process pool that is reused across calls. A chunk holds at most
+CHUNK_VALUES resampled values (resamples x observations x columns), so its
+memory stays bounded however many rows there are.
+
+Permutation tests draw up to N_PERMUTATIONS resamples but stop after a chunk
+once every p-value is resolved, i.e. clearly above or below SIGNIFICANCE
+(a 99.9% binomial interval around it excludes SIGNIFICANCE); chunks are
+checked in seed order, so early stopping is reproducible too. Percentile
+bootstrap CIs use N_BOOTSTRAP resamples.
+
+Above RESAMPLE_MAX_N observations the asymptotic results are used instead
+(correlations: the t-test p-value and a Fisher z interval, with variance
+1.06 / (n - 3) for Spearman; mean differences: Welch's t-test). They are
+accurate at that size, where every resample would cost n times more.
+
+    from resampling import correlation_permutation_test, correlation_bootstrap_ci
+    pvalues = correlation_permutation_test(df[features], df['virality_score'], 'spearman')
+"""
+
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import norm, rankdata, t as t_dist
+
+from correlation import correlation_matrix
+
+N_PERMUTATIONS = 100_000
+N_BOOTSTRAP = 100_000
+CHUNK_SIZE = 2_000
+CONFIDENCE = 0.95
+
+# Resampled values per chunk (each chunk-sized float array is 8 MB at most)
+CHUNK_VALUES = 1_000_000
+
+# Larger samples get the asymptotic p-values and CIs
+RESAMPLE_MAX_N = 100
+
+# Permutation tests stop once every p-value is clearly on one side of this
+SIGNIFICANCE = 0.05
+RESOLVED_Z = 3.29  # 99.9% two-sided
+
+# Below this many resamples a process pool costs more than it saves
+PARALLEL_MIN_RESAMPLES = 20_000
+
+_pool = None
+_pool_workers = None
+
+
+def _as_matrix(x):
+    x = np.asarray(x, dtype=float)
+    return x[:, None] if x.ndim == 1 else x
+
+
+def _standardize(values, axis):
+    centered = values - values.mean(axis=axis, keepdims=True)
+    norms = np.sqrt((centered ** 2).sum(axis=axis, keepdims=True))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return centered / np.where(norms > 0, norms, np.nan)
+
+
+def _ranks(values, axis=0):
+    return rankdata(values, axis=axis)
+
+
+def _pearson_rows(x, y):
+    """Correlation of y (b, n) with each column of x (b, n, p) -> (b, p)"""
+    return np.einsum('bnp,bn->bp', _standardize(x, axis=1), _standardize(y, axis=1))
+
+
+def _tie_groups(values):
+    """Sort order of `values` plus, per sorted position, where its run of ties starts and ends"""
+    order = np.argsort(values, kind='stable')
+    ordered = values[order]
+    positions = np.arange(len(values))
+    change = ordered[1:] != ordered[:-1]
+    start = np.maximum.accumulate(np.where(np.r_[True, change], positions, 0))
+    end = np.minimum.accumulate(np.where(np.r_[change, True], positions, len(values) - 1)[::-1])[::-1]
+    return order, start, end
+
+
+def _resample_ranks(counts, values):
+    """Rank of each value within every resample; counts (b, n) are the times each value was drawn"""
+    order, start, end = _tie_groups(values)
+    drawn = counts[:, order]
+    cumulative = np.cumsum(drawn, axis=1)
+    below = cumulative - drawn
+    ties = drawn
+    if (start != end).any():
+        below = below[:, start]
+        ties = cumulative[:, end] - below
+    ranks = np.empty(counts.shape)
+    ranks[:, order] = below + (ties + 1) / 2
+    return ranks
+
+
+def _spearman_bootstrap(x, y, idx):
+    """Spearman correlation of y with each column of x for every resample in idx (b, n)"""
+    size, n = idx.shape
+    counts = np.bincount((np.arange(size)[:, None] * n + idx).ravel(), minlength=size * n)
+    counts = counts.reshape(size, n).astype(float)
+
+    # Tie-averaged ranks of a resample always average (n + 1) / 2
+    mean_rank = (n + 1) / 2
+    ry = _resample_ranks(counts, y) - mean_rank
+    weighted_y = counts * ry
+    var_y = np.einsum('bn,bn->b', weighted_y, ry)
+
+    correlations = np.empty((size, x.shape[1]))
+    for j in range(x.shape[1]):
+        rx = _resample_ranks(counts, x[:, j]) - mean_rank
+        var = np.einsum('bn,bn->b', counts * rx, rx) * var_y
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlations[:, j] = np.einsum('bn,bn->b', weighted_y, rx) / np.sqrt(np.where(var > 0, var, np.nan))
+    return correlations
+
+
+def _permutation_indices(rng, n, size):
+    return rng.permuted(np.broadcast_to(np.arange(n), (size, n)), axis=1)
+
+
+def _bootstrap_indices(rng, n, size):
+    return rng.integers(0, n, size=(size, n))
+
+
+def correlation_statistic(x, y, method='spearman'):
+    """Observed correlation of y with every column of x"""
+    x, y = _as_matrix(x), np.asarray(y, dtype=float)
+    if method == 'spearman':
+        x, y = _ranks(x), _ranks(y)
+    return (_standardize(x, axis=0).T @ _standardize(y, axis=0)).ravel()
+
+
+def mean_difference(values, groups):
+    """mean(values in group) - mean(values outside it)"""
+    values, groups = np.asarray(values, dtype=float), np.asarray(groups, dtype=bool)
+    return values[groups].mean() - values[~groups].mean()
+
+
+def _correlation_chunk(kind, method, x, y, seed, size):
+    rng = np.random.default_rng(seed)
+    n = len(y)
+    if kind == 'permutation':
+        # Permuting y keeps every column's mean and spread, so x is standardized once
+        if method == 'spearman':
+            x, y = _ranks(x), _ranks(y)
+        zx = _standardize(x, axis=0)
+        zy = _standardize(y, axis=0)
+        return zy[_permutation_indices(rng, n, size)] @ zx
+
+    idx = _bootstrap_indices(rng, n, size)
+    if method == 'spearman' and not (np.isnan(x).any() or np.isnan(y).any()):
+        return _spearman_bootstrap(x, y, idx)
+    xs, ys = x[idx], y[idx]
+    if method == 'spearman':
+        xs, ys = _ranks(xs, axis=1), _ranks(ys, axis=1)
+    return _pearson_rows(xs, ys)
+
+
+def _mean_difference_chunk(kind, method, values, groups, seed, size):
+    rng = np.random.default_rng(seed)
+    n = len(values)
+    if kind == 'permutation':
+        shuffled = groups[_permutation_indices(rng, n, size)]
+        in_group = shuffled.sum(axis=1)
+        total = values.sum()
+        inside = (shuffled * values).sum(axis=1)
+        return (inside / in_group - (total - inside) / (n - in_group))[:, None]
+
+    # Stratified bootstrap: each group is resampled within itself
+    a, b = values[groups], values[~groups]
+    a_means = a[_bootstrap_indices(rng, len(a), size)].mean(axis=1)
+    b_means = b[_bootstrap_indices(rng, len(b), size)].mean(axis=1)
+    return (a_means - b_means)[:, None]
+
+
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+
+
+def process_pool(max_workers):
+    """The shared resampling pool, recreated only if max_workers changes"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != max_workers:
+        _shutdown_pool()
+        _pool, _pool_workers = ProcessPoolExecutor(max_workers=max_workers), max_workers
+    return _pool
+
+
+atexit.register(_shutdown_pool)
+
+
+def chunk_size(values):
+    """Resamples per chunk when each resample holds `values` numbers, within CHUNK_VALUES"""
+    return max(1, min(CHUNK_SIZE, CHUNK_VALUES // max(values, 1)))
+
+
+def _run_chunks(chunk_fn, args, n_resamples, seed, max_workers, stop=None, size=CHUNK_SIZE):
+    """Evaluate up to n_resamples statistics in seeded chunks of `size` -> (n_resamples, p)
+
+    `stop(results_so_far)` is checked after each chunk, in seed order; once it
+    returns True the remaining chunks are dropped.
+    """
+    n_chunks = -(-n_resamples // size)
+    sizes = [size] * (n_chunks - 1) + [n_resamples - size * (n_chunks - 1)]
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    max_workers = max_workers or os.cpu_count()
+    parts = []
+    if max_workers == 1 or n_chunks == 1 or n_resamples < PARALLEL_MIN_RESAMPLES:
+        for s, chunk in zip(seeds, sizes):
+            parts.append(chunk_fn(*args, s, chunk))
+            if stop is not None and stop(np.concatenate(parts)):
+                break
+        return np.concatenate(parts)
+
+    futures = [process_pool(max_workers).submit(chunk_fn, *args, s, chunk) for s, chunk in zip(seeds, sizes)]
+    for i, future in enumerate(futures):
+        parts.append(future.result())
+        if stop is not None and stop(np.concatenate(parts)):
+            for pending in futures[i + 1:]:
+                pending.cancel()
+            break
+    return np.concatenate(parts)
+
+
+def _permutation_pvalues(observed, null):
+    with np.errstate(invalid='ignore'):
+        extreme = (np.abs(null) >= np.abs(observed) - 1e-12).sum(axis=0)
+    pvalues = (extreme + 1) / (len(null) + 1)
+    return np.where(np.isnan(observed), np.nan, pvalues)
+
+
+def _resolved(observed):
+    """stop() for _run_chunks: every p-value is clearly above or below SIGNIFICANCE"""
+    def stop(null):
+        pvalues = _permutation_pvalues(observed, null)
+        margin = RESOLVED_Z * np.sqrt(SIGNIFICANCE * (1 - SIGNIFICANCE) / len(null))
+        return bool(np.all(np.isnan(pvalues) | (np.abs(pvalues - SIGNIFICANCE) > margin)))
+    return stop
+
+
+def _percentile_ci(samples, confidence):
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+    return low, high
+
+
+def _fisher_ci(r, n, method, confidence):
+    """Fisher z interval around correlations r from n observations"""
+    variance = (1.06 if method == 'spearman' else 1.0) / (n - 3)
+    margin = norm.ppf(0.5 + confidence / 2) * np.sqrt(variance)
+    with np.errstate(divide='ignore'):
+        center = np.arctanh(r)
+    return np.tanh(center - margin), np.tanh(center + margin)
+
+
+def _welch_test(values, groups, confidence):
+    """mean_difference_test's result from Welch's t-test"""
+    a, b = values[groups], values[~groups]
+    difference = a.mean() - b.mean()
+    va, vb = a.var(ddof=1) / len(a), b.var(ddof=1) / len(b)
+    stderr = np.sqrt(va + vb)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dof = (va + vb) ** 2 / (va ** 2 / (len(a) - 1) + vb ** 2 / (len(b) - 1))
+        pvalue = 2 * t_dist.sf(abs(difference) / stderr, dof)
+        margin = t_dist.ppf(0.5 + confidence / 2, dof) * stderr
+    return {
+        'difference': difference,
+        'pvalue': float(pvalue),
+        'ci_low': float(difference - margin),
+        'ci_high': float(difference + margin),
+    }
+
+
+def correlation_permutation_test(x, y, method='spearman', n_resamples=N_PERMUTATIONS, seed=0, max_workers=None,
+                                 early_stop=True):
+    """Two-sided permutation p-value for y against each column of x (t-test above RESAMPLE_MAX_N)"""
+    x, y = _as_matrix(x), np.asarray(y, dtype=float)
+    if len(y) > RESAMPLE_MAX_N:
+        if method == 'spearman':
+            x, y = _ranks(x), _ranks(y)
+        return correlation_matrix(x, y[:, None])[1].ravel()
+    observed = correlation_statistic(x, y, method)
+    null = _run_chunks(_correlation_chunk, ('permutation', method, x, y), n_resamples, seed, max_workers,
+                       stop=_resolved(observed) if early_stop else None, size=chunk_size(x.size))
+    return _permutation_pvalues(observed, null)
+
+
+def correlation_bootstrap_ci(x, y, method='spearman', n_resamples=N_BOOTSTRAP, confidence=CONFIDENCE,
+                             seed=0, max_workers=None):
+    """Percentile bootstrap CI (low, high) for y against each column of x (Fisher z above RESAMPLE_MAX_N)"""
+    x, y = _as_matrix(x), np.asarray(y, dtype=float)
+    if len(y) > RESAMPLE_MAX_N:
+        return _fisher_ci(correlation_statistic(x, y, method), len(y), method, confidence)
+    samples = _run_chunks(_correlation_chunk, ('bootstrap', method, x, y), n_resamples, seed, max_workers,
+                          size=chunk_size(x.size))
+    return _percentile_ci(samples, confidence)
+
+
+def mean_difference_test(values, groups, n_resamples=N_PERMUTATIONS, n_bootstrap=N_BOOTSTRAP,
+                         confidence=CONFIDENCE, seed=0, max_workers=None, early_stop=True):
+    """Difference in means with a permutation p-value and a bootstrap CI (Welch above RESAMPLE_MAX_N)
+
+    Everything is NaN when one of the groups is empty.
+    """
+    values, groups = np.asarray(values, dtype=float), np.asarray(groups, dtype=bool)
+    if groups.all() or not groups.any():
+        return {'difference': np.nan, 'pvalue': np.nan, 'ci_low': np.nan, 'ci_high': np.nan}
+    if len(values) > RESAMPLE_MAX_N:
+        return _welch_test(values, groups, confidence)
+    observed = mean_difference(values, groups)
+    args = (values, groups)
+    size = chunk_size(len(values))
+    null = _run_chunks(_mean_difference_chunk, ('permutation', None) + args, n_resamples, seed, max_workers,
+                       stop=_resolved(np.array([observed])) if early_stop else None, size=size)
+    samples = _run_chunks(_mean_difference_chunk, ('bootstrap', None) + args, n_bootstrap, seed, max_workers,
+                          size=size)
+    low, high = _percentile_ci(samples, confidence)
+    return {
+        'difference': observed,
+        'pvalue': float(_permutation_pvalues(np.array([observed]), null)[0]),
+        'ci_low': float(low[0]),
+        'ci_high': float(high[0]),
+    }
@@ -0,0 +1,216 @@
+"""
+Persistent SQLite cache for Spotify API responses
+
+Responses are stored per endpoint and id so reruns skip the network for
+anything that has not expired. Each endpoint has its own TTL: track objects
+carry `popularity` and go stale quickly, while album listings and audio
+features never change. Null responses (e.g. audio features Spotify has not
+computed yet) expire after NULL_TTL whatever the endpoint's TTL, so a gap is
+retried later instead of being cached forever. Track lookups are keyed by
+market as well as id. The cache is trimmed least-recently-used first once
+it grows past `max_bytes`.
+
+Set SPOTIFY_OFFLINE=1 to serve only from the cache; a miss then raises
+CacheMiss instead of calling the API.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CACHE_PATH = PROJECT_ROOT / 'data' / 'cache' / 'spotify_responses.sqlite'
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# Seconds before an entry is refetched; None means it never expires
+ENDPOINT_TTLS = {
+    'search': 7 * DAY,
+    'album_tracks': None,
+    'track': DAY,  # full track objects include popularity
+    'audio_features': None,
+}
+
+# Seconds before a null response is refetched
+NULL_TTL = DAY
+
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+
+_MISSING = object()
+
+
+class CacheMiss(LookupError):
+    """Raised in offline mode when a response is not cached"""
+
+
+class ResponseCache:
+    """Key/value store of JSON responses keyed by (endpoint, key)"""
+
+    def __init__(self, path=CACHE_PATH, ttls=None, max_bytes=MAX_CACHE_BYTES, offline=False, null_ttl=NULL_TTL):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttls = {**ENDPOINT_TTLS, **(ttls or {})}
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.null_ttl = null_ttl
+        self.lock = threading.Lock()
+
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                endpoint TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (endpoint, key)
+            )
+        """)
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)')
+        self.db.commit()
+        self.total_bytes = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def get(self, endpoint, key):
+        """Return the cached value, or _MISSING if absent or expired
+
+        Expired entries are still returned in offline mode.
+        """
+        with self.lock:
+            row = self.db.execute(
+                'SELECT value, fetched_at FROM responses WHERE endpoint = ? AND key = ?',
+                (endpoint, key)
+            ).fetchone()
+            if row is None:
+                return _MISSING
+
+            value, fetched_at = row
+            ttl = self.ttls.get(endpoint)
+            if value == 'null':
+                ttl = self.null_ttl if ttl is None else min(ttl, self.null_ttl)
+            if not self.offline and ttl is not None and time.time() - fetched_at > ttl:
+                return _MISSING
+
+            self.db.execute(
+                'UPDATE responses SET accessed_at = ? WHERE endpoint = ? AND key = ?',
+                (time.time(), endpoint, key)
+            )
+            self.db.commit()
+            return json.loads(value)
+
+    def put(self, endpoint, key, value):
+        value = json.dumps(value)
+        now = time.time()
+        with self.lock:
+            old = self.db.execute(
+                'SELECT size FROM responses WHERE endpoint = ? AND key = ?', (endpoint, key)
+            ).fetchone()
+            self.db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                (endpoint, key, value, len(value), now, now)
+            )
+            self.total_bytes += len(value) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self.db.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until 90% of max_bytes is free"""
+        target = self.max_bytes * 0.9
+        rows = self.db.execute(
+            'SELECT endpoint, key, size FROM responses ORDER BY accessed_at'
+        )
+        doomed = []
+        for endpoint, key, size in rows:
+            if self.total_bytes <= target:
+                break
+            doomed.append((endpoint, key))
+            self.total_bytes -= size
+        self.db.executemany('DELETE FROM responses WHERE endpoint = ? AND key = ?', doomed)
+
+    def fetch(self, endpoint, key, fetch):
+        """Return the cached value or call `fetch()` and cache its result"""
+        value = self.get(endpoint, key)
+        if value is not _MISSING:
+            return value
+        if self.offline:
+            raise CacheMiss(f"{endpoint} {key} is not cached (offline mode)")
+        value = fetch()
+        self.put(endpoint, key, value)
+        return value
+
+    def fetch_many(self, endpoint, ids, fetch, key=str):
+        """Per-id cached lookup; `fetch(missing_ids)` returns results in order
+
+        `key(id)` gives the cache key of an id.
+        """
+        found = {track_id: self.get(endpoint, key(track_id)) for track_id in ids}
+        missing = [track_id for track_id, value in found.items() if value is _MISSING]
+
+        if missing:
+            if self.offline:
+                raise CacheMiss(f"{len(missing)} {endpoint} ids are not cached (offline mode)")
+            for track_id, value in zip(missing, fetch(missing)):
+                self.put(endpoint, key(track_id), value)
+                found[track_id] = value
+
+        return [found[track_id] for track_id in ids]
+
+
+def open_cache(path=CACHE_PATH):
+    """Open the shared cache, honouring SPOTIFY_OFFLINE"""
+    offline = os.environ.get('SPOTIFY_OFFLINE', '').lower() in ('1', 'true', 'yes')
+    return ResponseCache(path, offline=offline)
+
+
+def track_key(track_id, market=None):
+    """Cache key of a track lookup; track objects differ per market"""
+    return track_id if market is None else f'{track_id}?market={market}'
+
+
+class CachedSpotify:
+    """Drop-in wrapper around a spotipy client that caches read endpoints"""
+
+    def __init__(self, client, cache):
+        self._client = client
+        self.cache = cache
+
+    def search(self, q, limit=10, offset=0, type='track', market=None):
+        key = json.dumps([q, limit, offset, type, market])
+        return self.cache.fetch(
+            'search', key,
+            lambda: self._client.search(q=q, limit=limit, offset=offset, type=type, market=market)
+        )
+
+    def album_tracks(self, album_id, limit=50, offset=0, market=None):
+        key = json.dumps([album_id, limit, offset, market])
+        return self.cache.fetch(
+            'album_tracks', key,
+            lambda: self._client.album_tracks(album_id, limit=limit, offset=offset, market=market)
+        )
+
+    def track(self, track_id, market=None):
+        return self.cache.fetch(
+            'track', track_key(track_id, market), lambda: self._client.track(track_id, market=market)
+        )
+
+    def tracks(self, tracks, market=None):
+        items = self.cache.fetch_many(
+            'track', list(tracks),
+            lambda missing: self._client.tracks(missing, market=market)['tracks'],
+            key=lambda track_id: track_key(track_id, market)
+        )
+        return {'tracks': items}
+
+    def audio_features(self, tracks=[]):
+        if isinstance(tracks, str):
+            tracks = [tracks]
+        return self.cache.fetch_many('audio_features', list(tracks), self._client.audio_features)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
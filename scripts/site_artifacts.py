@@ -0,0 +1,511 @@
+"""
+Precompute what index.qmd shows into one artifact per musical
+
+Instead of reading the merged table and rebuilding every aggregate and
+Plotly figure inside `quarto render`, this step does the work once and
+writes site_data/<musical>.json:
+
+    data_hash   sha256 of the merged rows and of this script
+    stats       the numbers quoted in the text (most popular song, averages, ...)
+    top5        the top five songs
+    musical     the musical's name, as the page shows it
+    figures     a placeholder <div> per chart
+    table_html  the styled song statistics table
+
+index.qmd picks the artifact whose `musical` matches its `musical`
+parameter (default Wicked), so the same page renders any musical;
+`--render-musical Hamilton` writes that page to hamilton.html.
+
+Chart data is not embedded in the page. Each chart is written to its own
+compact file, site_data/<musical>/<chart>.js: array data is pulled out of
+the traces into rounded columns, and the Plotly template, identical for
+every chart, is stored once under site_data/assets/ with a hash in its
+name, so browsers can cache it for good. Plotly.js itself comes from the
+versioned Plotly CDN. lazy-plots.js loads Plotly.js, the template and a
+chart's data only when the chart's placeholder scrolls into view.
+
+site_data/ is committed and published with the page (it is a Quarto
+resource), and the data files are scripts that hand their data to
+lazyPlots.register() rather than JSON, so the charts load from a static
+host and from a local file:// copy alike, where fetch() is blocked.
+
+The page cells only load the artifact. An artifact whose data_hash is
+unchanged is not rebuilt. When it does change, the page's frozen execution
+results (_freeze/index) are dropped, so the next render re-executes the
+page. Otherwise a project render (`quarto render`, no file name: rendering
+a single file ignores the freeze) reuses the freeze (`freeze: auto` in
+_quarto.yml) and no Python runs at all.
+
+The freeze is not keyed by parameter, so it only ever holds the default
+(Wicked) page. A parameterized render always executes, and runs with the
+freeze moved aside: the one it writes is discarded and the default one
+put back.
+
+    python scripts/site_artifacts.py
+    python scripts/site_artifacts.py --render                     # and run quarto render
+    python scripts/site_artifacts.py --render-musical Hamilton    # and render hamilton.html
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import read_table
+from figures import slugify
+from instrumentation import instrument
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SITE_DIR = PROJECT_ROOT / 'site_data'
+ASSET_DIR = SITE_DIR / 'assets'
+FREEZE_DIR = PROJECT_ROOT / '_freeze' / 'index'
+
+# Decimals kept in chart data
+FIGURE_DIGITS = 3
+
+PLOTLY_CDN = 'https://cdn.plot.ly/plotly-{version}.min.js'
+
+COLUMNS = ['musical', 'clean_name', 'popularity', 'duration_min']
+
+# Wicked color palette
+COLORS = {
+    'emerald': '#00A86B',
+    'dark_green': '#006B3F',
+    'pink': '#E91E8C',
+    'gold': '#FFD700',
+    'light_green': '#90EE90',
+    'black': '#1C1C1C',
+    'white': '#FFFFFF'
+}
+
+POPULARITY_SCALE = [
+    [0, COLORS['pink']],
+    [0.5, COLORS['gold']],
+    [1, COLORS['emerald']]
+]
+
+
+def artifact_path(musical):
+    return SITE_DIR / f'{slugify(musical)}.json'
+
+
+def data_hash(df):
+    """Hash of the rows the page uses and of the code that turns them into the page"""
+    digest = hashlib.sha256(Path(__file__).read_bytes())
+    digest.update(json.dumps([list(df.columns), [str(t) for t in df.dtypes]]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def top_songs_figure(df, musical):
+    """Horizontal bar chart of the ten most popular songs"""
+    import plotly.graph_objects as go
+
+    top10 = df.nlargest(10, 'popularity').sort_values('popularity')
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        y=top10['clean_name'],
+        x=top10['popularity'],
+        orientation='h',
+        marker=dict(
+            color=top10['popularity'],
+            colorscale=POPULARITY_SCALE,
+            line=dict(color=COLORS['dark_green'], width=2)
+        ),
+        text=top10['popularity'],
+        textposition='outside',
+        textfont=dict(size=14, color=COLORS['black'], family='Arial Black'),
+        hovertemplate='<b>%{y}</b><br>Popularity: %{x}/100<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title={
+            'text': f'<b>Top 10 Most Popular {musical} Songs</b><br><sub>Based on Spotify Popularity Scores</sub>',
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': 24, 'color': COLORS['emerald'], 'family': 'Arial Black'}
+        },
+        xaxis_title='Spotify Popularity Score (0-100)',
+        yaxis_title='',
+        height=600,
+        plot_bgcolor='rgba(255,255,255,0.95)',
+        paper_bgcolor='white',
+        font=dict(size=13, family='Arial'),
+        showlegend=False,
+        xaxis=dict(
+            gridcolor='rgba(0,107,63,0.1)',
+            range=[0, 100]
+        )
+    )
+    return fig
+
+
+def duration_figure(df, musical):
+    """Duration vs popularity scatter with a linear trend line"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=df['duration_min'],
+        y=df['popularity'],
+        mode='markers',
+        marker=dict(
+            size=15,
+            color=df['popularity'],
+            colorscale=POPULARITY_SCALE,
+            line=dict(color=COLORS['dark_green'], width=2),
+            showscale=True,
+            colorbar=dict(
+                title=dict(text='Popularity', font=dict(size=14)),
+                tickfont=dict(size=12)
+            )
+        ),
+        text=df['clean_name'],
+        hovertemplate='<b>%{text}</b><br>Duration: %{x:.2f} min<br>Popularity: %{y}/100<extra></extra>'
+    ))
+
+    # Add trend line
+    z = np.polyfit(df['duration_min'], df['popularity'], 1)
+    p = np.poly1d(z)
+    x_trend = np.linspace(df['duration_min'].min(), df['duration_min'].max(), 100)
+
+    fig.add_trace(go.Scatter(
+        x=x_trend,
+        y=p(x_trend),
+        mode='lines',
+        line=dict(color=COLORS['pink'], width=3, dash='dash'),
+        name='Trend Line',
+        hoverinfo='skip'
+    ))
+
+    fig.update_layout(
+        title={
+            'text': '<b>Song Duration vs Popularity</b><br><sub>Is there a sweet spot for song length?</sub>',
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': 22, 'color': COLORS['emerald'], 'family': 'Arial Black'}
+        },
+        xaxis_title='Duration (minutes)',
+        yaxis_title='Spotify Popularity Score',
+        height=500,
+        plot_bgcolor='rgba(255,255,255,0.95)',
+        paper_bgcolor='white',
+        showlegend=True,
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="right",
+            x=0.99,
+            bgcolor='rgba(255,255,255,0.8)'
+        ),
+        xaxis=dict(gridcolor='rgba(0,107,63,0.1)'),
+        yaxis=dict(gridcolor='rgba(0,107,63,0.1)')
+    )
+    return fig
+
+
+def distribution_figure(df, musical):
+    """Popularity histogram with the mean marked"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Histogram(
+        x=df['popularity'],
+        nbinsx=15,
+        marker=dict(
+            color=COLORS['emerald'],
+            line=dict(color=COLORS['dark_green'], width=2)
+        ),
+        hovertemplate='Popularity: %{x}<br>Count: %{y}<extra></extra>'
+    ))
+
+    mean_pop = df['popularity'].mean()
+    fig.add_vline(
+        x=mean_pop,
+        line_dash="dash",
+        line_color=COLORS['pink'],
+        line_width=3,
+        annotation_text=f"Mean: {mean_pop:.1f}",
+        annotation_position="top right",
+        annotation_font_size=14,
+        annotation_font_color=COLORS['pink']
+    )
+
+    fig.update_layout(
+        title={
+            'text': f'<b>Spotify Popularity Distribution</b><br><sub>How popular are {musical} songs?</sub>',
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': 22, 'color': COLORS['emerald'], 'family': 'Arial Black'}
+        },
+        xaxis_title='Popularity Score (0-100)',
+        yaxis_title='Number of Songs',
+        height=450,
+        plot_bgcolor='rgba(255,255,255,0.95)',
+        paper_bgcolor='white',
+        showlegend=False,
+        xaxis=dict(
+            gridcolor='rgba(0,107,63,0.1)',
+            range=[0, 100]
+        ),
+        yaxis=dict(gridcolor='rgba(0,107,63,0.1)')
+    )
+    return fig
+
+
+FIGURES = {
+    'top_songs': top_songs_figure,
+    'duration': duration_figure,
+    'distribution': distribution_figure,
+}
+
+
+def _array(value):
+    """Trace attribute as a 1-D array if it holds per-point data, else None"""
+    if isinstance(value, dict) and 'bdata' in value:
+        # Plotly's base64 typed-array encoding
+        return np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype(value['dtype'])).ravel()
+    if isinstance(value, (np.ndarray, pd.Series, list, tuple)) and len(value) > 1:
+        if not any(isinstance(v, (dict, list, tuple)) for v in value):
+            return np.asarray(value)
+    return None
+
+
+def _column(values, digits):
+    """Rounded JSON list; integral floats become ints, NaN becomes null"""
+    if values.dtype.kind in 'iub':
+        return values.astype(int).tolist()
+    if values.dtype.kind != 'f':
+        return [str(v) for v in values]
+    rounded = np.round(values.astype(float), digits)
+    finite = np.isfinite(rounded)
+    if finite.all() and (rounded == np.round(rounded)).all():
+        return rounded.astype(int).tolist()
+    return [v if ok else None for v, ok in zip(rounded.tolist(), finite)]
+
+
+def _split_arrays(node, prefix, columns, digits):
+    """Copy of a trace dict with array data moved into `columns` by dotted path"""
+    out = {}
+    for key, value in node.items():
+        array = _array(value)
+        if array is not None:
+            columns[f'{prefix}{key}'] = _column(array, digits)
+        elif isinstance(value, dict):
+            out[key] = _split_arrays(value, f'{prefix}{key}.', columns, digits)
+        else:
+            out[key] = value
+    return out
+
+
+def compact_figure(fig, digits=FIGURE_DIGITS):
+    """(chart, template): traces without data, rounded columns, layout without its template
+
+    A column named '1.marker.color' goes back into traces[1].marker.color.
+    """
+    import plotly.io as pio
+
+    spec = json.loads(pio.to_json(fig))
+    layout = spec.get('layout', {})
+    template = layout.pop('template', None)
+    columns = {}
+    traces = [_split_arrays(trace, f'{i}.', columns, digits) for i, trace in enumerate(spec['data'])]
+    return {'traces': traces, 'columns': columns, 'layout': layout}, template
+
+
+def _write_json(path, obj):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(obj, f, separators=(',', ':'))
+    tmp.replace(path)
+
+
+def _write_script(path, obj):
+    """Data file loaded with a <script> tag: lazyPlots.register('<site path>', obj)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        f.write(f'lazyPlots.register({json.dumps(_site_path(path))},')
+        json.dump(obj, f, separators=(',', ':'))
+        f.write(');\n')
+    tmp.replace(path)
+
+
+def _site_path(path):
+    """Path as the page links to it (relative to the project root)"""
+    return path.relative_to(PROJECT_ROOT).as_posix()
+
+
+def plotly_src():
+    """CDN URL of the Plotly.js version the charts were built with"""
+    from plotly.offline import get_plotlyjs_version
+
+    return PLOTLY_CDN.format(version=get_plotlyjs_version())
+
+
+def template_asset(template):
+    """site_data/assets/template-<hash>.js, shared by every chart using it"""
+    text = json.dumps(template, separators=(',', ':'), sort_keys=True)
+    path = ASSET_DIR / f'template-{hashlib.sha256(text.encode()).hexdigest()[:12]}.js'
+    if not path.exists():
+        _write_script(path, template)
+    return path
+
+
+def write_figures(df, musical):
+    """Write each chart's data file; returns {chart: placeholder div HTML}"""
+    plotly = plotly_src()
+    placeholders = {}
+    for name, build in FIGURES.items():
+        fig = build(df, musical)
+        chart, template = compact_figure(fig)
+        path = SITE_DIR / slugify(musical) / f'{name}.js'
+        _write_script(path, chart)
+        template_src = _site_path(template_asset(template)) if template else ''
+        height = fig.layout.height or 450
+        placeholders[name] = (
+            f'<div class="lazy-plot" data-src="{_site_path(path)}" data-template="{template_src}" '
+            f'data-plotly="{plotly}" style="height:{height}px"></div>'
+        )
+    return placeholders
+
+
+def stats_table_html(df):
+    """The top 15 songs as a styled HTML table"""
+    table_df = df[['clean_name', 'popularity', 'duration_min']].copy()
+    table_df.columns = ['Song', 'Popularity', 'Duration (min)']
+    table_df = table_df.sort_values('Popularity', ascending=False)
+    table_df.reset_index(drop=True, inplace=True)
+    table_df.index = table_df.index + 1
+
+    styled_table = table_df.head(15).style.background_gradient(
+        subset=['Popularity'],
+        cmap='Greens'
+    ).format({
+        'Popularity': '{:.0f}',
+        'Duration (min)': '{:.2f}'
+    })
+    return styled_table.to_html()
+
+
+def song(row):
+    return {'name': row['clean_name'], 'popularity': int(row['popularity']), 'duration_min': float(row['duration_min'])}
+
+
+def build_artifact(df, musical):
+    """Every aggregate the page needs, as a JSON-ready dict; chart data is written alongside"""
+    describe = df['popularity'].describe()
+    stats = {
+        'total_songs': len(df),
+        'avg_popularity': float(df['popularity'].mean()),
+        'most_popular': song(df.loc[df['popularity'].idxmax()]),
+        'shortest': song(df.loc[df['duration_min'].idxmin()]),
+        'longest': song(df.loc[df['duration_min'].idxmax()]),
+        'avg_duration': float(df['duration_min'].mean()),
+        'min_duration': float(df['duration_min'].min()),
+        'max_duration': float(df['duration_min'].max()),
+        'high_performers': int((df['popularity'] >= 55).sum()),
+        'popularity': {key: float(describe[key]) for key in ('mean', '50%', 'std', 'min', 'max')},
+    }
+    return {
+        'stats': stats,
+        'top5': [song(row) for _, row in df.nlargest(5, 'popularity').iterrows()],
+        'figures': write_figures(df, musical),
+        'table_html': stats_table_html(df),
+    }
+
+
+@instrument('site')
+def build_site_artifacts(musicals=None, force=False):
+    """Write an artifact for each musical whose data changed; returns {musical: 'built' | 'current'}"""
+    merged = read_table('merged')
+    if musicals is not None:
+        merged = merged[merged['musical'].isin(musicals)]
+
+    SITE_DIR.mkdir(parents=True, exist_ok=True)
+    status = {}
+    for musical, group in merged.groupby('musical', sort=True, observed=True):
+        df = group[COLUMNS].reset_index(drop=True)
+        key = data_hash(df)
+        path = artifact_path(musical)
+        if not force and path.exists():
+            with open(path) as f:
+                if json.load(f).get('data_hash') == key:
+                    status[musical] = 'current'
+                    continue
+
+        _write_json(path, {'musical': musical, 'data_hash': key, **build_artifact(df, musical)})
+        status[musical] = 'built'
+
+    if 'built' in status.values() and FREEZE_DIR.exists():
+        # Frozen cell outputs were computed from the old artifact
+        shutil.rmtree(FREEZE_DIR)
+    return status
+
+
+def render(musical=None):
+    """Render the project, or index.qmd for one musical without using or updating the freeze"""
+    if musical is None:
+        subprocess.run(['quarto', 'render'], cwd=PROJECT_ROOT, check=True)
+        return PROJECT_ROOT / 'index.html'
+
+    output = f'{slugify(musical)}.html'
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = Path(tmp) / 'index'
+        if FREEZE_DIR.exists():
+            shutil.move(FREEZE_DIR, saved)
+        try:
+            subprocess.run(['quarto', 'render', 'index.qmd', '-P', f'musical:{musical}', '--output', output],
+                           cwd=PROJECT_ROOT, check=True)
+        finally:
+            # Whatever the render froze belongs to this musical, not the default page
+            if FREEZE_DIR.exists():
+                shutil.rmtree(FREEZE_DIR)
+            if saved.exists():
+                shutil.move(saved, FREEZE_DIR)
+    return PROJECT_ROOT / output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute the site artifacts')
+    parser.add_argument('--musicals', nargs='*', help='musicals to build (default: all in the merged table)')
+    parser.add_argument('--force', action='store_true', help='rebuild even if the data is unchanged')
+    parser.add_argument('--render', action='store_true', help='run quarto render afterwards')
+    parser.add_argument('--render-musical', metavar='MUSICAL',
+                        help='render the page for one musical afterwards, to <musical>.html')
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("WICKED RETROSPECTIVE ANALYSIS - SITE ARTIFACTS")
+    print("="*70)
+
+    status = build_site_artifacts(args.musicals, force=args.force)
+    for musical, state in status.items():
+        mark = "✓" if state == 'built' else "-"
+        print(f"  {mark} {musical}: {state} ({artifact_path(musical).relative_to(PROJECT_ROOT)})")
+    if not status:
+        print("  ✗ No merged data - run 03_analyze_REAL_data.py first")
+
+    if args.render or args.render_musical:
+        if shutil.which('quarto') is None:
+            print("  ✗ quarto not found; install it from https://quarto.org to render the site")
+        else:
+            if args.render:
+                render()
+            if args.render_musical:
+                render(args.render_musical)
+
+    return status
+
+
+if __name__ == "__main__":
+    status = main()
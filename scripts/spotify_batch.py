@@ -0,0 +1,94 @@
+"""
+Batched Spotify lookups for track metadata and audio features
+
+The Web API accepts up to 50 ids per `tracks` call and up to 100 ids per
+`audio_features` call, so an album only needs a handful of requests instead
+of two per track. Ids from a batch that fails, and ids that come back as
+null inside a successful batch, are retried one at a time.
+"""
+
+MAX_TRACKS_PER_REQUEST = 50
+MAX_AUDIO_FEATURES_PER_REQUEST = 100
+
+
+def chunked(items, size):
+    """Split a list into consecutive chunks of at most `size` items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def album_track_items(sp, album_id):
+    """All simplified tracks of an album, page by page
+
+    Pages are requested with album_tracks(offset=...) rather than
+    sp.next(), so each page goes through the response cache.
+    """
+    results = sp.album_tracks(album_id, limit=MAX_TRACKS_PER_REQUEST)
+    items = list(results['items'])
+    while results.get('next') and results['items']:
+        results = sp.album_tracks(album_id, limit=MAX_TRACKS_PER_REQUEST, offset=len(items))
+        items.extend(results['items'])
+    return items
+
+
+def _fetch_individually(fetch_one, ids):
+    """Fetch ids one at a time; failures are logged and left as None"""
+    items = []
+    for track_id in ids:
+        try:
+            items.append(fetch_one(track_id))
+        except Exception as e:
+            print(f"  ✗ Error with {track_id}: {e}")
+            items.append(None)
+    return items
+
+
+def _fetch_batched(fetch_batch, fetch_one, ids, batch_size):
+    """Fetch `ids` in batches, retrying failed batches and null items id by id
+
+    Returns a dict of id -> result. Ids that fail individually are left
+    out, so callers can decide how to handle missing data.
+    """
+    results = {}
+
+    for batch in chunked(ids, batch_size):
+        try:
+            items = list(fetch_batch(batch))
+        except Exception as e:
+            print(f"  Batch of {len(batch)} failed ({e}), retrying individually...")
+            items = _fetch_individually(fetch_one, batch)
+        else:
+            items += [None] * (len(batch) - len(items))
+            missing = [i for i, item in enumerate(items) if not item]
+            if missing:
+                print(f"  {len(missing)} of {len(batch)} ids came back empty, retrying individually...")
+                retried = _fetch_individually(fetch_one, [batch[i] for i in missing])
+                for i, item in zip(missing, retried):
+                    items[i] = item
+
+        for track_id, item in zip(batch, items):
+            if item:
+                results[track_id] = item
+            else:
+                print(f"  ✗ No data for {track_id}")
+
+    return results
+
+
+def fetch_tracks(sp, track_ids):
+    """Get full track objects (popularity, album, urls) for many ids"""
+    return _fetch_batched(
+        lambda batch: sp.tracks(batch)['tracks'],
+        lambda track_id: sp.track(track_id),
+        track_ids,
+        MAX_TRACKS_PER_REQUEST
+    )
+
+
+def fetch_audio_features(sp, track_ids):
+    """Get audio features for many ids"""
+    return _fetch_batched(
+        lambda batch: sp.audio_features(batch),
+        lambda track_id: sp.audio_features([track_id])[0],
+        track_ids,
+        MAX_AUDIO_FEATURES_PER_REQUEST
+    )
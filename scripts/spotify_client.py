@@ -0,0 +1,107 @@
+"""
+Shared, lazily constructed Spotify client
+
+Importing this module does no I/O. The first call to get_client() reads
+spotify_config, restores the access token from PROJECT_ROOT/.cache if it
+has not expired, and builds a spotipy client on one pooled HTTP session.
+Every later call in the process reuses the same client, session and rate
+limiter.
+
+Set SPOTIFY_API_URL (e.g. http://127.0.0.1:8765) to talk to
+fake_spotify_server instead of the real API.
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+
+from rate_limit import TokenBucket, RateLimitedClient
+
+PROJECT_ROOT = Path(__file__).parent.parent
+TOKEN_CACHE_PATH = PROJECT_ROOT / '.cache'
+
+# Shared by every caller in the process; keep this under the app's API quota
+REQUESTS_PER_SECOND = 5
+POOL_SIZE = 16
+
+_lock = threading.Lock()
+_client = None
+
+
+def load_credentials():
+    """Read CLIENT_ID and CLIENT_SECRET from spotify_config.py"""
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.append(str(PROJECT_ROOT))
+    from spotify_config import CLIENT_ID, CLIENT_SECRET
+    return CLIENT_ID, CLIENT_SECRET
+
+
+def build_session(pool_size=POOL_SIZE):
+    """One keep-alive session without urllib3 retries
+
+    Retries are left to RateLimitedClient so 429s back off the whole pool.
+    """
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _build_client():
+    import spotipy
+    from spotipy.oauth2 import SpotifyClientCredentials
+    from spotipy.cache_handler import CacheFileHandler
+
+    api_url = os.environ.get('SPOTIFY_API_URL')
+    if api_url:
+        client_id, client_secret = 'fake-client-id', 'fake-client-secret'
+        cache_handler = spotipy.cache_handler.MemoryCacheHandler()
+    else:
+        client_id, client_secret = load_credentials()
+        cache_handler = CacheFileHandler(cache_path=str(TOKEN_CACHE_PATH))
+
+    session = build_session()
+    auth_manager = SpotifyClientCredentials(
+        client_id=client_id,
+        client_secret=client_secret,
+        cache_handler=cache_handler,
+        requests_session=session
+    )
+    if api_url:
+        auth_manager.OAUTH_TOKEN_URL = f'{api_url.rstrip("/")}/api/token'
+
+    client = spotipy.Spotify(auth_manager=auth_manager, requests_session=session)
+    if api_url:
+        client.prefix = f'{api_url.rstrip("/")}/v1/'
+
+    return RateLimitedClient(client, TokenBucket(rate=REQUESTS_PER_SECOND, capacity=REQUESTS_PER_SECOND * 2), name='spotify')
+
+
+def get_client():
+    """Process-wide rate-limited spotipy client, built on first use"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
+
+
+class LazyClient:
+    """Module-level stand-in that builds its client on first attribute access"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return getattr(self._client, name)
@@ -0,0 +1,168 @@
+"""
+Synthetic Spotify and TikTok tables at any size
+
+Generates tables with the same columns and the same kinds of mess as the
+real data, so the analysis can be benchmarked far beyond one soundtrack:
+
+- Spotify titles carry release suffixes (' - From "Wicked" Original Broadway
+  Cast Recording/2003', ' (Reprise)', ' - Dance Mix'), TikTok titles differ
+  in casing and punctuation
+- primary_trend_type holds one to three ' / '-joined labels
+- celebrity_boost, viral_moment and notes are free text naming creators
+  and celebrities
+
+Everything is drawn with NumPy from a seeded generator, so a (size, seed)
+pair always gives the same tables. Strings are assembled column-wise, which
+keeps 10^7 rows practical.
+
+    from synthetic_data import spotify_tracks, audio_features, tiktok_performance
+    tracks = spotify_tracks(100_000, seed=0)
+    tiktok = tiktok_performance(100_000, seed=0)
+"""
+
+import numpy as np
+import pandas as pd
+
+MUSICALS = ['Wicked', 'Hamilton', 'The Greatest Showman', 'Frozen Broadway', 'Mean Girls', 'Six']
+
+TITLE_WORDS = [
+    'Defying', 'Gravity', 'Popular', 'Dancing', 'Through', 'Life', 'Wonderful', 'Good', 'Deed',
+    'Wizard', 'Emerald', 'City', 'Something', 'Bad', 'Dear', 'Old', 'Shiz', 'Feeling', 'Loathing',
+    'Sentimental', 'Man', 'March', 'Witch', 'Hunters', 'Thank', 'Goodness', 'Mourns', 'Wicked',
+    'Unlimited', 'Girl', 'Shot', 'Room', 'Where', 'Happens', 'Satisfied', 'Burn', 'Helpless',
+    'Million', 'Dreams', 'Rewrite', 'Stars', 'Never', 'Enough', 'This', 'Is', 'Me', 'Let', 'It',
+    'Go', 'Monster', 'Apex', 'Predator', 'Stupid', 'With', 'Love', 'Queens', 'Heart', 'Don',
+    'Lose', 'Sleep', 'Finale', 'Overture', 'Prologue', 'Reprise', 'Moment', 'Forever',
+]
+
+# '' | ' - From "<musical>" ...' | ' (Reprise)' | ...
+RELEASE_SUFFIXES = np.array(['', None, ' (Reprise)', ' - Dance Mix', ' - Live'], dtype=object)
+RELEASE_WEIGHTS = [0.45, 0.4, 0.08, 0.04, 0.03]
+
+TREND_LABELS = [
+    'Dance', 'POV', 'Lip Sync', 'Vocal Showcase', 'Duets', 'Comedy', 'GRWM', 'Transition',
+    'Emotional', 'Storytelling', 'Thirst Edits', 'Friendship Posts', 'Couple Content',
+    'Background Music', 'Dramatic Edit', 'Satire',
+]
+
+CREATORS = [
+    'Ariana Grande', 'Cynthia Erivo', 'Jonathan Bailey', 'Idina Menzel', 'Kristin Chenoweth',
+    'Lin-Manuel Miranda', 'Hugh Jackman', 'Renee Rapp', 'Keala Settle', 'Zendaya',
+    'Broadway creators', 'dance creators', 'theatre kids', 'comedy accounts', 'fan edit accounts',
+]
+
+MOMENTS = [
+    'movie hype', 'vocal showcases', 'relatable lyrics', 'dance challenge', 'press tour clip',
+    'POV trend', 'duet chain', 'emotional edits', 'award show performance', 'meme format',
+]
+
+
+def _title_words(rng, n):
+    """n distinct three-word titles, with a part number once the word combinations run out"""
+    words = np.array(TITLE_WORDS, dtype=object)
+    k = len(words)
+    parts = -(-n // k ** 3)
+    index = rng.choice(k ** 3 * parts, n, replace=False)
+    titles = words[index % k] + ' ' + words[(index // k) % k] + ' ' + words[(index // k ** 2) % k]
+    part = index // k ** 3
+    return np.where(part > 0, titles + ' Pt. ' + (part + 1).astype(str).astype(object), titles)
+
+
+def _musicals(rng, n, musicals):
+    return np.array(musicals, dtype=object)[rng.integers(0, len(musicals), n)]
+
+
+def _join_choices(rng, vocabulary, n, max_items, separator):
+    """n strings of 1..max_items distinct vocabulary items"""
+    vocabulary = np.array(vocabulary, dtype=object)
+    counts = rng.integers(1, max_items + 1, n)
+    picks = rng.integers(0, len(vocabulary), (n, max_items))
+    for i in range(1, max_items):
+        # Redraw picks that repeat an earlier item in their row
+        clash = (picks[:, i:i + 1] == picks[:, :i]).any(axis=1)
+        while clash.any():
+            picks[clash, i] = rng.integers(0, len(vocabulary), clash.sum())
+            clash = (picks[:, i:i + 1] == picks[:, :i]).any(axis=1)
+    joined = vocabulary[picks[:, 0]]
+    for i in range(1, max_items):
+        joined = np.where(counts > i, joined + separator + vocabulary[picks[:, i]], joined)
+    return joined
+
+
+def spotify_tracks(n, seed=0, musicals=MUSICALS):
+    """spotify_tracks-shaped table with n rows (01_collect_spotify_data_REAL.py output)"""
+    rng = np.random.default_rng(seed)
+    musical = _musicals(rng, n, musicals)
+    kind = rng.choice(len(RELEASE_SUFFIXES), n, p=RELEASE_WEIGHTS)
+    suffix = np.where(
+        kind == 1, ' - From "' + musical + '" Original Broadway Cast Recording/2003', RELEASE_SUFFIXES[kind]
+    )
+    duration_ms = rng.integers(60_000, 480_000, n)
+    ids = pd.Series(np.arange(n)).astype(str).str.zfill(22).to_numpy(dtype=object)
+    return pd.DataFrame({
+        'musical': musical,
+        'track_id': ids,
+        'track_name': _title_words(rng, n) + suffix,
+        'track_number': rng.integers(1, 40, n),
+        'duration_ms': duration_ms,
+        'duration_min': np.round(duration_ms / 60000, 2),
+        'artist': _join_choices(rng, CREATORS[:10], n, 3, ', '),
+        'album': musical + ' (Original Broadway Cast Recording)',
+        'popularity': rng.integers(0, 100, n),
+        'release_date': np.array(['2003-01-01', '2013-01-01', '2024-11-22'], dtype=object)[rng.integers(0, 3, n)],
+        'spotify_url': 'https://open.spotify.com/track/' + ids,
+    })
+
+
+def audio_features(n, seed=0, musicals=MUSICALS):
+    """audio_features-shaped table with n rows (01_collect_spotify_data.py output)"""
+    tracks = spotify_tracks(n, seed, musicals)
+    rng = np.random.default_rng(seed + 1)
+    features = {
+        'danceability': rng.random(n),
+        'energy': rng.random(n),
+        'key': rng.integers(0, 12, n),
+        'loudness': -rng.random(n) * 20,
+        'mode': rng.integers(0, 2, n),
+        'speechiness': rng.random(n) * 0.3,
+        'acousticness': rng.random(n),
+        'instrumentalness': rng.random(n) * 0.1,
+        'liveness': rng.random(n) * 0.5,
+        'valence': rng.random(n),
+        'tempo': 60 + rng.random(n) * 120,
+        'time_signature': rng.choice([3, 4], n),
+    }
+    columns = ['musical', 'track_name', 'track_number', 'duration_ms', 'duration_min', 'track_id',
+               'popularity', 'release_date']
+    return tracks[columns].assign(**features)
+
+
+def tiktok_performance(n, seed=0, musicals=MUSICALS, match_fraction=0.8):
+    """tiktok_performance-shaped table for the tracks generated with the same n and seed
+
+    About match_fraction of the rows name one of those tracks (in TikTok's
+    casing and punctuation), the rest are sounds with no Spotify track.
+    """
+    tracks = spotify_tracks(n, seed, musicals)
+    rng = np.random.default_rng(seed + 2)
+    base = tracks['track_name'].str.replace(r' - .*$| \(Reprise\)$', '', regex=True).to_numpy(dtype=object)
+    matched = rng.random(n) < match_fraction
+    unmatched_titles = _title_words(np.random.default_rng(seed + 3), n)
+    names = np.where(matched, base, unmatched_titles + ' (Sped Up)')
+    style = rng.integers(0, 4, n)
+    names = np.where(style == 1, pd.Series(names).str.lower().to_numpy(dtype=object), names)
+    names = np.where(style == 2, names + '!', names)
+
+    videos = np.round(rng.pareto(1.2, n) * 5_000).astype(np.int64)
+    return pd.DataFrame({
+        'musical': tracks['musical'].to_numpy(),
+        'song_name': names,
+        'tiktok_video_count': videos,
+        'tiktok_view_estimate_millions': np.round(videos * rng.uniform(1e-3, 5e-3, n), 1),
+        'peak_trend_date': (np.datetime64('2024-11-22') + rng.integers(0, 330, n)).astype(str),
+        'weeks_trending': rng.integers(0, 20, n),
+        'primary_trend_type': _join_choices(rng, TREND_LABELS, n, 3, ' / '),
+        'viral_moment': _join_choices(rng, MOMENTS, n, 2, ' + '),
+        'celebrity_boost': _join_choices(rng, CREATORS, n, 3, ', '),
+        'notes': _join_choices(rng, MOMENTS, n, 2, ', '),
+    })
@@ -0,0 +1,326 @@
+"""
+Fill the TikTok collection template from public search and sound pages
+
+For each song in the template this searches TikTok, follows the first sound
+link and reads the sound page's rehydration JSON for the video count and the
+play counts of the top videos. Requests are made with asyncio over one
+pooled aiohttp session:
+
+- at most CONCURRENCY requests are in flight at once
+- each host gets its own AsyncTokenBucket; a 429 pauses that host
+- pages are parsed while they stream in, and the download stops as soon as
+  the data has been found (it sits in <head>, before the video feed)
+
+tiktok_view_estimate_millions is the sum of the top videos' plays plus the
+remaining videos at a discounted median of those plays, since the long tail
+of a sound gets far fewer views than its top videos. Annotation columns
+(trend type, viral moment, ...) are left for a human.
+
+Set TIKTOK_BASE_URL (e.g. http://127.0.0.1:8766) to scrape
+fake_tiktok_server instead of tiktok.com.
+
+    python scripts/tiktok_scraper.py --musical Wicked
+"""
+
+import argparse
+import asyncio
+import codecs
+import json
+import os
+import re
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import read_table
+from instrumentation import instrument, record_request
+from rate_limit import AsyncTokenBucket, retry_after_seconds
+
+PROJECT_ROOT = Path(__file__).parent.parent
+TIKTOK_DIR = PROJECT_ROOT / 'data' / 'tiktok'
+TEMPLATE_PATH = TIKTOK_DIR / 'tiktok_collection_template.csv'
+
+BASE_URL = 'https://www.tiktok.com'
+REHYDRATION_ID = '__UNIVERSAL_DATA_FOR_REHYDRATION__'
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+CONCURRENCY = 8
+REQUESTS_PER_SECOND = 2  # per host
+MAX_RETRIES = 3
+CHUNK_SIZE = 8192
+
+# Videos outside the top list get this fraction of the top videos' median plays
+TAIL_DISCOUNT = 0.05
+
+
+def parse_count(label):
+    """'287.0K videos' -> 287000"""
+    match = re.search(r'([\d.,]+)\s*([KMB]?)', label or '', re.IGNORECASE)
+    if not match:
+        return None
+    value = float(match.group(1).replace(',', ''))
+    return int(value * {'': 1, 'K': 1e3, 'M': 1e6, 'B': 1e9}[match.group(2).upper()])
+
+
+class SearchPageParser(HTMLParser):
+    """Finds the first /music/ link on a search results page"""
+
+    def __init__(self):
+        super().__init__()
+        self.sound_path = None
+
+    @property
+    def done(self):
+        return self.sound_path is not None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a' and self.sound_path is None:
+            path = urlparse(dict(attrs).get('href') or '').path
+            if path.startswith('/music/'):
+                self.sound_path = path
+
+
+class SoundPageParser(HTMLParser):
+    """Collects the rehydration JSON and the visible video count of a sound page"""
+
+    def __init__(self):
+        super().__init__()
+        self.data = None
+        self.video_label = None
+        self._in_data = False
+        self._in_count = False
+        self._buffer = []
+
+    @property
+    def done(self):
+        return self.data is not None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'script' and attrs.get('id') == REHYDRATION_ID:
+            self._in_data = True
+        elif attrs.get('data-e2e') == 'music-video-count':
+            self._in_count = True
+
+    def handle_data(self, data):
+        if self._in_data:
+            self._buffer.append(data)
+        elif self._in_count:
+            self.video_label = data
+
+    def handle_endtag(self, tag):
+        if self._in_data and tag == 'script':
+            self._in_data = False
+            try:
+                self.data = json.loads(''.join(self._buffer))
+            except ValueError:
+                pass
+        self._in_count = False
+
+    def stats(self):
+        """(video_count, [play counts of the listed videos])"""
+        detail = (self.data or {}).get('__DEFAULT_SCOPE__', {}).get('webapp.music-detail', {})
+        video_count = detail.get('musicInfo', {}).get('stats', {}).get('videoCount')
+        if video_count is None:
+            video_count = parse_count(self.video_label)
+        plays = [item.get('stats', {}).get('playCount', 0) for item in detail.get('itemList', [])]
+        return video_count, plays
+
+
+def estimate_views(video_count, plays, tail_discount=TAIL_DISCOUNT):
+    """Total views: listed videos exactly, the rest at a discounted median"""
+    if not video_count:
+        return 0.0
+    plays = np.asarray(plays, dtype=float)
+    if plays.size == 0:
+        return 0.0
+    tail = max(video_count - plays.size, 0)
+    return float(plays.sum() + tail * np.median(plays) * tail_discount)
+
+
+class TikTokScraper:
+    """Pooled, rate-limited async fetching of search and sound pages"""
+
+    def __init__(self, base_url=None, concurrency=CONCURRENCY, rate=REQUESTS_PER_SECOND):
+        self.base_url = (base_url or os.environ.get('TIKTOK_BASE_URL') or BASE_URL).rstrip('/')
+        self.concurrency = concurrency
+        self.rate = rate
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.buckets = {}
+        self.requests = 0
+        self.session = None
+
+    async def __aenter__(self):
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers={'User-Agent': USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=30)
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def bucket_for(self, url):
+        host = urlparse(url).netloc
+        if host not in self.buckets:
+            # Below one request per second a bucket of `rate` tokens could never fill
+            self.buckets[host] = AsyncTokenBucket(self.rate, capacity=max(1.0, self.rate))
+        return self.buckets[host]
+
+    async def fetch_parsed(self, url, parser, params=None):
+        """Stream `url` into `parser`, stopping once parser.done"""
+        import aiohttp
+
+        bucket = self.bucket_for(url)
+        endpoint = 'tiktok.' + urlparse(url).path.strip('/').split('/')[0]
+        for attempt in range(MAX_RETRIES + 1):
+            await bucket.acquire()
+            async with self.semaphore:
+                self.requests += 1
+                start = time.perf_counter()
+                async with self.session.get(url, params=params) as response:
+                    record_request(endpoint, time.perf_counter() - start, ok=response.status < 400)
+                    if response.status == 429 and attempt < MAX_RETRIES:
+                        bucket.pause(retry_after_seconds(response, attempt))
+                        continue
+                    if response.status == 404:
+                        return parser
+                    response.raise_for_status()
+
+                    decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+                    try:
+                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                            parser.feed(decoder.decode(chunk))
+                            if parser.done:
+                                break  # the rest of the page is the video feed
+                        else:
+                            parser.feed(decoder.decode(b'', final=True))
+                            parser.close()
+                    except aiohttp.ClientPayloadError:
+                        pass  # keep whatever was parsed before the connection dropped
+                    return parser
+        return parser
+
+    async def scrape_song(self, song_name):
+        """One template row's worth of numbers for `song_name`"""
+        search = await self.fetch_parsed(f'{self.base_url}/search', SearchPageParser(), {'q': song_name})
+        if search.sound_path is None:
+            return {'song_name': song_name, 'found': False}
+
+        sound = await self.fetch_parsed(f'{self.base_url}{search.sound_path}', SoundPageParser())
+        video_count, plays = sound.stats()
+        if video_count is None:
+            return {'song_name': song_name, 'found': False}
+
+        return {
+            'song_name': song_name,
+            'found': True,
+            'sound_url': f'{self.base_url}{search.sound_path}',
+            'tiktok_video_count': int(video_count),
+            'tiktok_view_estimate_millions': round(estimate_views(video_count, plays) / 1e6, 2),
+        }
+
+    async def scrape(self, song_names):
+        """Results per song; a song whose requests fail is reported with its error"""
+        results = await asyncio.gather(*(self.scrape_song(name) for name in song_names), return_exceptions=True)
+        for name, result in zip(song_names, results):
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result
+        return [
+            {'song_name': name, 'found': False, 'error': f'{type(result).__name__}: {result}'}
+            if isinstance(result, Exception) else result
+            for name, result in zip(song_names, results)
+        ]
+
+
+def scrape_songs(song_names, base_url=None, concurrency=CONCURRENCY, rate=REQUESTS_PER_SECOND):
+    """Scrape every song and return the results with the request count"""
+
+    async def run():
+        async with TikTokScraper(base_url, concurrency, rate) as scraper:
+            results = await scraper.scrape(song_names)
+            return pd.DataFrame(results), scraper.requests
+
+    return asyncio.run(run())
+
+
+def load_template(path, musical):
+    """The existing template, or a blank one from the musical's track names"""
+    if Path(path).exists():
+        return pd.read_csv(path)
+    tracks = read_table('audio_features', columns=['track_name'], musical=musical)
+    if tracks.empty:
+        tracks = read_table('spotify_tracks', columns=['track_name'], musical=musical)
+    template = pd.read_csv(TEMPLATE_PATH, nrows=0)
+    return template.reindex(range(len(tracks))).assign(
+        song_name=tracks['track_name'].values,
+        tiktok_video_count=0,
+        tiktok_view_estimate_millions=0.0,
+        weeks_trending=0
+    )
+
+
+def fill_template(template, results):
+    """Copy scraped numbers into the template; unfound songs keep their values"""
+    results = results.reindex(columns=results.columns.union(
+        ['song_name', 'found', 'tiktok_video_count', 'tiktok_view_estimate_millions'], sort=False
+    ))
+    found = results[results['found'].fillna(False).astype(bool)].set_index('song_name')
+    template = template.copy()
+    for column in ['tiktok_video_count', 'tiktok_view_estimate_millions']:
+        scraped = template['song_name'].map(found[column])
+        template[column] = scraped.fillna(template[column]).astype(template[column].dtype)
+    return template
+
+
+@instrument('tiktok_scrape')
+def main():
+    parser = argparse.ArgumentParser(description='Fill the TikTok collection template by scraping sound pages')
+    parser.add_argument('--musical', default='Wicked')
+    parser.add_argument('--template', type=Path, default=None,
+                        help='template CSV (default: the Wicked template, or <musical>_tiktok_collection_template.csv)')
+    parser.add_argument('--base-url', default=None, help='e.g. the URL of fake_tiktok_server')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND, help='requests per second per host')
+    args = parser.parse_args()
+
+    if args.template is None:
+        slug = re.sub(r'[^a-z0-9]+', '_', args.musical.lower()).strip('_')
+        args.template = TEMPLATE_PATH if args.musical == 'Wicked' else TIKTOK_DIR / f'{slug}_tiktok_collection_template.csv'
+
+    print("\n" + "="*70)
+    print(f"{args.musical.upper()} - TIKTOK SOUND PAGE SCRAPING")
+    print("="*70)
+
+    template = load_template(args.template, args.musical)
+    start = time.perf_counter()
+    results, requests = scrape_songs(template['song_name'].tolist(), args.base_url, args.concurrency, args.rate)
+    elapsed = time.perf_counter() - start
+
+    for row in results.itertuples(index=False):
+        if row.found:
+            print(f"  ✓ {row.song_name}: {row.tiktok_video_count:,} videos, ~{row.tiktok_view_estimate_millions}M views")
+        elif isinstance(getattr(row, 'error', None), str):
+            print(f"  ✗ {row.song_name}: {row.error}")
+        else:
+            print(f"  ✗ {row.song_name}: no sound page found")
+
+    filled = fill_template(template, results)
+    filled.to_csv(args.template, index=False)
+
+    print(f"\n✓ {int(results['found'].sum())}/{len(results)} songs in {elapsed:.1f}s ({requests} requests)")
+    print(f"✓ Saved to: {args.template}")
+    print("Fill in the trend type, viral moment and celebrity columns, then save as wicked_tiktok_performance.csv")
+    return filled
+
+
+if __name__ == "__main__":
+    filled = main()
@@ -0,0 +1,213 @@
+"""
+Incremental TikTok trend metrics from daily per-sound observations
+
+Observations are (sound, date, video_count, views) rows, where the counts are
+the new videos and views for that sound on that day. Batches are appended to
+data/tiktok/observations/<musical>.csv and folded into a small per-sound
+state, so each batch costs time proportional to its own size instead of the
+full history:
+
+- tiktok_video_count and tiktok_view_estimate_millions are running sums
+- peak_trend_date is the day with the most views so far
+- weeks_trending counts ISO weeks with at least WEEKLY_TRENDING_VIDEOS videos
+
+The sounds touched by a batch are also re-scored in a ViralityScorer, so the
+virality ranking stays current without re-ranking every sound.
+
+Sending the same (sound, date) again replaces the earlier value. Each musical
+has its own state in data/tiktok/trend_state/<musical>.json, and its per-song
+table is written to that musical's tiktok_performance partition. Hand-entered
+annotations (primary_trend_type, viral_moment, ...) are kept, and annotated
+songs with no observations yet stay in the table unchanged.
+
+    python scripts/tiktok_trends.py data/tiktok/daily_2024-12-01.csv --musical Wicked
+"""
+
+import argparse
+import json
+import os
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from dataset_store import DEFAULT_MUSICAL, read_table, write_table
+from virality import ViralityScorer
+
+PROJECT_ROOT = Path(__file__).parent.parent
+TIKTOK_DIR = PROJECT_ROOT / 'data' / 'tiktok'
+OBSERVATIONS_DIR = TIKTOK_DIR / 'observations'
+STATE_DIR = TIKTOK_DIR / 'trend_state'
+
+# Single-musical state from before states were kept per musical; read as Wicked's
+LEGACY_STATE_PATH = TIKTOK_DIR / 'trend_state.json'
+
+OBSERVATION_COLUMNS = ['sound', 'date', 'video_count', 'views']
+METRIC_COLUMNS = ['tiktok_video_count', 'tiktok_view_estimate_millions', 'peak_trend_date', 'weeks_trending']
+ANNOTATION_COLUMNS = ['primary_trend_type', 'viral_moment', 'celebrity_boost', 'notes']
+
+# A week counts towards weeks_trending once this many new videos use the sound
+WEEKLY_TRENDING_VIDEOS = 1000
+
+
+def iso_week(day):
+    year, week, _ = date.fromisoformat(day).isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+class SoundTrend:
+    """Running metrics for one sound"""
+
+    def __init__(self, daily=None, weekly=None, total_videos=0, total_views=0,
+                 peak_date=None, peak_views=-1, weeks_trending=0):
+        self.daily = daily or {}  # date -> [videos, views]
+        self.weekly = weekly or {}  # iso week -> videos
+        self.total_videos = total_videos
+        self.total_views = total_views
+        self.peak_date = peak_date
+        self.peak_views = peak_views
+        self.weeks_trending = weeks_trending
+
+    def observe(self, day, videos, views):
+        old_videos, old_views = self.daily.get(day, (0, 0))
+        self.daily[day] = [videos, views]
+        self.total_videos += videos - old_videos
+        self.total_views += views - old_views
+
+        week = iso_week(day)
+        before = self.weekly.get(week, 0)
+        after = before + videos - old_videos
+        self.weekly[week] = after
+        self.weeks_trending += (after >= WEEKLY_TRENDING_VIDEOS) - (before >= WEEKLY_TRENDING_VIDEOS)
+
+        if views > self.peak_views or (views == self.peak_views and day < self.peak_date):
+            self.peak_date, self.peak_views = day, views
+        elif day == self.peak_date and views < old_views:
+            # The peak day was revised down; only this sound is rescanned
+            self.peak_date, (_, self.peak_views) = min(
+                self.daily.items(), key=lambda item: (-item[1][1], item[0])
+            )
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+def state_path(musical, state_dir=None):
+    return Path(state_dir or STATE_DIR) / f'{musical}.json'
+
+
+class TrendTracker:
+    """One musical's per-sound SoundTrend states with JSON persistence"""
+
+    def __init__(self, musical=DEFAULT_MUSICAL, state_dir=None):
+        self.musical = musical
+        self.state_path = state_path(musical, state_dir or STATE_DIR)
+        self.sounds = {}
+        source = self.state_path
+        if not source.exists() and musical == DEFAULT_MUSICAL and LEGACY_STATE_PATH.exists():
+            source = LEGACY_STATE_PATH
+        if source.exists():
+            with open(source) as f:
+                self.sounds = {sound: SoundTrend(**state) for sound, state in json.load(f).items()}
+        self.virality = ViralityScorer().update(self.metrics(self.sounds))
+
+    def metrics(self, sounds):
+        """Virality inputs for `sounds`, indexed by sound"""
+        trends = [self.sounds[sound] for sound in sounds]
+        return pd.DataFrame({
+            'tiktok_video_count': [t.total_videos for t in trends],
+            'tiktok_view_estimate_millions': [round(t.total_views / 1e6, 2) for t in trends],
+            'weeks_trending': [t.weeks_trending for t in trends],
+        }, index=list(sounds))
+
+    def update(self, batch):
+        """Fold a batch of observations into the running metrics"""
+        batch = batch[OBSERVATION_COLUMNS].copy()
+        batch['date'] = pd.to_datetime(batch['date']).dt.strftime('%Y-%m-%d')
+        # Within one batch the last value for a (sound, date) wins
+        batch = batch.drop_duplicates(['sound', 'date'], keep='last')
+
+        for sound, day, videos, views in batch.itertuples(index=False):
+            trend = self.sounds.get(sound)
+            if trend is None:
+                trend = self.sounds[sound] = SoundTrend()
+            trend.observe(day, int(videos), int(views))
+        self.virality.update(self.metrics(batch['sound'].unique()))
+        return self
+
+    def save(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({sound: trend.to_dict() for sound, trend in self.sounds.items()}, f)
+        os.replace(tmp, self.state_path)
+
+    def performance_table(self, annotations=None):
+        """Per-song table in the wicked_tiktok_performance layout
+
+        Tracked sounds get their running metrics plus any annotations;
+        annotated songs that were never observed are kept as they are.
+        """
+        table = pd.DataFrame({
+            'song_name': list(self.sounds),
+            'tiktok_video_count': [t.total_videos for t in self.sounds.values()],
+            'tiktok_view_estimate_millions': [round(t.total_views / 1e6, 2) for t in self.sounds.values()],
+            'peak_trend_date': [t.peak_date for t in self.sounds.values()],
+            'weeks_trending': [t.weeks_trending for t in self.sounds.values()],
+        })
+        columns = ['song_name'] + METRIC_COLUMNS + ANNOTATION_COLUMNS
+        if annotations is None or annotations.empty:
+            return table.reindex(columns=columns)
+
+        annotations = annotations.reindex(columns=columns).drop_duplicates('song_name', keep='last')
+        tracked = annotations['song_name'].isin(table['song_name'])
+        table = table.merge(annotations.loc[tracked, ['song_name'] + ANNOTATION_COLUMNS], on='song_name', how='left')
+        untracked = annotations[~tracked]
+        if untracked.empty:
+            return table.reindex(columns=columns)
+        return pd.concat([table.reindex(columns=columns), untracked], ignore_index=True)
+
+
+def append_observations(batch, musical=DEFAULT_MUSICAL, log_dir=None):
+    """Append a batch to the musical's raw observation log"""
+    path = Path(log_dir or OBSERVATIONS_DIR) / f'{musical}.csv'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    batch[OBSERVATION_COLUMNS].to_csv(path, mode='a', header=not path.exists(), index=False)
+
+
+def ingest(batch, musical=DEFAULT_MUSICAL, tracker=None):
+    """Log a batch, update the musical's metrics and rewrite its per-song table"""
+    tracker = tracker or TrendTracker(musical)
+    if tracker.musical != musical:
+        raise ValueError(f"tracker holds {tracker.musical}'s sounds, not {musical}'s")
+    append_observations(batch, musical)
+    tracker.update(batch)
+    tracker.save()
+
+    annotations = read_table('tiktok_performance', musical=musical)
+    performance = tracker.performance_table(annotations)
+    write_table('tiktok_performance', performance, musical=musical)
+    return performance
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest daily TikTok sound observations')
+    parser.add_argument('files', nargs='+', help='CSV files with sound,date,video_count,views')
+    parser.add_argument('--musical', default=DEFAULT_MUSICAL)
+    args = parser.parse_args()
+
+    tracker = TrendTracker(args.musical)
+    for path in args.files:
+        batch = pd.read_csv(path)
+        performance = ingest(batch, args.musical, tracker)
+        print(f"✓ Ingested {len(batch)} observations from {path}")
+
+    print(f"\nTracking {len(tracker.sounds)} {args.musical} sounds")
+    print("\nTop 10 by virality score:")
+    for sound, score in tracker.virality.top(10):
+        print(f"  {tracker.virality.rank(sound):>3}. {sound} ({score:.2f})")
+    return performance
+
+
+if __name__ == "__main__":
+    performance = main()
@@ -0,0 +1,362 @@
+"""
+Match Spotify track titles to TikTok sound titles
+
+Spotify titles carry release noise (' - From "Wicked" Original Broadway Cast
+Recording/2003', ' - Remastered 2011', '(feat. ...)') and TikTok titles
+differ in casing and punctuation, so an exact join silently drops songs.
+Version qualifiers ('(Reprise)', ' - Dance Mix', 'Live') are kept: they name
+a different recording, not noise. Matching works in two passes over
+canonical titles:
+
+1. exact: titles that are equal after canonical_titles() are joined with a
+   hash join (score 1.0)
+2. fuzzy: the rest are compared by TF-IDF weighted character trigrams.
+   Trigrams are hashed into a fixed number of sparse columns straight from
+   the titles' bytes (code points for non-ASCII titles), so building the
+   index is pure NumPy. Candidate pairs are only the right titles that
+   share at least two of a left title's rarest trigrams (blocking), and each
+   candidate is then scored with its full cosine similarity. A trigram in
+   more than MAX_KEY_POSTINGS right titles is never a blocking key, which
+   caps the candidates per left title whatever the size of the right side.
+
+Canonical titles are computed with Arrow string kernels, and word splitting
+on the bytes, over the distinct titles; each distinct canonical title is
+indexed once, however many rows share it. The match is one-to-one: a right row goes to the left row that
+scores best against it (ties to the first left row), and the other left
+rows claiming it are left unmatched. The result is a match table with one
+row per matched left title:
+
+    left_index, right_index, left_title, right_title, score, method
+
+    from title_matching import match_titles
+    matches = match_titles(spotify['track_name'], tiktok['song_name'])
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+MIN_SCORE = 0.8
+N_FEATURES = 2 ** 20
+MAX_TITLE_LENGTH = 64
+
+# Each left title proposes candidates through its BLOCKING_KEYS rarest
+# trigrams, and a right title becomes a candidate when it shares at least
+# BLOCKING_MIN_SHARED of them. Trigrams in more than BLOCKING_MAX_DF of the
+# right titles, or in more than MAX_KEY_POSTINGS of them, are never keys
+# (all trigrams still count towards the score), so a left title has at most
+# BLOCKING_KEYS * MAX_KEY_POSTINGS candidates however large the right side is.
+BLOCKING_KEYS = 4
+BLOCKING_MIN_SHARED = 2
+BLOCKING_MAX_DF = 0.05
+MAX_KEY_POSTINGS = 1_000
+
+# Left titles are processed in chunks of about this many key postings
+CHUNK_POSTINGS = 5_000_000
+
+# Release noise, matched on lowercased titles: a ' - From "..."' suffix, a
+# ' - ...' suffix naming a remaster, cast recording, soundtrack or featured
+# artist, and any parenthetical naming one of those
+_NOISE_WORDS = r'remaster(?:ed)?|cast recording|soundtrack|feat\.?|featuring'
+_RELEASE_NOISE = (
+    rf'\s+-\s+(?:from\s+["“]|[^-]*\b(?:{_NOISE_WORDS})\b).*$'
+    rf'|\s*[\(\[][^\)\]]*\b(?:from|{_NOISE_WORDS})\b[^\)\]]*[\)\]]'
+)
+_NON_WORD = r'[^\p{L}\p{N}]+'
+
+
+def _string_buffers(titles):
+    """(offsets, UTF-8 bytes) of an Arrow large_string array without nulls, offsets from 0"""
+    offsets = np.frombuffer(titles.buffers()[1], dtype=np.int64)[titles.offset:titles.offset + len(titles) + 1]
+    data = titles.buffers()[2]
+    chars = np.frombuffer(data, dtype=np.uint8) if data is not None else np.empty(0, dtype=np.uint8)
+    return offsets - offsets[0], chars[offsets[0]:offsets[-1]]
+
+
+def _strip_noise(titles):
+    import pyarrow.compute as pc
+
+    titles = pc.replace_substring_regex(titles, _RELEASE_NOISE, ' ')
+    titles = pc.replace_substring(titles, '&', ' and ')
+    titles = pc.replace_substring(titles, "'", '')
+    return pc.replace_substring(titles, '’', '')
+
+
+def _ascii_words(titles):
+    """Object array of ASCII titles with each run of characters other than a-z and 0-9 as one space, trimmed
+
+    The same as replacing [^a-z0-9]+ by ' ', done on the bytes, where the
+    regex took most of the canonicalization time.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    offsets, chars = _string_buffers(titles)
+    word = ((chars >= ord('a')) & (chars <= ord('z'))) | ((chars >= ord('0')) & (chars <= ord('9')))
+    # The first character of a separator run stays, as a space; a run at the
+    # start of a title may follow the previous title's last word, which
+    # leaves a leading space for utf8_trim
+    keep = word.copy()
+    keep[1:] |= word[:-1]
+    kept = np.r_[0, np.cumsum(keep)]
+    words = pa.LargeStringArray.from_buffers(
+        len(titles), pa.py_buffer(kept[offsets].astype(np.int64)),
+        pa.py_buffer(np.where(word, chars, np.uint8(ord(' ')))[keep])
+    )
+    words = pc.utf8_slice_codeunits(pc.utf8_trim(words, ' '), 0, MAX_TITLE_LENGTH)
+    return words.to_numpy(zero_copy_only=False)
+
+
+def canonical_titles(titles):
+    """Object array of lowercase titles without release noise, accents or punctuation
+
+    Missing titles become ''. ASCII titles, the usual case, skip Unicode
+    normalization and are split into words on their bytes.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    values = np.asarray(titles, dtype=object)
+    try:
+        titles = pa.array(values, type=pa.large_string(), from_pandas=True)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Non-string titles (numbers, ...) count as missing
+        titles = pa.array([t if isinstance(t, str) else None for t in values], type=pa.large_string())
+    titles = _strip_noise(pc.utf8_lower(titles.fill_null('')))
+    is_ascii = pc.string_is_ascii(titles)
+    if pc.all(is_ascii).as_py() is not False:
+        return _ascii_words(titles)
+
+    canonical = np.empty(len(titles), dtype=object)
+    ascii_rows = is_ascii.to_numpy(zero_copy_only=False)
+    canonical[ascii_rows] = _ascii_words(titles.filter(is_ascii))
+    other = pc.utf8_normalize(titles.filter(pc.invert(is_ascii)), 'NFKD')
+    other = pc.replace_substring_regex(other, r'\p{Mn}+', '')
+    other = pc.replace_substring_regex(other, _NON_WORD, ' ')
+    other = pc.utf8_slice_codeunits(pc.utf8_trim(other, ' '), 0, MAX_TITLE_LENGTH)
+    canonical[~ascii_rows] = other.to_numpy(zero_copy_only=False)
+    return canonical
+
+
+def canonical_title(title):
+    """canonical_titles() of a single title"""
+    return canonical_titles([title])[0]
+
+
+def _ascii_trigrams(titles):
+    """(row, trigram code) for every trigram of ' <title> ', from an ASCII Arrow array"""
+    offsets, chars = _string_buffers(titles)
+    n = len(offsets) - 1
+    row = np.repeat(np.arange(n), np.diff(offsets))
+    # All titles back to back, each with a space before and after it
+    padded = np.full(len(chars) + 2 * n, ord(' '), dtype=np.int64)
+    padded[np.arange(len(chars)) + 2 * row + 1] = chars
+    windows = (padded[:-2] << 42) | (padded[1:-1] << 21) | padded[2:]
+    # Every window starting on a title's last character or its end padding
+    # straddles two titles
+    ends = offsets[1:] + 2 * np.arange(1, n + 1)
+    valid = np.ones(len(windows) + 2, dtype=bool)
+    valid[ends - 2] = valid[ends - 1] = False
+    return row, windows[valid[:-2]]
+
+
+def _unicode_trigrams(titles):
+    """(row, trigram code) for every trigram of ' <title> ', from code points"""
+    padded = np.array([f' {t} ' for t in titles])
+    width = padded.dtype.itemsize // 4
+    codes = padded.view(np.uint32).reshape(len(padded), width).astype(np.int64)
+    grams = (codes[:, :-2] << 42) | (codes[:, 1:-1] << 21) | codes[:, 2:]
+    lengths = np.char.str_len(padded)
+    valid = np.arange(width - 2)[None, :] < (lengths - 2)[:, None]
+    return np.nonzero(valid)[0], grams[valid]
+
+
+def trigram_counts(titles):
+    """Sparse (len(titles), N_FEATURES) hashed character-trigram counts"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if len(titles) == 0:
+        return sparse.csr_matrix((0, N_FEATURES), dtype=np.float32)
+    values = pa.array(np.asarray(titles, dtype=object), type=pa.large_string())
+    is_ascii = pc.string_is_ascii(values).to_numpy(zero_copy_only=False)
+    if is_ascii.all():
+        rows, grams = _ascii_trigrams(values)
+    else:
+        # Rows are regrouped in order; either path gives the same codes for ASCII titles
+        ascii_positions, other_positions = np.nonzero(is_ascii)[0], np.nonzero(~is_ascii)[0]
+        ascii_rows, ascii_grams = _ascii_trigrams(values.filter(pa.array(is_ascii)))
+        other_rows, other_grams = _unicode_trigrams(np.asarray(titles, dtype=object)[other_positions])
+        rows = np.concatenate([ascii_positions[ascii_rows], other_positions[other_rows]])
+        order = np.argsort(rows, kind='stable')
+        rows, grams = rows[order], np.concatenate([ascii_grams, other_grams])[order]
+
+    # Multiplicative hash; the column is bits 20-39 of the product, since
+    # its lowest bits are poorly mixed
+    columns = ((grams * np.int64(0x9E3779B97F4A7C15 - 2 ** 64)) >> 20) & (N_FEATURES - 1)
+    indptr = np.r_[0, np.cumsum(np.bincount(rows, minlength=len(titles)))]
+    counts = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), columns, indptr), shape=(len(titles), N_FEATURES)
+    )
+    counts.sum_duplicates()
+    return counts
+
+
+def _tfidf(counts, idf):
+    """Rows of counts weighted by idf and scaled to unit length"""
+    rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+    weighted = counts.data * idf[counts.indices]
+    norms = np.sqrt(np.bincount(rows, weights=weighted ** 2, minlength=counts.shape[0]))
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix((weighted / norms[rows], counts.indices, counts.indptr), shape=counts.shape)
+
+
+def _rarest_columns(matrix, doc_freq, keys, max_df):
+    """Binary matrix keeping each row's `keys` lowest-document-frequency columns"""
+    matrix = matrix.tocsr()
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    freq = doc_freq[matrix.indices]
+    usable = (freq > 0) & (freq <= max_df)
+    order = np.lexsort((freq, ~usable, rows))
+    rank = np.arange(len(order)) - matrix.indptr[rows[order]]
+    keep = order[(rank < keys) & usable[order]]
+    return sparse.csr_matrix(
+        (np.ones(len(keep), dtype=np.float32), (rows[keep], matrix.indices[keep])),
+        shape=matrix.shape
+    )
+
+
+def _row_dots(a, b, left, right):
+    """a[left[k]] . b[right[k]] for every k"""
+    return np.asarray(a[left].multiply(b[right]).sum(axis=1)).ravel()
+
+
+def fuzzy_match(left_titles, right_titles, min_score=MIN_SCORE):
+    """Best right title for each left title by trigram TF-IDF cosine
+
+    Both arguments are sequences of canonical titles. Returns a frame of
+    left_position, right_position, score for pairs scoring >= min_score.
+    """
+    empty = pd.DataFrame({'left_position': [], 'right_position': [], 'score': []})
+    if len(left_titles) == 0 or len(right_titles) == 0:
+        return empty
+
+    left_counts = trigram_counts(left_titles)
+    right_counts = trigram_counts(right_titles)
+
+    doc_freq = np.bincount(right_counts.indices, minlength=N_FEATURES)
+    idf = (np.log((1 + right_counts.shape[0]) / (1 + doc_freq)) + 1).astype(np.float32)
+    left = _tfidf(left_counts, idf)
+    right = _tfidf(right_counts, idf)
+
+    max_df = max(1, min(MAX_KEY_POSTINGS, int(BLOCKING_MAX_DF * right.shape[0])))
+    left_keys = _rarest_columns(left, doc_freq, BLOCKING_KEYS, max_df)
+    # Posting lists (trigram -> right rows), only for trigrams that can be keys
+    postable = doc_freq[right.indices] <= max_df
+    right_t = sparse.csr_matrix(
+        (np.ones(postable.sum(), dtype=np.float32),
+         (right.indices[postable], np.repeat(np.arange(right.shape[0]), np.diff(right.indptr))[postable])),
+        shape=(N_FEATURES, right.shape[0])
+    )
+
+    # Chunk boundaries bound the size of each candidate product
+    postings = np.cumsum(np.asarray(left_keys @ doc_freq.astype(np.float64)).ravel())
+    bounds = np.searchsorted(postings, np.arange(CHUNK_POSTINGS, postings[-1], CHUNK_POSTINGS))
+    bounds = np.unique(np.concatenate([[0], bounds, [left.shape[0]]]))
+
+    matches = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        chunk = left[start:stop]
+        keys = left_keys[start:stop]
+        shared = (keys @ right_t).tocoo()
+        # A close match shares at least two of a title's rarest trigrams
+        required = np.minimum(np.diff(keys.indptr), BLOCKING_MIN_SHARED)
+        candidates = shared.data >= required[shared.row]
+        if not candidates.any():
+            continue
+        candidates = sparse.coo_matrix(
+            (shared.data[candidates], (shared.row[candidates], shared.col[candidates])), shape=shared.shape
+        )
+        scores = _row_dots(chunk, right, candidates.row, candidates.col)
+        keep = scores >= min_score
+        if not keep.any():
+            continue
+        found = pd.DataFrame({
+            'left_position': candidates.row[keep] + start,
+            'right_position': candidates.col[keep],
+            'score': scores[keep],
+        })
+        best = found.sort_values(['left_position', 'score', 'right_position'], ascending=[True, False, True])
+        matches.append(best.drop_duplicates('left_position'))
+
+    return pd.concat(matches, ignore_index=True) if matches else empty
+
+
+def _canonicalize(titles):
+    """canonical_titles() of a Series, computed once per distinct title"""
+    codes, uniques = pd.factorize(titles.to_numpy(dtype=object), use_na_sentinel=False)
+    canonical = canonical_titles(uniques)
+    return pd.Series(canonical[codes], index=titles.index)
+
+
+def match_titles(left, right, min_score=MIN_SCORE):
+    """One-to-one match table from left titles to their best right titles
+
+    `left` and `right` are Series of raw titles. left_index/right_index are
+    their index labels; left rows with no match above min_score, or whose
+    best right row went to a better-scoring left row, are omitted.
+    """
+    left_canonical = _canonicalize(left)
+    right_canonical = _canonicalize(right)
+
+    # Work on distinct canonical titles; the first right row wins ties
+    right_unique = right_canonical[right_canonical != ''].drop_duplicates()
+    right_lookup = pd.Index(right_unique.to_numpy(dtype=object))
+    left_unique = pd.Index(pd.unique(left_canonical[left_canonical != ''].to_numpy(dtype=object)))
+
+    position = right_lookup.get_indexer(left_unique)
+    exact = position >= 0
+    pairs = pd.DataFrame({
+        'canonical': left_unique[exact],
+        'right_index': right_unique.index[position[exact]],
+        'score': 1.0,
+        'method': 'exact',
+    })
+
+    unmatched = left_unique[~exact]
+    fuzzy = fuzzy_match(unmatched.to_numpy(dtype=object), right_lookup.to_numpy(dtype=object), min_score)
+    if len(fuzzy):
+        pairs = pd.concat([pairs, pd.DataFrame({
+            'canonical': unmatched[fuzzy['left_position'].astype(int)],
+            'right_index': right_unique.index[fuzzy['right_position'].astype(int)],
+            'score': fuzzy['score'].round(4).values,
+            'method': 'fuzzy',
+        })], ignore_index=True)
+
+    table = pd.DataFrame({'left_index': left.index, 'canonical': left_canonical.values}).merge(
+        pairs, on='canonical', how='inner'
+    )
+    # Each right row keeps its best-scoring left row, the first one on ties
+    table['order'] = np.arange(len(table))
+    table = table.sort_values(['score', 'order'], ascending=[False, True]).drop_duplicates('right_index')
+    table = table.sort_values('order', ignore_index=True)
+    table['left_title'] = left.loc[table['left_index']].values
+    table['right_title'] = right.loc[table['right_index']].values
+    return table[['left_index', 'right_index', 'left_title', 'right_title', 'score', 'method']]
+
+
+def merge_matched(left, right, left_on, right_on, min_score=MIN_SCORE):
+    """pd.merge(left, right, left_on=..., right_on=..., how='inner') on matched titles
+
+    Overlapping columns get the usual _x/_y suffixes; a match_score column is
+    added at the end.
+    """
+    left = left.reset_index(drop=True)
+    right = right.reset_index(drop=True)
+    matches = match_titles(left[left_on], right[right_on], min_score)
+
+    keys = matches[['left_index', 'right_index', 'score']]
+    merged = left.merge(keys, left_index=True, right_on='left_index', how='inner')
+    merged = merged.merge(right, left_on='right_index', right_index=True, how='inner')
+    merged['match_score'] = merged.pop('score')
+    return merged.drop(columns=['left_index', 'right_index']).reset_index(drop=True)
@@ -0,0 +1,166 @@
+"""
+Multi-label trend types as bitsets
+
+primary_trend_type packs several labels into one string ('Dance / POV',
+'GRWM / Transition'), so grouping on the raw string puts 'Dance' and
+'Dance / POV' in different buckets. TrendLabelIndex parses each distinct
+string once into canonical labels and keeps one bit per label per song:
+an (n_songs, n_words) uint64 array, bit i of word i // 64 for label i.
+
+- Canonical labels are the ones in data/tiktok/content_type_reference.csv,
+  split on ' / ' ('Lip Sync / Vocal Showcase' -> 'Lip Sync', 'Vocal
+  Showcase'). ALIASES maps the spellings used in the TikTok sheets onto
+  them ('Dance' -> 'Dance Challenge', 'Sad POV' -> 'Sad Content' + 'POV').
+  Labels outside the reference get bits of their own after the canonical
+  ones, so nothing is dropped.
+- Queries (all_of / any_of / none_of) are AND / OR tests of every song's
+  words against a label mask, vectorized over songs.
+- Per-label aggregates unpack the bits into an indicator matrix and sum
+  with one matrix product; a song counts towards each of its labels.
+
+    from trend_labels import TrendLabelIndex
+    labels = TrendLabelIndex.from_series(df['primary_trend_type'])
+    df[labels.query(all_of=['Dance Challenge', 'POV'])]
+    labels.aggregate(df)    # one row per label
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent
+REFERENCE_PATH = PROJECT_ROOT / 'data' / 'tiktok' / 'content_type_reference.csv'
+
+SEPARATOR = ' / '
+
+# Spelling in the TikTok sheets -> canonical label(s)
+ALIASES = {
+    'Dance': ['Dance Challenge'],
+    'Dance Challenges': ['Dance Challenge'],
+    'Duet': ['Duets'],
+    'Duet Format': ['Duets'],
+    'Sad POV': ['Sad Content', 'POV'],
+    'Romantic POV': ['Couple Content', 'POV'],
+    'Dramatic Lip Sync': ['Lip Sync'],
+    'Outfit Transitions': ['Transition'],
+    'Satire': ['Parody'],
+}
+
+
+def canonical_labels(path=REFERENCE_PATH):
+    """Labels of content_type_reference.csv, compound types split, in file order"""
+    content_types = pd.read_csv(path)['content_type']
+    return list(dict.fromkeys(
+        label.strip() for content_type in content_types for label in content_type.split(SEPARATOR)
+    ))
+
+
+def split_labels(text, aliases=ALIASES):
+    """'Sad POV / Emotional' -> ['Sad Content', 'POV', 'Emotional']"""
+    if not isinstance(text, str):
+        return []
+    aliases = {alias.casefold(): labels for alias, labels in aliases.items()}
+    labels = []
+    for label in text.split(SEPARATOR.strip()):
+        label = ' '.join(label.split())
+        if label:
+            labels.extend(aliases.get(label.casefold(), [label]))
+    return list(dict.fromkeys(labels))
+
+
+class TrendLabelIndex:
+    """Bitset of trend labels per song, aligned with the series it was built from"""
+
+    def __init__(self, bits, labels, index=None):
+        self.bits = bits
+        self.labels = list(labels)
+        self.positions = {label.casefold(): i for i, label in enumerate(self.labels)}
+        self.index = index if index is not None else pd.RangeIndex(len(bits))
+
+    @classmethod
+    def from_series(cls, values, labels=None, aliases=ALIASES):
+        """Parse every distinct trend string once and set one bit per label"""
+        labels = list(canonical_labels() if labels is None else labels)
+        positions = {label.casefold(): i for i, label in enumerate(labels)}
+
+        codes, uniques = pd.factorize(pd.Series(values).astype(object), use_na_sentinel=True)
+        parsed = [split_labels(text, aliases) for text in uniques]
+        for label in (label for row in parsed for label in row):
+            if label.casefold() not in positions:
+                positions[label.casefold()] = len(labels)
+                labels.append(label)
+
+        n_words = max(1, -(-len(labels) // 64))
+        unique_bits = np.zeros((len(uniques) + 1, n_words), dtype=np.uint64)  # last row: missing
+        for row, row_labels in enumerate(parsed):
+            for label in row_labels:
+                position = positions[label.casefold()]
+                unique_bits[row, position // 64] |= np.uint64(1) << np.uint64(position % 64)
+        return cls(unique_bits[codes], labels, getattr(values, 'index', None))
+
+    def __len__(self):
+        return len(self.bits)
+
+    def mask(self, labels):
+        """Word array with the bits of `labels` set"""
+        words = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        for label in ([labels] if isinstance(labels, str) else labels):
+            try:
+                position = self.positions[label.casefold()]
+            except KeyError:
+                raise KeyError(f"unknown trend label {label!r}") from None
+            words[position // 64] |= np.uint64(1) << np.uint64(position % 64)
+        return words
+
+    def query(self, all_of=(), any_of=(), none_of=()):
+        """Boolean array: songs with every label in all_of, one of any_of and none of none_of"""
+        selected = np.ones(len(self), dtype=bool)
+        if all_of:
+            required = self.mask(all_of)
+            selected &= ((self.bits & required) == required).all(axis=1)
+        if any_of:
+            selected &= (self.bits & self.mask(any_of)).any(axis=1)
+        if none_of:
+            selected &= ~(self.bits & self.mask(none_of)).any(axis=1)
+        return selected
+
+    def indicator(self):
+        """(n_songs, n_labels) boolean matrix"""
+        unpacked = np.unpackbits(self.bits.astype('<u8').view(np.uint8), axis=1, bitorder='little')
+        return unpacked[:, :len(self.labels)].astype(bool)
+
+    def labels_of(self, position):
+        """Labels of the song at `position`"""
+        flags = np.unpackbits(self.bits[position].astype('<u8').view(np.uint8), bitorder='little')
+        return [label for label, flag in zip(self.labels, flags) if flag]
+
+    def counts(self):
+        """Number of songs per label"""
+        return pd.Series(self.indicator().sum(axis=0), index=pd.Index(self.labels, name='trend_label'))
+
+    def aggregate(self, df):
+        """analyze_content_types' table with one row per label instead of per raw string
+
+        A song tagged 'Dance / POV' counts towards both Dance Challenge and
+        POV. Labels no song carries are left out.
+        """
+        indicator = self.indicator().astype(np.float64)
+
+        def sums(column):
+            values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+            present = ~np.isnan(values)
+            return indicator.T @ np.where(present, values, 0), indicator.T @ present
+
+        virality_sum, virality_count = sums('virality_score')
+        videos_sum, _ = sums('tiktok_video_count')
+        weeks_sum, weeks_count = sums('weeks_trending')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            performance = pd.DataFrame({
+                'avg_virality_score': virality_sum / virality_count,
+                'num_songs': virality_count.astype('int64'),
+                'total_videos': videos_sum.astype('int64'),
+                'avg_weeks_trending': weeks_sum / weeks_count,
+            }, index=pd.Index(self.labels, name='trend_label')).round(2)
+        performance = performance[indicator.sum(axis=0) > 0]
+        return performance.sort_values('avg_virality_score', ascending=False)
@@ -0,0 +1,138 @@
+"""
+Incremental virality scores and ranks
+
+virality_score is the weighted sum of each TikTok metric divided by its
+maximum over all songs (see VIRALITY_WEIGHTS), rounded to 2 decimals, and
+virality_rank is its descending average rank cast to int. These are the
+same numbers merge_data used to get from a full recompute and re-rank.
+
+ViralityScorer keeps every metric's values in a sorted list, so the maxima
+are always at hand, and keeps the scores in a sorted list searched with
+bisect. Updating some songs only touches their own entries unless a
+maximum actually moves; only then is every score rescaled. rank() and top()
+are binary searches and slices.
+
+    scorer = ViralityScorer().update(tiktok.set_index('song_name'))
+    scorer.rank('Popular'), scorer.top(5)
+"""
+
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+import pandas as pd
+
+# metric -> points for the song with the highest value
+VIRALITY_WEIGHTS = {
+    'tiktok_video_count': 50,
+    'tiktok_view_estimate_millions': 30,
+    'weeks_trending': 20,
+}
+
+
+class ViralityScorer:
+    """Running virality scores with order-statistic queries"""
+
+    def __init__(self, weights=VIRALITY_WEIGHTS):
+        self.weights = dict(weights)
+        self.values = {}  # key -> tuple of metric values
+        self.scores = {}  # key -> score
+        self._sorted_values = {metric: [] for metric in self.weights}
+        self._sorted_scores = []  # ascending scores
+        self._ranked = []  # (-score, key), best first
+        self.rescales = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def _maxima(self):
+        return tuple(values[-1] if values else 0 for values in self._sorted_values.values())
+
+    def _score(self, values, maxima):
+        total = 0.0
+        for (metric, weight), value, maximum in zip(self.weights.items(), values, maxima):
+            # Same operation order as the pandas expression, so rounding agrees
+            total = total + (value / maximum) * weight if maximum else total
+        return float(np.round(total, 2))
+
+    def _insert_score(self, key, score):
+        self.scores[key] = score
+        insort(self._sorted_scores, score)
+        insort(self._ranked, (-score, key))
+
+    def _remove_score(self, key):
+        score = self.scores.pop(key)
+        del self._sorted_scores[bisect_left(self._sorted_scores, score)]
+        del self._ranked[bisect_left(self._ranked, (-score, key))]
+
+    def _rescore_all(self, maxima):
+        self.rescales += 1
+        self.scores = {key: self._score(values, maxima) for key, values in self.values.items()}
+        self._sorted_scores = sorted(self.scores.values())
+        self._ranked = sorted((-score, key) for key, score in self.scores.items())
+
+    def update(self, rows):
+        """Add or replace songs from a frame indexed by key with the metric columns"""
+        before = self._maxima()
+        metrics = list(self.weights)
+        changed = []
+        for key, *values in rows[metrics].itertuples(name=None):
+            values = tuple(float(v) for v in values)
+            old = self.values.get(key)
+            if old == values:
+                continue
+            if old is not None:
+                for metric, value in zip(metrics, old):
+                    sorted_values = self._sorted_values[metric]
+                    del sorted_values[bisect_left(sorted_values, value)]
+            for metric, value in zip(metrics, values):
+                insort(self._sorted_values[metric], value)
+            self.values[key] = values
+            changed.append(key)
+
+        maxima = self._maxima()
+        if maxima != before:
+            self._rescore_all(maxima)
+        else:
+            for key in dict.fromkeys(changed):
+                if key in self.scores:
+                    self._remove_score(key)
+                self._insert_score(key, self._score(self.values[key], maxima))
+        return self
+
+    def remove(self, key):
+        """Drop a song; rescales only if it held a maximum"""
+        before = self._maxima()
+        for metric, value in zip(self.weights, self.values.pop(key)):
+            sorted_values = self._sorted_values[metric]
+            del sorted_values[bisect_left(sorted_values, value)]
+        self._remove_score(key)
+        maxima = self._maxima()
+        if maxima != before:
+            self._rescore_all(maxima)
+        return self
+
+    def score(self, key):
+        return self.scores[key]
+
+    def rank(self, key):
+        """Descending average rank (ties share the mean), truncated to int"""
+        score = self.scores[key]
+        below = bisect_left(self._sorted_scores, score)
+        ties = bisect_right(self._sorted_scores, score) - below
+        higher = len(self._sorted_scores) - below - ties
+        return int(higher + (ties + 1) / 2)
+
+    def top(self, k=10):
+        """[(key, score), ...] for the k highest scores"""
+        return [(key, -neg_score) for neg_score, key in self._ranked[:k]]
+
+    def table(self):
+        """virality_score and virality_rank for every key, in insertion order"""
+        keys = list(self.values)
+        return pd.DataFrame({
+            'virality_score': [self.scores[key] for key in keys],
+            'virality_rank': [self.rank(key) for key in keys],
+        }, index=keys)
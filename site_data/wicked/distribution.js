@@ -0,0 +1 @@
+lazyPlots.register("site_data/wicked/distribution.js",{"traces":[{"hovertemplate":"Popularity: %{x}<br>Count: %{y}<extra></extra>","marker":{"color":"#00A86B","line":{"color":"#006B3F","width":2}},"nbinsx":15,"type":"histogram"}],"columns":{"0.x":[52,51,53,51,53,50,49,44,56,53,49,55,57,51,58]},"layout":{"shapes":[{"line":{"color":"#E91E8C","dash":"dash","width":3},"type":"line","x0":52.13333333333333,"x1":52.13333333333333,"xref":"x","y0":0,"y1":1,"yref":"y domain"}],"annotations":[{"font":{"color":"#E91E8C","size":14},"showarrow":false,"text":"Mean: 52.1","x":52.13333333333333,"xanchor":"left","xref":"x","y":1,"yanchor":"top","yref":"y domain"}],"title":{"font":{"size":22,"color":"#00A86B","family":"Arial Black"},"text":"<b>Spotify Popularity Distribution</b><br><sub>How popular are Wicked songs?</sub>","x":0.5,"xanchor":"center"},"xaxis":{"title":{"text":"Popularity Score (0-100)"},"gridcolor":"rgba(0,107,63,0.1)","range":[0,100]},"yaxis":{"title":{"text":"Number of Songs"},"gridcolor":"rgba(0,107,63,0.1)"},"height":450,"plot_bgcolor":"rgba(255,255,255,0.95)","paper_bgcolor":"white","showlegend":false}});
@@ -0,0 +1 @@
+lazyPlots.register("site_data/wicked/duration.js",{"traces":[{"hovertemplate":"<b>%{text}</b><br>Duration: %{x:.2f} min<br>Popularity: %{y}/100<extra></extra>","marker":{"colorbar":{"tickfont":{"size":12},"title":{"font":{"size":14},"text":"Popularity"}},"colorscale":[[0,"#E91E8C"],[0.5,"#FFD700"],[1,"#00A86B"]],"line":{"color":"#006B3F","width":2},"showscale":true,"size":15},"mode":"markers","type":"scatter"},{"hoverinfo":"skip","line":{"color":"#E91E8C","dash":"dash","width":3},"mode":"lines","name":"Trend Line","type":"scatter"}],"columns":{"0.marker.color":[52,51,53,51,53,50,49,44,56,53,49,55,57,51,58],"0.text":["No One Mourns The Wicked","The Wizard And I","What Is This Feeling?","Dancing Through Life","Popular","I'm Not That Girl","One Short Day","A Sentimental Man","Defying Gravity","Thank Goodness","Wonderful","As Long As You're Mine","No Good Deed","March Of The Witch Hunters","For Good"],"0.x":[6.68,5.16,3.54,7.62,3.74,2.98,3.06,1.27,5.9,6.38,4.95,3.77,3.53,1.52,5.11],"0.y":[52,51,53,51,53,50,49,44,56,53,49,55,57,51,58],"1.x":[1.27,1.334,1.398,1.462,1.527,1.591,1.655,1.719,1.783,1.847,1.911,1.976,2.04,2.104,2.168,2.232,2.296,2.36,2.425,2.489,2.553,2.617,2.681,2.745,2.809,2.874,2.938,3.002,3.066,3.13,3.194,3.258,3.323,3.387,3.451,3.515,3.579,3.643,3.707,3.772,3.836,3.9,3.964,4.028,4.092,4.156,4.221,4.285,4.349,4.413,4.477,4.541,4.605,4.669,4.734,4.798,4.862,4.926,4.99,5.054,5.118,5.183,5.247,5.311,5.375,5.439,5.503,5.567,5.632,5.696,5.76,5.824,5.888,5.952,6.016,6.081,6.145,6.209,6.273,6.337,6.401,6.465,6.53,6.594,6.658,6.722,6.786,6.85,6.914,6.979,7.043,7.107,7.171,7.235,7.299,7.363,7.428,7.492,7.556,7.62],"1.y":[49.939,49.985,50.031,50.076,50.122,50.168,50.213,50.259,50.305,50.351,50.396,50.442,50.488,50.534,50.579,50.625,50.671,50.717,50.762,50.808,50.854,50.9,50.945,50.991,51.037,51.082,51.128,51.174,51.22,51.265,51.311,51.357,51.403,51.448,51.494,51.54,51.586,51.631,51.677,51.723,51.768,51.814,51.86,51.906,51.951,51.997,52.043,52.089,52.134,52.18,52.226,52.272,52.317,52.363,52.409,52.455,52.5,52.546,52.592,52.637,52.683,52.729,52.775,52.82,52.866,52.912,52.958,53.003,53.049,53.095,53.141,53.186,53.232,53.278,53.323,53.369,53.415,53.461,53.506,53.552,53.598,53.644,53.689,53.735,53.781,53.827,53.872,53.918,53.964,54.01,54.055,54.101,54.147,54.192,54.238,54.284,54.33,54.375,54.421,54.467]},"layout":{"title":{"font":{"size":22,"color":"#00A86B","family":"Arial Black"},"text":"<b>Song Duration vs Popularity</b><br><sub>Is there a sweet spot for song length?</sub>","x":0.5,"xanchor":"center"},"legend":{"yanchor":"top","y":0.99,"xanchor":"right","x":0.99,"bgcolor":"rgba(255,255,255,0.8)"},"xaxis":{"title":{"text":"Duration (minutes)"},"gridcolor":"rgba(0,107,63,0.1)"},"yaxis":{"title":{"text":"Spotify Popularity Score"},"gridcolor":"rgba(0,107,63,0.1)"},"height":500,"plot_bgcolor":"rgba(255,255,255,0.95)","paper_bgcolor":"white","showlegend":true}});
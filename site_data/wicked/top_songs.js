@@ -0,0 +1 @@
+lazyPlots.register("site_data/wicked/top_songs.js",{"traces":[{"hovertemplate":"<b>%{y}</b><br>Popularity: %{x}/100<extra></extra>","marker":{"colorscale":[[0,"#E91E8C"],[0.5,"#FFD700"],[1,"#00A86B"]],"line":{"color":"#006B3F","width":2}},"orientation":"h","textfont":{"color":"#1C1C1C","family":"Arial Black","size":14},"textposition":"outside","type":"bar"}],"columns":{"0.marker.color":[51,51,52,53,53,53,55,56,57,58],"0.text":[51,51,52,53,53,53,55,56,57,58],"0.x":[51,51,52,53,53,53,55,56,57,58],"0.y":["Dancing Through Life","The Wizard And I","No One Mourns The Wicked","Thank Goodness","What Is This Feeling?","Popular","As Long As You're Mine","Defying Gravity","No Good Deed","For Good"]},"layout":{"title":{"font":{"size":24,"color":"#00A86B","family":"Arial Black"},"text":"<b>Top 10 Most Popular Wicked Songs</b><br><sub>Based on Spotify Popularity Scores</sub>","x":0.5,"xanchor":"center"},"font":{"size":13,"family":"Arial"},"xaxis":{"title":{"text":"Spotify Popularity Score (0-100)"},"gridcolor":"rgba(0,107,63,0.1)","range":[0,100]},"yaxis":{"title":{"text":""}},"height":600,"plot_bgcolor":"rgba(255,255,255,0.95)","paper_bgcolor":"white","showlegend":false}});
@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# The scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+# Keep test runs out of data/cache/metrics
+os.environ.setdefault('METRICS_PATH', '')
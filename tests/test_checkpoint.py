@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from checkpoint import CheckpointStore, collect_in_batches
+
+
+def _collect(calls):
+    def collect_batch(ids):
+        calls.append(list(ids))
+        return pd.DataFrame({'track_id': ids})
+    return collect_batch
+
+
+def _age(store, album_id, ids, days):
+    stamp = store._batch_path(album_id, ids).with_suffix('.saved_at')
+    stamp.write_text((datetime.now() - timedelta(days=days)).isoformat(timespec='seconds'))
+
+
+def test_fresh_checkpoints_are_resumed(tmp_path):
+    store = CheckpointStore('run', root=tmp_path)
+    calls = []
+    collect_in_batches(store, 'album', ['a', 'b'], _collect(calls))
+    collect_in_batches(store, 'album', ['a', 'b'], _collect(calls))
+    assert calls == [['a', 'b']]
+
+
+def test_stale_checkpoints_are_refetched(tmp_path):
+    store = CheckpointStore('run', root=tmp_path)
+    calls = []
+    collect_in_batches(store, 'album', ['a', 'b'], _collect(calls))
+    _age(store, 'album', ['a', 'b'], days=30)
+
+    collect_in_batches(store, 'album', ['a', 'b'], _collect(calls))
+    assert len(calls) == 2
+    assert store.saved_at('album', ['a', 'b']) > datetime.now() - timedelta(minutes=1)
+
+
+def test_stale_checkpoints_resume_when_asked(tmp_path):
+    calls = []
+    collect_in_batches(CheckpointStore('run', root=tmp_path), 'album', ['a'], _collect(calls))
+    store = CheckpointStore('run', root=tmp_path, resume_stale=True)
+    _age(store, 'album', ['a'], days=30)
+
+    df = collect_in_batches(store, 'album', ['a'], _collect(calls))
+    assert len(calls) == 1
+    assert list(df['track_id']) == ['a']
+
+
+def test_checkpoints_without_a_timestamp_are_stale(tmp_path):
+    store = CheckpointStore('run', root=tmp_path)
+    calls = []
+    collect_in_batches(store, 'album', ['a'], _collect(calls))
+    store._batch_path('album', ['a']).with_suffix('.saved_at').unlink()
+
+    collect_in_batches(store, 'album', ['a'], _collect(calls))
+    assert len(calls) == 2
@@ -0,0 +1,49 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+import chunked_aggregation
+from chunked_aggregation import Aggregates
+
+
+def videos(n, seed=0, offset=0.0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'primary_trend_type': rng.choice(['Dance', 'POV', 'Lip Sync'], n),
+        'celebrity_boost': rng.choice(['Ariana Grande duet', 'None', ''], n),
+        'virality_score': offset + rng.normal(50, 0.5, n),
+        'tiktok_video_count': rng.integers(1, 1_000, n),
+        'weeks_trending': rng.integers(1, 20, n),
+    })
+
+
+def test_chunked_celebrity_effect_matches_in_memory_variance():
+    # Scores far from zero relative to their spread: sum_sq - n * mean^2 cancels
+    df = videos(3_000, offset=1e8)
+    total = Aggregates()
+    for start in range(0, len(df), 700):
+        total.update(df.iloc[start:start + 700])
+
+    flags = chunked_aggregation.celebrity_flag(df['celebrity_boost'])
+    with_celebrity, without = df['virality_score'][flags], df['virality_score'][~flags]
+    stderr = np.sqrt(with_celebrity.var() / len(with_celebrity) + without.var() / len(without))
+
+    effect = total.celebrity_effect()
+    assert effect['n_celebrity'] == len(with_celebrity)
+    assert np.isclose(effect['difference'], with_celebrity.mean() - without.mean(), rtol=0, atol=1e-6)
+    assert np.isclose(effect['ci_high'] - effect['ci_low'], 2 * 1.96 * stderr, rtol=1e-6)
+
+
+def test_cli_output_keeps_the_content_type(tmp_path, monkeypatch):
+    source, output = tmp_path / 'videos.csv', tmp_path / 'performance.csv'
+    videos(500).to_csv(source, index=False)
+    monkeypatch.setattr(sys, 'argv', ['chunked_aggregation.py', str(source), '--chunksize', '100',
+                                      '--output', str(output)])
+
+    performance, _ = chunked_aggregation.main()
+    written = pd.read_csv(output)
+    assert written.columns[0] == 'primary_trend_type'
+    assert sorted(written['primary_trend_type']) == ['Dance', 'Lip Sync', 'POV']
+    assert written['num_songs'].sum() == 500
+    assert len(written) == len(performance)
@@ -0,0 +1,43 @@
+import pandas as pd
+
+import synthetic_data
+from compact import compact_frame
+from correlation import correlate
+
+AUDIO_FEATURES = ['danceability', 'energy', 'loudness', 'speechiness', 'acousticness',
+                  'instrumentalness', 'liveness', 'valence', 'tempo', 'duration_min']
+
+
+def test_analysis_inputs_keep_float64():
+    features = synthetic_data.audio_features(500, seed=1)
+    compact = compact_frame(features)
+    assert (compact[AUDIO_FEATURES].dtypes == 'float64').all()
+    pd.testing.assert_frame_equal(
+        correlate(compact, AUDIO_FEATURES, ['popularity']),
+        correlate(features, AUDIO_FEATURES, ['popularity']),
+    )
+
+
+def test_free_text_is_categorical_only_when_it_repeats():
+    tiktok = compact_frame(synthetic_data.tiktok_performance(500, seed=1))
+    for column in ('viral_moment', 'notes', 'musical'):
+        assert isinstance(tiktok[column].dtype, pd.CategoricalDtype)
+    # Mostly distinct per song: codes would only add to the strings
+    assert not isinstance(tiktok['celebrity_boost'].dtype, pd.CategoricalDtype)
+
+
+def test_inherited_categories_are_trimmed():
+    catalog = pd.Series(['Dance', 'POV', 'Comedy', 'Duets'], dtype='category')
+    merged = pd.DataFrame({'primary_trend_type': catalog.iloc[:2].repeat(3).reset_index(drop=True),
+                           'virality_score': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]})
+    compact = compact_frame(merged)
+    assert list(compact['primary_trend_type'].cat.categories) == ['Dance', 'POV']
+
+    unique = compact_frame(pd.DataFrame({'notes': pd.Series(['a', 'b', 'c'], dtype='category')}))
+    assert not isinstance(unique['notes'].dtype, pd.CategoricalDtype)
+
+
+def test_counts_with_gaps_become_float64():
+    compact = compact_frame(pd.DataFrame({'tiktok_video_count': [16_777_217, None]}))
+    assert compact['tiktok_video_count'].dtype == 'float64'
+    assert compact['tiktok_video_count'].iloc[0] == 16_777_217
@@ -0,0 +1,43 @@
+import importlib
+
+import pandas as pd
+import pytest
+
+import dataset_store
+from dataset_store import read_table, write_table
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, 'STORE_DIR', tmp_path / 'store')
+    legacy = {name: [tmp_path / f'{name}.csv'] for name in dataset_store.SCHEMAS}
+    monkeypatch.setattr(dataset_store, 'LEGACY_CSV', legacy)
+    return tmp_path
+
+
+def test_projecting_a_column_an_old_csv_lacks(store):
+    pd.DataFrame({'song_name': ['Popular'], 'tiktok_video_count': [10]}).to_csv(
+        store / 'tiktok_performance.csv', index=False
+    )
+    df = read_table('tiktok_performance', columns=['song_name', 'weeks_trending'])
+    assert list(df.columns) == ['song_name', 'weeks_trending']
+    assert df['weeks_trending'].isna().all()
+
+
+def test_merged_table_has_one_musical_column(store):
+    patterns = importlib.import_module('03_analyze_patterns')
+    spotify = pd.DataFrame({
+        'musical': 'Wicked', 'track_name': ['Popular', 'Defying Gravity'],
+        'popularity': [60, 70], 'energy': [0.5, 0.6],
+    })
+    tiktok = pd.DataFrame({
+        'musical': 'Wicked', 'song_name': ['Popular', 'Defying Gravity'],
+        'tiktok_video_count': [100, 200], 'tiktok_view_estimate_millions': [1.0, 2.0],
+        'weeks_trending': [3, 4],
+    })
+    merged = patterns.merge_data(spotify, tiktok)
+    assert [c for c in merged.columns if c.startswith('musical')] == ['musical']
+
+    write_table('merged', merged, musical='Wicked')
+    stored = read_table('merged')
+    assert [c for c in stored.columns if c.startswith('musical')] == ['musical']
@@ -0,0 +1,40 @@
+import os
+
+import pandas as pd
+
+from figures import FigureSpec, prune_cache, render_figures
+
+
+def write_entry(path, size, mtime):
+    path.write_bytes(b'x' * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_drops_least_recently_used_first(tmp_path):
+    old = write_entry(tmp_path / 'old.png', 400, 1_000)
+    kept = write_entry(tmp_path / 'kept.png', 400, 2_000)
+    new = write_entry(tmp_path / 'new.png', 400, 3_000)
+
+    assert prune_cache(tmp_path, max_bytes=1_000, keep=[kept]) == [old]
+    assert prune_cache(tmp_path, max_bytes=1_000) == []
+    assert prune_cache(tmp_path, max_bytes=500, keep=[kept]) == [new]
+    assert kept.exists()
+
+
+def draw_line(fig, data):
+    fig.subplots().plot(data['x'])
+
+
+def test_render_figures_keeps_the_cache_bounded(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    stale = write_entry(cache_dir / 'stale.png', 10_000, 1_000)
+    spec = FigureSpec('line', draw_line, pd.DataFrame({'x': [1, 2, 3]}), tmp_path / 'line.png',
+                      figsize=(2, 2), dpi=20)
+
+    results = render_figures([spec], max_workers=1, cache_dir=cache_dir, max_cache_bytes=5_000)
+    assert [status for _, status in results] == ['rendered']
+    assert not stale.exists()
+    assert (tmp_path / 'line.png').exists()
+    assert [p.name for p in cache_dir.iterdir()] == [f'{spec.key()}.png']
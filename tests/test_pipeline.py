@@ -0,0 +1,59 @@
+import pipeline
+from pipeline import Pipeline, Stage, local_modules
+
+
+def write_scripts(scripts_dir):
+    scripts_dir.mkdir()
+    (scripts_dir / 'stage.py').write_text('from helper import clean\n')
+    (scripts_dir / 'helper.py').write_text('import numpy as np\n\ndef clean():\n    from nested import rule\n')
+    (scripts_dir / 'nested.py').write_text('RULE = 1\n')
+    (scripts_dir / 'unrelated.py').write_text('X = 1\n')
+
+
+def test_local_modules_are_found_transitively(tmp_path):
+    write_scripts(tmp_path / 'scripts')
+    modules = local_modules(tmp_path / 'scripts' / 'stage.py', tmp_path / 'scripts')
+    assert [m.name for m in modules] == ['helper.py', 'nested.py']
+
+
+def test_changed_helper_invalidates_the_stage(tmp_path, monkeypatch):
+    scripts_dir = tmp_path / 'scripts'
+    write_scripts(scripts_dir)
+    monkeypatch.setattr(pipeline, 'SCRIPTS_DIR', scripts_dir)
+    stage = Stage('stage', 'stage.py')
+    runner = Pipeline([stage], state_path=tmp_path / 'state.json')
+
+    before = runner.fingerprint(stage)
+    (scripts_dir / 'unrelated.py').write_text('X = 2  # not imported by the stage\n')
+    assert runner.fingerprint(stage) == before
+
+    (scripts_dir / 'nested.py').write_text('RULE = 2  # changed\n')
+    assert runner.fingerprint(stage) != before
+
+
+def test_default_run_leaves_hand_edited_sheets_alone():
+    selected = [stage.name for stage in pipeline.select(pipeline.STAGES)]
+    assert 'tiktok_setup' not in selected
+    assert 'analyze_real' in selected
+    assert 'tiktok_setup' in [stage.name for stage in pipeline.select(pipeline.STAGES, ['tiktok_setup'])]
+
+    outputs = [path.name for stage in pipeline.STAGES for path in stage.outputs]
+    assert 'tiktok_collection_template.csv' not in outputs
+    assert 'wicked_tiktok_performance_EXAMPLE.csv' not in outputs
+
+
+def test_stage_without_input_data_is_skipped_not_failed(tmp_path, monkeypatch):
+    scripts_dir = tmp_path / 'scripts'
+    scripts_dir.mkdir()
+    (scripts_dir / 'empty.py').write_text(f'import sys\nsys.exit({pipeline.NO_DATA_EXIT})\n')
+    (scripts_dir / 'after.py').write_text('')
+    monkeypatch.setattr(pipeline, 'SCRIPTS_DIR', scripts_dir)
+    monkeypatch.setattr(pipeline, 'STATE_DIR', tmp_path / 'state')
+    monkeypatch.setattr(pipeline, 'PROJECT_ROOT', tmp_path)
+    stages = [
+        Stage('empty', 'empty.py', outputs=[tmp_path / 'table.parquet']),
+        Stage('after', 'after.py', inputs=[tmp_path / 'table.parquet']),
+    ]
+
+    status = Pipeline(stages, state_path=tmp_path / 'state' / 'state.json').run()
+    assert status == {'empty': 'skipped', 'after': 'blocked'}
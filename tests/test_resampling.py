@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+from scipy.stats import rankdata, spearmanr, ttest_ind
+
+import resampling
+from resampling import (
+    correlation_bootstrap_ci, correlation_permutation_test, mean_difference_test, process_pool,
+)
+
+
+def test_spearman_bootstrap_matches_ranking_each_resample():
+    rng = np.random.default_rng(0)
+    x = np.round(rng.random((30, 4)), 1)  # plenty of ties
+    y = np.round(rng.random(30) * 4)
+    idx = resampling._bootstrap_indices(rng, 30, 300)
+
+    expected = resampling._pearson_rows(rankdata(x[idx], axis=1), rankdata(y[idx], axis=1))
+    actual = resampling._spearman_bootstrap(x, y, idx)
+    np.testing.assert_allclose(actual, expected, atol=1e-12)
+
+
+def test_clear_permutation_tests_stop_early(monkeypatch):
+    rng = np.random.default_rng(1)
+    x = rng.random((60, 3))
+    y = x[:, 0] + rng.random(60) * 0.1
+    seen = []
+    run_chunks = resampling._run_chunks
+
+    def counting(*args, **kwargs):
+        result = run_chunks(*args, **kwargs)
+        seen.append(len(result))
+        return result
+
+    monkeypatch.setattr(resampling, '_run_chunks', counting)
+    pvalues = correlation_permutation_test(x, y, max_workers=1)
+    assert pvalues[0] < 0.01
+    assert seen == [resampling.CHUNK_SIZE]
+
+
+def test_results_do_not_depend_on_workers():
+    rng = np.random.default_rng(2)
+    x, y = rng.random((20, 2)), rng.random(20)
+    n = resampling.PARALLEL_MIN_RESAMPLES
+    serial = correlation_bootstrap_ci(x, y, n_resamples=n, max_workers=1)
+    parallel = correlation_bootstrap_ci(x, y, n_resamples=n, max_workers=2)
+    np.testing.assert_array_equal(serial, parallel)
+
+
+def test_pool_is_reused():
+    assert process_pool(2) is process_pool(2)
+
+
+def test_mean_difference_with_one_empty_group_is_nan():
+    result = mean_difference_test([1.0, 2.0, 3.0], [True, True, True])
+    assert all(np.isnan(value) for value in result.values())
+
+
+def test_chunks_stay_within_the_memory_budget(monkeypatch):
+    rng = np.random.default_rng(3)
+    x, y = rng.random((5_000, 4)), rng.random(5_000)
+    sizes = []
+    run_chunks = resampling._run_chunks
+
+    def recording(*args, **kwargs):
+        sizes.append(kwargs['size'])
+        return run_chunks(*args, **kwargs)
+
+    monkeypatch.setattr(resampling, '_run_chunks', recording)
+    monkeypatch.setattr(resampling, 'RESAMPLE_MAX_N', 10_000)
+    correlation_bootstrap_ci(x, y, n_resamples=100, max_workers=1)
+    assert sizes and sizes[0] * x.size <= resampling.CHUNK_VALUES
+    assert resampling.chunk_size(30 * 4) == resampling.CHUNK_SIZE
+
+
+def test_large_samples_use_asymptotic_results():
+    rng = np.random.default_rng(4)
+    n = 100_000
+    x = rng.random((n, 2))
+    y = x[:, 0] * 0.05 + rng.random(n)
+    groups = rng.random(n) < 0.1
+
+    start = time.perf_counter()
+    pvalues = correlation_permutation_test(x, y)
+    low, high = correlation_bootstrap_ci(x, y)
+    result = mean_difference_test(y, groups)
+    assert time.perf_counter() - start < 5
+
+    expected = [spearmanr(x[:, j], y) for j in range(2)]
+    np.testing.assert_allclose(pvalues, [e.pvalue for e in expected], rtol=1e-6)
+    assert all(lo < e.statistic < hi for lo, hi, e in zip(low, high, expected))
+    welch = ttest_ind(y[groups], y[~groups], equal_var=False)
+    assert np.isclose(result['pvalue'], welch.pvalue)
+    assert result['ci_low'] < result['difference'] < result['ci_high']
@@ -0,0 +1,66 @@
+import pytest
+
+from response_cache import CacheMiss, CachedSpotify, ResponseCache
+from spotify_batch import album_track_items
+
+
+class FakeClient:
+    def __init__(self, n_tracks=120):
+        self.calls = []
+        self.items = [{'id': f't{i}'} for i in range(n_tracks)]
+
+    def track(self, track_id, market=None):
+        self.calls.append(('track', track_id, market))
+        return {'id': track_id, 'market': market}
+
+    def tracks(self, ids, market=None):
+        self.calls.append(('tracks', tuple(ids), market))
+        return {'tracks': [{'id': i, 'market': market} for i in ids]}
+
+    def audio_features(self, ids):
+        self.calls.append(('audio_features', tuple(ids)))
+        return [None for _ in ids]
+
+    def album_tracks(self, album_id, limit=50, offset=0, market=None):
+        self.calls.append(('album_tracks', offset))
+        page = self.items[offset:offset + limit]
+        more = offset + limit < len(self.items)
+        return {'items': page, 'next': 'url' if more else None}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(tmp_path / 'cache.sqlite')
+
+
+def test_track_lookups_are_keyed_by_market(cache):
+    client = FakeClient()
+    sp = CachedSpotify(client, cache)
+    assert sp.track('a', market='US')['market'] == 'US'
+    assert sp.track('a', market='GB')['market'] == 'GB'
+    assert sp.tracks(['a'], market='GB')['tracks'][0]['market'] == 'GB'
+    assert len(client.calls) == 2
+
+
+def test_null_results_expire(cache):
+    client = FakeClient()
+    sp = CachedSpotify(client, cache)
+    assert sp.audio_features(['a']) == [None]
+    assert sp.audio_features(['a']) == [None]
+    assert len(client.calls) == 1
+
+    cache.null_ttl = -1
+    sp.audio_features(['a'])
+    assert len(client.calls) == 2
+
+
+def test_album_pages_are_served_offline(tmp_path):
+    client = FakeClient(n_tracks=120)
+    online = CachedSpotify(client, ResponseCache(tmp_path / 'cache.sqlite'))
+    assert len(album_track_items(online, 'album')) == 120
+
+    offline = CachedSpotify(FakeClient(0), ResponseCache(tmp_path / 'cache.sqlite', offline=True))
+    assert [t['id'] for t in album_track_items(offline, 'album')] == [f't{i}' for i in range(120)]
+
+    with pytest.raises(CacheMiss):
+        album_track_items(offline, 'other')
@@ -0,0 +1,71 @@
+import json
+import re
+
+import pandas as pd
+
+import site_artifacts
+
+REGISTER = re.compile(r'^lazyPlots\.register\(("[^"]*"),(.*)\);\n$', re.DOTALL)
+
+
+def write_hamilton_figures(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_artifacts, 'SITE_DIR', tmp_path / 'site_data')
+    monkeypatch.setattr(site_artifacts, 'ASSET_DIR', tmp_path / 'site_data' / 'assets')
+    monkeypatch.setattr(site_artifacts, 'PROJECT_ROOT', tmp_path)
+    df = pd.DataFrame({
+        'musical': 'Hamilton',
+        'clean_name': ['My Shot', 'Satisfied', 'Wait for It'],
+        'popularity': [70, 60, 65],
+        'duration_min': [5.5, 5.0, 3.2],
+    })
+    return site_artifacts.write_figures(df, 'Hamilton')
+
+
+def read_registered(path):
+    """(src, data) of a lazyPlots.register() data file"""
+    src, data = REGISTER.match(path.read_text()).groups()
+    return json.loads(src), json.loads(data)
+
+
+def test_charts_are_titled_with_the_artifact_musical(tmp_path, monkeypatch):
+    figures = write_hamilton_figures(tmp_path, monkeypatch)
+    titles = [
+        read_registered(tmp_path / 'site_data' / 'hamilton' / f'{name}.js')[1]['layout']['title']['text']
+        for name in figures
+    ]
+    assert 'Top 10 Most Popular Hamilton Songs' in titles[0]
+    assert 'How popular are Hamilton songs?' in titles[2]
+    assert not any('Wicked' in title for title in titles)
+
+
+def test_placeholders_point_at_published_data_files(tmp_path, monkeypatch):
+    figures = write_hamilton_figures(tmp_path, monkeypatch)
+    for html in figures.values():
+        attributes = dict(re.findall(r'data-(\w+)="([^"]*)"', html))
+        assert attributes['src'].startswith('site_data/hamilton/')
+        assert attributes['plotly'].startswith('https://cdn.plot.ly/plotly-')
+        for name in ('src', 'template'):
+            src, _ = read_registered(tmp_path / attributes[name])
+            assert src == attributes[name]
+
+
+def test_parameterized_render_leaves_the_default_freeze(tmp_path, monkeypatch):
+    freeze = tmp_path / '_freeze' / 'index'
+    (freeze / 'execute-results').mkdir(parents=True)
+    (freeze / 'execute-results' / 'html.json').write_text('Wicked')
+    monkeypatch.setattr(site_artifacts, 'PROJECT_ROOT', tmp_path)
+    monkeypatch.setattr(site_artifacts, 'FREEZE_DIR', freeze)
+
+    calls = []
+
+    def quarto(args, **kwargs):
+        # A render for another musical sees no freeze and writes its own
+        calls.append(args)
+        assert not freeze.exists()
+        (freeze / 'execute-results').mkdir(parents=True)
+        (freeze / 'execute-results' / 'html.json').write_text('Hamilton')
+
+    monkeypatch.setattr(site_artifacts.subprocess, 'run', quarto)
+    assert site_artifacts.render('Hamilton') == tmp_path / 'hamilton.html'
+    assert calls == [['quarto', 'render', 'index.qmd', '-P', 'musical:Hamilton', '--output', 'hamilton.html']]
+    assert (freeze / 'execute-results' / 'html.json').read_text() == 'Wicked'
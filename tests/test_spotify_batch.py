@@ -0,0 +1,29 @@
+from spotify_batch import _fetch_batched
+
+
+def test_null_items_in_a_successful_batch_are_retried():
+    calls = []
+
+    def fetch_batch(batch):
+        return [{'id': i} if i != 'b' else None for i in batch]
+
+    def fetch_one(track_id):
+        calls.append(track_id)
+        return {'id': track_id}
+
+    results = _fetch_batched(fetch_batch, fetch_one, ['a', 'b', 'c'], 50)
+    assert calls == ['b']
+    assert set(results) == {'a', 'b', 'c'}
+
+
+def test_ids_that_stay_empty_are_left_out():
+    results = _fetch_batched(lambda batch: [None] * len(batch), lambda track_id: None, ['a', 'b'], 50)
+    assert results == {}
+
+
+def test_failed_batch_falls_back_to_single_fetches():
+    def fetch_batch(batch):
+        raise RuntimeError('boom')
+
+    results = _fetch_batched(fetch_batch, lambda track_id: {'id': track_id}, ['a', 'b'], 1)
+    assert set(results) == {'a', 'b'}
@@ -0,0 +1,40 @@
+import asyncio
+
+import pandas as pd
+
+from tiktok_scraper import TikTokScraper, fill_template
+
+
+def test_fractional_rate_bucket_grants_a_token():
+    async def acquire():
+        bucket = TikTokScraper(rate=0.5).bucket_for('https://www.tiktok.com/search')
+        await asyncio.wait_for(bucket.acquire(), timeout=1)
+        return bucket
+
+    bucket = asyncio.run(acquire())
+    assert bucket.capacity == 1.0
+    assert bucket.rate == 0.5
+
+
+class FailingScraper(TikTokScraper):
+    async def scrape_song(self, song_name):
+        if song_name == 'Popular':
+            raise ConnectionError('connection reset')
+        return {'song_name': song_name, 'found': True, 'tiktok_video_count': 10,
+                'tiktok_view_estimate_millions': 1.5}
+
+
+def test_one_failing_song_does_not_abort_the_run():
+    results = asyncio.run(FailingScraper().scrape(['Popular', 'Defying Gravity']))
+    assert results[0] == {'song_name': 'Popular', 'found': False, 'error': 'ConnectionError: connection reset'}
+    assert results[1]['found']
+
+
+def test_fill_template_when_nothing_was_found():
+    template = pd.DataFrame({
+        'song_name': ['Popular'], 'tiktok_video_count': [3], 'tiktok_view_estimate_millions': [0.5],
+    })
+    results = pd.DataFrame([{'song_name': 'Popular', 'found': False}])
+    filled = fill_template(template, results)
+    assert filled['tiktok_video_count'].tolist() == [3]
+    assert filled['tiktok_view_estimate_millions'].tolist() == [0.5]
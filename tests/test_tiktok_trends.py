@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+import dataset_store
+import tiktok_trends
+from dataset_store import read_table, write_table
+from tiktok_trends import TrendTracker, ingest
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, 'STORE_DIR', tmp_path / 'store')
+    monkeypatch.setattr(dataset_store, 'LEGACY_CSV', {name: [] for name in dataset_store.SCHEMAS})
+    monkeypatch.setattr(tiktok_trends, 'STATE_DIR', tmp_path / 'trend_state')
+    monkeypatch.setattr(tiktok_trends, 'OBSERVATIONS_DIR', tmp_path / 'observations')
+    monkeypatch.setattr(tiktok_trends, 'LEGACY_STATE_PATH', tmp_path / 'trend_state.json')
+    return tmp_path
+
+
+def batch(*sounds):
+    return pd.DataFrame({
+        'sound': list(sounds),
+        'date': '2024-12-01',
+        'video_count': 2000,
+        'views': 1_000_000,
+    })
+
+
+def _ingest(musical, observations):
+    tracker = TrendTracker(musical)
+    return ingest(observations, musical, tracker)
+
+
+def test_state_is_kept_per_musical(dirs):
+    _ingest('Wicked', batch('Popular', 'Defying Gravity'))
+    hamilton = _ingest('Hamilton', batch('My Shot'))
+
+    assert list(hamilton['song_name']) == ['My Shot']
+    assert set(read_table('tiktok_performance', musical='Hamilton')['song_name']) == {'My Shot'}
+    assert set(read_table('tiktok_performance', musical='Wicked')['song_name']) == {'Popular', 'Defying Gravity'}
+    assert set(TrendTracker('Wicked').sounds) == {'Popular', 'Defying Gravity'}
+
+
+def test_unobserved_annotated_songs_survive(dirs):
+    write_table('tiktok_performance', pd.DataFrame({
+        'song_name': ['Popular', 'Dancing Through Life'],
+        'tiktok_video_count': [5, 7],
+        'weeks_trending': [1, 2],
+        'primary_trend_type': ['Dance', 'Lip Sync'],
+    }), musical='Wicked')
+
+    performance = _ingest('Wicked', batch('Popular')).set_index('song_name')
+    assert performance.loc['Popular', 'tiktok_video_count'] == 2000
+    assert performance.loc['Popular', 'primary_trend_type'] == 'Dance'
+    assert performance.loc['Dancing Through Life', 'tiktok_video_count'] == 7
+    assert performance.loc['Dancing Through Life', 'primary_trend_type'] == 'Lip Sync'
+
+
+def test_tracker_must_match_musical(dirs):
+    with pytest.raises(ValueError):
+        ingest(batch('My Shot'), 'Hamilton', TrendTracker('Wicked'))
@@ -0,0 +1,70 @@
+import time
+
+import pandas as pd
+
+import synthetic_data
+from title_matching import canonical_title, canonical_titles, match_titles, merge_matched
+
+
+def test_release_noise_is_stripped():
+    assert canonical_title('Dancing Through Life - From "Wicked" Original Broadway Cast Recording/2003') == \
+        'dancing through life'
+    assert canonical_title('Popular - Remastered 2011') == 'popular'
+    assert canonical_title('For Good (feat. Kristin Chenoweth)') == 'for good'
+    assert canonical_title('Café Señor & Me') == 'cafe senor and me'
+    assert list(canonical_titles(['Popular', None, 3])) == ['popular', '', '']
+
+
+def test_version_qualifiers_are_kept():
+    assert canonical_title("I'm Not That Girl (Reprise)") == 'im not that girl reprise'
+    assert canonical_title('Defying Gravity - Dance Mix') == 'defying gravity dance mix'
+
+    matches = match_titles(
+        pd.Series(["I'm Not That Girl (Reprise)", "I'm Not That Girl"]),
+        pd.Series(["I'm Not That Girl"]),
+    )
+    assert matches[['left_index', 'score', 'method']].to_dict('records') == [
+        {'left_index': 1, 'score': 1.0, 'method': 'exact'},
+    ]
+
+
+def test_each_right_row_is_matched_once():
+    spotify = pd.DataFrame({
+        'track_name': ['Popular', 'Popular - Remastered 2011', 'Defying Gravity'],
+        'popularity': [70, 40, 80],
+    })
+    tiktok = pd.DataFrame({'song_name': ['popular', 'Defying Gravity!'], 'views': [5, 9]})
+    merged = merge_matched(spotify, tiktok, 'track_name', 'song_name')
+    assert merged['track_name'].tolist() == ['Popular', 'Defying Gravity']
+    assert merged['views'].tolist() == [5, 9]
+
+
+def test_best_score_wins_the_right_row():
+    right = pd.Series(['as long as youre mine', 'dancing through life', 'no one mourns the wicked', 'popular'])
+    assert match_titles(pd.Series(["As Long As You're Mine Tonight"]), right)['method'].tolist() == ['fuzzy']
+
+    matches = match_titles(pd.Series(["As Long As You're Mine Tonight", "As Long As You're Mine"]), right)
+    assert matches[['left_index', 'score', 'method']].to_dict('records') == [
+        {'left_index': 1, 'score': 1.0, 'method': 'exact'},
+    ]
+
+
+def test_matching_stays_fast_at_scale():
+    # 10k Spotify tracks against 100k TikTok sounds, most of them findable
+    left = synthetic_data.spotify_tracks(10_000, seed=0)['track_name']
+    right = pd.concat([
+        synthetic_data.tiktok_performance(10_000, seed=0)['song_name'],
+        synthetic_data.tiktok_performance(100_000, seed=5)['song_name'].iloc[10_000:],
+    ], ignore_index=True)
+    left = pd.concat([left, pd.Series(['Ozdust Ballroom Waltz'])], ignore_index=True)
+    right = pd.concat([right, pd.Series(['ozdust balroom waltz!'])], ignore_index=True)
+
+    start = time.perf_counter()
+    matches = match_titles(left, right)
+    assert time.perf_counter() - start < 3
+
+    assert len(matches) > 7_000
+    assert matches['right_index'].is_unique
+    typo = matches[matches['left_index'] == len(left) - 1]
+    assert typo['right_index'].tolist() == [len(right) - 1]
+    assert typo['method'].tolist() == ['fuzzy']
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from virality import ViralityScorer
+
+
+def recompute(rows):
+    """virality_score and virality_rank the way merge_data computed them before the scorer"""
+    score = (
+        (rows['tiktok_video_count'] / rows['tiktok_video_count'].max()) * 50 +
+        (rows['tiktok_view_estimate_millions'] / rows['tiktok_view_estimate_millions'].max()) * 30 +
+        (rows['weeks_trending'] / rows['weeks_trending'].max()) * 20
+    ).round(2)
+    return pd.DataFrame({'virality_score': score, 'virality_rank': score.rank(ascending=False).astype(int)})
+
+
+def random_rows(rng, keys):
+    # Small value ranges, so ties and moving maxima are common
+    return pd.DataFrame({
+        'tiktok_video_count': rng.integers(1, 30, len(keys)),
+        'tiktok_view_estimate_millions': np.round(rng.uniform(0.1, 3.0, len(keys)), 1),
+        'weeks_trending': rng.integers(1, 8, len(keys)),
+    }, index=pd.Index(keys, dtype=object))
+
+
+def test_incremental_table_matches_a_full_recompute():
+    rng = np.random.default_rng(0)
+    scorer, current = ViralityScorer(), random_rows(rng, [])
+    for step in range(300):
+        if len(current) > 5 and rng.random() < 0.3:
+            key = rng.choice(current.index.to_numpy())
+            scorer.remove(key)
+            current = current.drop(index=key)
+        else:
+            keys = [f'song {k}' for k in rng.choice(60, rng.integers(1, 6), replace=False)]
+            rows = random_rows(rng, keys)
+            scorer.update(rows)
+            current = pd.concat([current.drop(index=keys, errors='ignore'), rows])
+
+        expected = recompute(current)
+        table = scorer.table().loc[expected.index]
+        np.testing.assert_array_equal(table['virality_score'].to_numpy(), expected['virality_score'].to_numpy())
+        np.testing.assert_array_equal(table['virality_rank'].to_numpy(), expected['virality_rank'].to_numpy())
+        assert len(scorer) == len(current)
+
+    best = expected.sort_values('virality_score', ascending=False, kind='stable')['virality_score']
+    assert [score for _, score in scorer.top(5)] == best.head(5).tolist()